@@ -1,65 +1,87 @@
 import os
-import subprocess
-import pandas as pd
+import sys
 
-def get_cyclomatic_complexity(path):
-    result = subprocess.run(['radon', 'cc', '-s', '-a', path], capture_output=True, text=True)
-    lines = result.stdout.split('\n')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from file_scanner import scan_tree
+from radon_engine import analyze_file, average_complexity
+
+def get_cyclomatic_complexity(path, inventory=None):
+    if inventory is None:
+        inventory = scan_tree(path, extensions=[".py"])
     cc_data = {}
-    current_file = None  
-    for line in lines:
-        if line.strip().endswith(':'):
-            current_file = line.strip().rstrip(':')  
-        elif line.strip().startswith('Average complexity:'):
-            if current_file:
-                avg_cc_str = line.split(':')[-1].strip()
-                try:
-                    avg_cc = float(avg_cc_str.split('(')[-1].split(')')[0].strip())
-                    cc_data[current_file] = avg_cc
-                except ValueError:
-                    print(f"Could not convert complexity value from {avg_cc_str} for {current_file}")
-            else:
-                print(f"Warning: No current file assigned for line: {line}")
+    for entry in inventory.with_extensions([".py"]):
+        file_path = os.path.join(path, entry.rel_path)
+        result = analyze_file(entry.path)
+        if "error" in result:
+            print(f"Could not analyze {file_path}: {result['error']}")
+            continue
+        avg_cc = average_complexity(result["cc"])
+        if avg_cc is not None:
+            cc_data[file_path] = avg_cc
     return cc_data
 
-def count_lines_of_code(path):
+def count_lines_of_code(path, inventory=None):
+    if inventory is None:
+        inventory = scan_tree(path, extensions=[".py"])
     loc_data = {}
-    for root, _, files in os.walk(path):
-        for file in files:
-            if file.endswith(".py"):
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        lines = sum(1 for line in f if line.strip())
-                        loc_data[file_path] = lines
-                except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
+    for entry in inventory.with_extensions([".py"]):
+        # Key by the same path form as get_cyclomatic_complexity, so the two sources line up
+        file_path = os.path.join(path, entry.rel_path)
+        try:
+            with open(entry.path, 'r', encoding='utf-8') as f:
+                lines = sum(1 for line in f if line.strip())
+                loc_data[file_path] = lines
+        except Exception as e:
+            print(f"Error reading {file_path}: {e}")
     return loc_data
 
-def collect_metrics(path):
-    cc = get_cyclomatic_complexity(path)
-    loc = count_lines_of_code(path)
+def metric_rows(path):
+    """One {"File", "Cyclomatic Complexity", "Lines of Code"} row per Python file, without pandas."""
+    # One scan of the tree feeds both collectors
+    inventory = scan_tree(path, extensions=[".py"])
+    cc = get_cyclomatic_complexity(path, inventory)
+    loc = count_lines_of_code(path, inventory)
 
     # Combine data
     files = set(cc.keys()) | set(loc.keys())
     data = []
-    for file in files:
+    for file in sorted(files):
         data.append({
             'File': file,
             'Cyclomatic Complexity': cc.get(file, None),
             'Lines of Code': loc.get(file, None)
         })
+    return data
+
+def collect_metrics(path):
+    """The metric rows as a pandas DataFrame; pandas is only imported when this is called."""
+    import pandas as pd
+    return pd.DataFrame(metric_rows(path))
+
+def format_rows(rows):
+    """Render the metric rows as a plain aligned table."""
+    columns = ['File', 'Cyclomatic Complexity', 'Lines of Code']
+    cells = [[
+        row['File'],
+        f"{row['Cyclomatic Complexity']:.2f}" if row['Cyclomatic Complexity'] is not None else "-",
+        str(row['Lines of Code']) if row['Lines of Code'] is not None else "-",
+    ] for row in rows]
+    widths = [max([len(column)] + [len(cell[i]) for cell in cells]) for i, column in enumerate(columns)]
+
+    def line(values):
+        # File names left-aligned, numbers right-aligned
+        return "  ".join(value.ljust(width) if i == 0 else value.rjust(width)
+                         for i, (value, width) in enumerate(zip(values, widths)))
 
-    df = pd.DataFrame(data)
-    return df
+    return "\n".join([line(columns)] + [line(cell) for cell in cells])
 
 def main():
     path = input("Enter the path to your codebase: ")
 
-    df = collect_metrics(path)
+    rows = metric_rows(path)
 
     print("\nCollected Metrics (Cyclomatic Complexity and LOC):")
-    print(df)
+    print(format_rows(rows))
 
 if __name__ == "__main__":
     main()
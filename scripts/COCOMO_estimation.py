@@ -1,9 +1,30 @@
 import os
 import math
+import argparse
 from pathlib import Path
 
+from file_scanner import scan_tree, stat_entry
+from file_watcher import watch_changes
+from metrics_cache import compute_cached, open_cache
+from metrics_history import record_run
+from source_lexer import line_counts
+from tracing import span
+
+# Bump whenever count_code_lines changes, to invalidate cached results
+LOC_COUNTER_VERSION = "2"
+
+def count_code_lines(content, extension=""):
+    """Count the lines of file content holding code, by the comment syntax of its extension."""
+    # Shared with the other analyzers of the same content (see source_lexer.line_counts)
+    return line_counts(content, extension).code
+
+def loc_analysis(extension):
+    """The (analyzer, version, compute) cache analysis counting code lines of one file type."""
+    return (f"cocomo_loc{extension}", LOC_COUNTER_VERSION,
+            lambda content: count_code_lines(content, extension))
+
 class COCOMOEstimator:
-    def __init__(self):
+    def __init__(self, cache=None):
         # Since script is in scripts folder, navigate to project root
         self.script_dir = Path(os.path.dirname(os.path.abspath(__file__)))
         self.project_root = self.script_dir.parent
@@ -22,78 +43,82 @@ class COCOMOEstimator:
         # Exclude directories that shouldn't be counted
         self.exclude_dirs = {'node_modules', '.git', '__pycache__', 'dist', 'build', 'scripts', 'metrics'}
         
+        # Optional MetricsCache holding per-file line counts from earlier runs
+        self.cache = cache
+        
         # Initialize counters for each component
         self.backend_loc = 0
         self.frontend_loc = 0
         self.database_loc = 0
+        
+        # Per-file (component, LOC), so a changed file can be re-counted by its delta
+        self.file_loc = {}
 
     def count_file_lines(self, file_path):
-        """Count non-empty, non-comment lines in a file."""
+        """Count the code lines of a file (blank and comment lines excluded)."""
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-                # Count non-empty and non-comment lines
-                lines = [line.strip() for line in file.readlines()]
-                code_lines = [line for line in lines 
-                            if line and not line.startswith('//') 
-                            and not line.startswith('/*') 
-                            and not line.startswith('*') 
-                            and not line.startswith('*/') 
-                            and not line.startswith('#')]
-                return len(code_lines)
+            analyzer, version, compute = loc_analysis(os.path.splitext(file_path)[1].lower())
+            return compute_cached(self.cache, analyzer, version, file_path, compute)
         except Exception as e:
             print(f"Error reading file {file_path}: {str(e)}")
             return 0
 
-    def categorize_and_count(self):
-        """Traverse the project and count lines of code for each category."""
+    def categorize_and_count(self, inventory=None):
+        """Count lines of code for each category from a single scan of the project."""
         print("Analyzing project structure and counting lines of code...")
         print(f"Project root: {self.project_root}")
         
-        # Key directories to check
-        key_directories = [
-            self.project_root / "public",
-            self.project_root / "views",
-            self.project_root
-        ]
-        
-        # Process each directory
-        for directory in key_directories:
-            print(f"Scanning directory: {directory}")
-            if not directory.exists():
-                print(f"Directory {directory} not found. Skipping...")
-                continue
-                
-            for root, dirs, files in os.walk(directory):
-                # Skip excluded directories
-                dirs[:] = [d for d in dirs if d not in self.exclude_dirs]
-                
-                path = Path(root)
-                
-                for file in files:
-                    file_path = path / file
-                    extension = file_path.suffix.lower()
-                    
-                    # Skip non-code files
-                    if not extension or extension not in (self.backend_extensions | self.frontend_extensions | self.database_extensions):
+        with span("cocomo") as sp:
+            if inventory is None:
+                with span("scan"):
+                    inventory = scan_tree(self.project_root, exclude_dirs=self.exclude_dirs)
+            code_extensions = self.backend_extensions | self.frontend_extensions | self.database_extensions
+            
+            with span("count_lines") as count_span:
+                for entry in inventory.with_extensions(code_extensions):
+                    component = self.component_of(entry)
+                    if component is None:
                         continue
-                    
-                    # Count lines in the file
-                    loc = self.count_file_lines(file_path)
-                    
-                    # Categorize based on file extension and location
-                    if extension in self.backend_extensions:
-                        # Check if it's not in a frontend directory
-                        if not any(frontend_dir in str(file_path).lower() for frontend_dir in ['public', 'views']):
-                            self.backend_loc += loc
-                            print(f"Backend: {file_path.relative_to(self.project_root)} - {loc} lines")
-                    elif extension in self.frontend_extensions:
-                        # Check if it's in a frontend directory
-                        if any(frontend_dir in str(file_path).lower() for frontend_dir in ['public', 'views']):
-                            self.frontend_loc += loc
-                            print(f"Frontend: {file_path.relative_to(self.project_root)} - {loc} lines")
-                    elif extension in self.database_extensions:
-                        self.database_loc += loc
-                        print(f"Database: {file_path.relative_to(self.project_root)} - {loc} lines")
+                    loc = self.count_file_lines(entry.path)
+                    self.add_loc(component, loc)
+                    self.file_loc[entry.rel_path] = (component, loc)
+                    count_span.count("files")
+                    count_span.count("bytes", entry.size)
+                    print(f"{component.capitalize()}: {entry.rel_path} - {loc} lines")
+            sp.count("loc", self.backend_loc + self.frontend_loc + self.database_loc)
+
+    def component_of(self, entry):
+        """Return "backend", "frontend", "database" or None for a scanned file."""
+        if entry.category == "backend" and entry.extension in self.backend_extensions:
+            return "backend"
+        if entry.category == "frontend" and entry.extension in self.frontend_extensions:
+            return "frontend"
+        if entry.category == "database":
+            return "database"
+        return None
+
+    def add_loc(self, component, loc):
+        """Add (or with a negative count, remove) lines of code for a component."""
+        if component == "backend":
+            self.backend_loc += loc
+        elif component == "frontend":
+            self.frontend_loc += loc
+        elif component == "database":
+            self.database_loc += loc
+
+    def update_file(self, rel_path):
+        """Re-count one file after it changed, adjusting the totals by the delta."""
+        old_component, old_loc = self.file_loc.pop(rel_path, (None, 0))
+        self.add_loc(old_component, -old_loc)
+        
+        entry = stat_entry(self.project_root, rel_path)
+        component = self.component_of(entry) if entry is not None else None
+        if component is None:
+            return -old_loc
+        loc = self.count_file_lines(entry.path)
+        self.add_loc(component, loc)
+        self.file_loc[rel_path] = (component, loc)
+        return loc - old_loc
 
     def calculate_cocomo(self):
         """Calculate COCOMO metrics."""
@@ -140,15 +165,8 @@ Note: This estimation assumes:
 """
         return report
 
-def main():
-    # Initialize estimator
-    estimator = COCOMOEstimator()
-    
-    # Count lines of code
-    estimator.categorize_and_count()
-    
-    # Generate and save report
-    print("\nGenerating COCOMO analysis report...")
+def save_report(estimator):
+    """Write the report to the metrics directory and print the summary."""
     report = estimator.generate_report()
     
     # Save to file in metrics directory
@@ -167,5 +185,58 @@ def main():
     print(f"KLOC: {kloc:.2f}")
     print(f"Estimated Effort: {effort:.2f} person-months")
 
+def record_history(estimator):
+    """Append per-file LOC and the project estimate to the metrics history store."""
+    file_values = {
+        estimator.project_root / rel_path: {"cocomo.loc": loc}
+        for rel_path, (component, loc) in estimator.file_loc.items()
+    }
+    total_loc, kloc, effort = estimator.calculate_cocomo()
+    record_run(estimator.project_root, "cocomo", file_values, {
+        "cocomo.backend_loc": estimator.backend_loc,
+        "cocomo.frontend_loc": estimator.frontend_loc,
+        "cocomo.database_loc": estimator.database_loc,
+        "cocomo.total_loc": total_loc,
+        "cocomo.effort": effort,
+    })
+
+def watch(estimator):
+    """Re-count changed files only and refresh the report after every change. Runs until interrupted."""
+    code_extensions = estimator.backend_extensions | estimator.frontend_extensions | estimator.database_extensions
+    print(f"\nWatching {estimator.project_root} for changes (Ctrl+C to stop)...")
+    for changed in watch_changes(estimator.project_root, exclude_dirs=estimator.exclude_dirs,
+                                 extensions=code_extensions):
+        for rel_path in sorted(changed):
+            delta = estimator.update_file(rel_path)
+            print(f"\nChanged: {rel_path} ({delta:+,} lines)")
+        save_report(estimator)
+
+def main():
+    parser = argparse.ArgumentParser(description="Basic COCOMO estimate for the project.")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and update the estimate as files change")
+    args = parser.parse_args()
+
+    # Initialize estimator
+    project_root = Path(os.path.dirname(os.path.abspath(__file__))).parent
+    with open_cache(project_root) as cache:
+        estimator = COCOMOEstimator(cache=cache)
+        
+        # Count lines of code
+        estimator.categorize_and_count()
+    
+    # Generate and save report
+    print("\nGenerating COCOMO analysis report...")
+    save_report(estimator)
+    record_history(estimator)
+
+    if args.watch:
+        # Changed files are re-counted directly; the cache is only used for the initial pass
+        estimator.cache = None
+        try:
+            watch(estimator)
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
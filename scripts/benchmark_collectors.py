@@ -0,0 +1,392 @@
+import os
+import io
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from file_scanner import scan_tree, DEFAULT_EXCLUDE_DIRS
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPTS_DIR)
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_OUTPUT = os.path.join("metrics", "collector_benchmark.json")
+# Bump whenever generate_corpus changes, so results are only compared on equal corpora
+CORPUS_VERSION = "1"
+
+# Share of the generated lines per kind of file, roughly the mix of this project
+CORPUS_MIX = {"js": 0.45, "ejs": 0.2, "css": 0.15, "py": 0.15, "sql": 0.05}
+LINES_PER_FILE = 200
+FILES_PER_COMMIT = 50
+
+COLLECTORS = ("halstead", "info_flow", "cocomo", "radon", "js_complexity", "git")
+
+# ---------------------------------------------------------------- corpus
+
+def _js_module(rng, index, modules, lines):
+    out = []
+    for target in rng.sample(modules, min(len(modules), rng.randint(1, 4))):
+        if target != index:
+            out.append(f"const mod{target} = require('./module{target}');")
+    out.append("")
+    fn = 0
+    while len(out) < lines:
+        out += [
+            f"// Handles case {fn} of module {index}",
+            f"function handler{fn}(req, res, next) {{",
+            f"    const value = req.body.value{fn} || {rng.randint(0, 99)};",
+            f"    if (value > {rng.randint(0, 50)} && req.user) {{",
+            f"        for (let i = 0; i < value; i++) {{ res.locals.total += i * {fn}; }}",
+            "    } else {",
+            "        return next(new Error('invalid value'));",
+            "    }",
+            f"    return res.render('page{index % 50}', {{ value }});",
+            "}",
+            "",
+        ]
+        fn += 1
+    out.append("module.exports = { " + ", ".join(f"handler{i}" for i in range(fn)) + " };")
+    return out[:lines]
+
+
+def _ejs_template(rng, index, lines):
+    out = [
+        "<!DOCTYPE html>",
+        "<html>",
+        "<head>",
+        f"    <link rel=\"stylesheet\" href=\"/style{index % 40}.css\">",
+        "</head>",
+        "<body>",
+        "    <%- include('partials/header') %>",
+    ]
+    row = 0
+    while len(out) < lines - 3:
+        out += [
+            f"    <% if (items[{row}]) {{ %>",
+            f"        <div class=\"row-{row}\"><%= items[{row}].name %></div>",
+            "    <% } %>",
+        ]
+        row += 1
+    out += ["    <%- include('partials/footer') %>", "</body>", "</html>"]
+    return out[:lines]
+
+
+def _css_sheet(rng, index, lines):
+    out = [f"/* Styles for page {index} */"]
+    rule = 0
+    while len(out) < lines:
+        out += [
+            f".block-{index}-{rule} {{",
+            f"    margin: {rng.randint(0, 20)}px;",
+            f"    color: #{rng.randint(0, 0xffffff):06x};",
+            "}",
+        ]
+        rule += 1
+    return out[:lines]
+
+
+def _py_module(rng, index, lines):
+    out = ['"""Generated helper module."""', "import os", ""]
+    fn = 0
+    while len(out) < lines:
+        out += [
+            f"def compute_{fn}(values, limit={rng.randint(1, 100)}):",
+            f"    \"\"\"Sum the values below limit ({fn}).\"\"\"",
+            "    total = 0",
+            "    for value in values:",
+            "        if value < limit and value % 2 == 0:",
+            "            total += value",
+            "        elif value < limit:",
+            "            total -= value",
+            "    return total",
+            "",
+        ]
+        fn += 1
+    return out[:lines]
+
+
+def _sql_script(rng, index, lines):
+    out = [f"-- Schema part {index}"]
+    table = 0
+    while len(out) < lines:
+        out += [
+            f"CREATE TABLE table_{index}_{table} (",
+            "    id INTEGER PRIMARY KEY,",
+            f"    name VARCHAR({rng.randint(10, 255)}) NOT NULL",
+            ");",
+        ]
+        table += 1
+    return out[:lines]
+
+
+def _commit_all(repo, message):
+    subprocess.run(["git", "-C", repo, "add", "-A"], check=True)
+    subprocess.run(["git", "-C", repo, "-c", "user.name=Benchmark", "-c", "user.email=benchmark@example.com",
+                    "commit", "-q", "--no-verify", "-m", message], check=True)
+
+
+def generate_corpus(root, target_loc, seed=0):
+    """
+    Write a project-like tree of about target_loc lines (JS modules that
+    require each other, EJS views with includes and stylesheet links, CSS,
+    Python and SQL) and commit it in batches, so the git collector has a
+    history proportional to the corpus size.
+    """
+    rng = random.Random(seed)
+    counts = {kind: max(1, round(target_loc * share / LINES_PER_FILE)) for kind, share in CORPUS_MIX.items()}
+    files = []
+    js_modules = list(range(counts["js"]))
+    for i in js_modules:
+        files.append((f"routes/module{i}.js", _js_module(rng, i, js_modules, LINES_PER_FILE)))
+    for i in range(counts["ejs"]):
+        files.append((f"views/page{i}.ejs", _ejs_template(rng, i, LINES_PER_FILE)))
+    files.append(("views/partials/header.ejs", ["<header>Portal</header>"]))
+    files.append(("views/partials/footer.ejs", ["<footer>Portal</footer>"]))
+    for i in range(counts["css"]):
+        files.append((f"public/style{i}.css", _css_sheet(rng, i, LINES_PER_FILE)))
+    for i in range(counts["py"]):
+        files.append((f"tools/helper{i}.py", _py_module(rng, i, LINES_PER_FILE)))
+    for i in range(counts["sql"]):
+        files.append((f"db/schema{i}.sql", _sql_script(rng, i, LINES_PER_FILE)))
+    files.append(("index.js", ["const express = require('express');"]
+                  + [f"app.use(require('./routes/module{i}'));" for i in js_modules[:20]]))
+
+    subprocess.run(["git", "init", "-q", root], check=True)
+    rng.shuffle(files)
+    for start in range(0, len(files), FILES_PER_COMMIT):
+        for rel_path, lines in files[start:start + FILES_PER_COMMIT]:
+            path = os.path.join(root, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        _commit_all(root, f"Add files {start}-{start + FILES_PER_COMMIT}")
+    return sum(len(lines) for _, lines in files)
+
+
+def corpus_path(corpus_dir, target_loc, seed=0):
+    """Return a generated corpus for the size, creating it on first use."""
+    root = os.path.join(corpus_dir, f"corpus-v{CORPUS_VERSION}-{target_loc}-{seed}")
+    marker = os.path.join(root, ".corpus.json")
+    if not os.path.exists(marker):
+        shutil.rmtree(root, ignore_errors=True)
+        os.makedirs(root)
+        print(f"Generating {target_loc:,} LOC corpus in {root}...")
+        loc = generate_corpus(root, target_loc, seed)
+        with open(marker, "w") as f:
+            json.dump({"target_loc": target_loc, "loc": loc, "seed": seed}, f)
+    with open(marker) as f:
+        return root, json.load(f)["loc"]
+
+
+def collector_scope(name):
+    """(extensions, exclude_dirs) of the files a collector reads; None extensions for every file."""
+    if name == "halstead":
+        from halstead_analysis import SOURCE_EXTENSIONS
+        return SOURCE_EXTENSIONS, DEFAULT_EXCLUDE_DIRS
+    if name == "info_flow":
+        from info_flow_complexity import MODULE_EXTENSIONS, EXCLUDED_DIRS
+        return MODULE_EXTENSIONS, EXCLUDED_DIRS
+    if name == "cocomo":
+        from COCOMO_estimation import COCOMOEstimator
+        estimator = COCOMOEstimator()
+        return (estimator.backend_extensions | estimator.frontend_extensions | estimator.database_extensions,
+                estimator.exclude_dirs)
+    if name == "radon":
+        return (".py",), DEFAULT_EXCLUDE_DIRS
+    if name == "js_complexity":
+        from js_complexity import JS_EXTENSIONS
+        return JS_EXTENSIONS, DEFAULT_EXCLUDE_DIRS
+    if name == "git":
+        return None, DEFAULT_EXCLUDE_DIRS
+    raise ValueError(f"Unknown collector: {name}")
+
+
+def corpus_volume(root, name):
+    """(files, bytes) a collector has to go through, scanned as the collector scans."""
+    extensions, exclude_dirs = collector_scope(name)
+    inventory = scan_tree(root, exclude_dirs=exclude_dirs, extensions=extensions)
+    return len(inventory), sum(entry.size for entry in inventory)
+
+
+# ---------------------------------------------------------------- workers
+
+def run_collector(name, root):
+    """Run one collector cold (no metrics cache) over a corpus."""
+    if name == "halstead":
+        from halstead_analysis import analyze_directory
+        analyze_directory(root)
+    elif name == "info_flow":
+        from info_flow_complexity import calculate_information_flow_metrics
+        calculate_information_flow_metrics(root)
+    elif name == "cocomo":
+        from COCOMO_estimation import COCOMOEstimator
+        estimator = COCOMOEstimator()
+        estimator.project_root = root
+        estimator.categorize_and_count()
+    elif name == "radon":
+        from collect_code_metrics import collect_radon_metrics
+        collect_radon_metrics(root)
+    elif name == "js_complexity":
+        from js_complexity import analyze_directory
+        analyze_directory(root)
+    elif name == "git":
+        from collect_process_metrics import iter_commit_stats
+        for _ in iter_commit_stats("HEAD", root):
+            pass
+    else:
+        raise ValueError(f"Unknown collector: {name}")
+
+
+def _max_rss_bytes():
+    """Peak resident set size of this process in bytes, or None if unknown."""
+    # ru_maxrss survives exec on Linux (it would include the benchmark parent), VmHWM does not
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def worker(name, root):
+    """Measure one collector run in this (fresh) process and print the result as JSON."""
+    baseline_rss = _max_rss_bytes()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        run_collector(name, root)
+        elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": elapsed, "peak_rss": _max_rss_bytes(), "baseline_rss": baseline_rss}))
+
+
+def measure(name, root):
+    """Run a collector in a separate process so peak RSS is its own."""
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", name, root],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{name} failed on {root}:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+# ---------------------------------------------------------------- suite
+
+def scaling_exponent(points):
+    """Least-squares slope of log(seconds) over log(LOC): ~1 is linear, ~2 quadratic."""
+    points = [(loc, seconds) for loc, seconds in points if loc > 0 and seconds > 0]
+    if len(points) < 2:
+        return None
+    xs = [math.log(loc) for loc, _ in points]
+    ys = [math.log(seconds) for _, seconds in points]
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    if spread == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+
+
+def _git_commit():
+    result = subprocess.run(["git", "-C", PROJECT_ROOT, "rev-parse", "HEAD"], capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def run_suite(sizes, collectors, repeat, corpus_dir, seed=0):
+    results = []
+    for target_loc in sizes:
+        root, loc = corpus_path(corpus_dir, target_loc, seed)
+        for name in collectors:
+            files, size = corpus_volume(root, name)
+            runs = [measure(name, root) for _ in range(repeat)]
+            seconds = statistics.median(run["seconds"] for run in runs)
+            peak_rss = max((run["peak_rss"] for run in runs if run["peak_rss"] is not None), default=None)
+            row = {
+                "collector": name,
+                "target_loc": target_loc,
+                "loc": loc,
+                "files": files,
+                "bytes": size,
+                "seconds": seconds,
+                "seconds_min": min(run["seconds"] for run in runs),
+                "files_per_s": files / seconds if seconds else None,
+                "mb_per_s": size / 1e6 / seconds if seconds else None,
+                "peak_rss_mb": peak_rss / 2**20 if peak_rss is not None else None,
+            }
+            results.append(row)
+            print("{:<13} {:>10,} {:>8,} {:>10.3f} {:>12.1f} {:>8.2f} {:>10}".format(
+                name, loc, files, seconds, row["files_per_s"] or 0, row["mb_per_s"] or 0,
+                f"{row['peak_rss_mb']:.1f}" if peak_rss is not None else "n/a"))
+
+    scaling = {
+        name: scaling_exponent([(row["loc"], row["seconds"]) for row in results if row["collector"] == name])
+        for name in collectors
+    }
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "corpus_version": CORPUS_VERSION,
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": results,
+        "scaling": scaling,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark how the metric collectors scale with project size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="corpus sizes in lines of code (default: 1k 10k 100k 1M)")
+    parser.add_argument("--collectors", nargs="+", choices=COLLECTORS, default=list(COLLECTORS))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per collector and size (median is reported)")
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "metrics-benchmark-corpora"),
+                        help="where generated corpora are kept between runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None, help=f"JSON results file (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--worker", nargs=2, metavar=("COLLECTOR", "CORPUS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(*args.worker)
+        return
+
+    os.makedirs(args.corpus_dir, exist_ok=True)
+    print("{:<13} {:>10} {:>8} {:>10} {:>12} {:>8} {:>10}".format(
+        "Collector", "LOC", "Files", "Seconds", "Files/s", "MB/s", "Peak MB"))
+    print("=" * 77)
+    report = run_suite(sorted(args.sizes), args.collectors, args.repeat, args.corpus_dir, args.seed)
+
+    print("\nScaling exponent (time ~ LOC^k):")
+    for name, exponent in report["scaling"].items():
+        print(f"  {name:<13} {'n/a' if exponent is None else f'{exponent:.2f}'}")
+
+    output = args.output or os.path.join(PROJECT_ROOT, DEFAULT_OUTPUT)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nBenchmark results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
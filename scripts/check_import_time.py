@@ -0,0 +1,99 @@
+import os
+import sys
+import argparse
+import subprocess
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+
+# Entry point -> (directory it is imported from, import-time budget in ms).
+# Budgets are a few times what they take on a developer laptop; they exist
+# to catch a heavy module creeping back into startup, not to benchmark.
+ENTRY_POINTS = {
+    "collect_metrics": (PROJECT_ROOT, 40),
+    "metrics_pipeline": (SCRIPT_DIR, 80),
+    "halstead_analysis": (SCRIPT_DIR, 50),
+    "COCOMO_estimation": (SCRIPT_DIR, 50),
+    "info_flow_complexity": (SCRIPT_DIR, 50),
+    "js_complexity": (SCRIPT_DIR, 50),
+    "halstead_rollup": (SCRIPT_DIR, 50),
+    "collect_code_metrics": (SCRIPT_DIR, 40),
+    "collect_process_metrics": (SCRIPT_DIR, 40),
+    "git_history_metrics": (SCRIPT_DIR, 80),
+    "metrics_history": (SCRIPT_DIR, 30),
+    "loc_counter": (SCRIPT_DIR, 30),
+    "feedback_collection": (SCRIPT_DIR, 30),
+    "feedback_analytics": (SCRIPT_DIR, 30),
+    "run_performance_test": (os.path.join(PROJECT_ROOT, "scripts8"), 40),
+    "run_load_test": (os.path.join(PROJECT_ROOT, "scripts8"), 40),
+    "run_tests": (os.path.join(PROJECT_ROOT, "scripts8"), 30),
+    "run_code_quality_analysis": (os.path.join(PROJECT_ROOT, "scripts8"), 30),
+}
+
+# Modules no entry point may import at startup: they load when their code path runs
+DEFERRED_MODULES = {
+    "pandas": "collect_metrics builds a DataFrame only in collect_metrics()",
+    "git": "git is run as a subprocess; GitPython is not needed",
+    "radon": "radon_engine imports radon on the first analysis",
+    "multiprocessing": "halstead_analysis starts a process pool only with -j",
+    "locust": "run_load_test runs Locust in a subprocess",
+}
+
+
+def measure_import(module, directory):
+    """(cumulative import time in ms, names of all modules imported) of one fresh import."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=directory, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    total = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        if not cumulative.strip().isdigit():
+            continue                                # the header line
+        imported.add(name)
+        if name == module:
+            total = int(cumulative) / 1000
+    return total, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when an entry point's import time exceeds its budget.")
+    parser.add_argument("modules", nargs="*", help="entry points to check (default: all)")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="imports per module; the fastest counts")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, for slow machines")
+    args = parser.parse_args()
+
+    failures = []
+    print("{:<28} {:>10} {:>10}  {}".format("Entry point", "Import ms", "Budget ms", "Status"))
+    print("=" * 62)
+    for module in args.modules or ENTRY_POINTS:
+        directory, budget = ENTRY_POINTS[module]
+        budget *= args.scale
+        runs = [measure_import(module, directory) for _ in range(args.repeat)]
+        elapsed = min(total for total, _ in runs)
+        deferred = sorted(name for name in runs[0][1] if name.split(".")[0] in DEFERRED_MODULES)
+        status = "ok"
+        if elapsed > budget:
+            status = "OVER BUDGET"
+            failures.append(f"{module}: {elapsed:.1f} ms > {budget:.0f} ms")
+        if deferred:
+            status = "HEAVY IMPORT"
+            for name in sorted({name.split(".")[0] for name in deferred}):
+                failures.append(f"{module} imports {name} at startup ({DEFERRED_MODULES[name]})")
+        print("{:<28} {:>10.1f} {:>10.0f}  {}".format(module, elapsed, budget, status))
+
+    if failures:
+        print(f"\nImport-time budget exceeded ({len(failures)}):")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nAll entry points within their import-time budgets.")
+
+
+if __name__ == "__main__":
+    main()
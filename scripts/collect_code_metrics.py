@@ -1,7 +1,11 @@
 import os
-import json
 import csv
-import subprocess
+
+from file_scanner import scan_tree
+from metrics_cache import open_cache
+from radon_engine import analyze_file, average_complexity
+from metrics_history import record_run
+from tracing import span
 
 # Set the folder where your source code is stored.
 # Change "src" to the appropriate folder if needed.
@@ -9,56 +13,75 @@ SOURCE_FOLDER = "public"
 OUTPUT_FOLDER = "metrics"
 OUTPUT_FILE = os.path.join(OUTPUT_FOLDER, "code_metrics.csv")
 
-def run_radon(command, target):
+def collect_radon_metrics(source_folder, cache=None):
     """
-    Runs a radon command (raw, cc, or mi) on the target folder/file.
-    Returns the parsed JSON output.
+    Returns {filename: {"raw": ..., "cc": ..., "mi": ...}} for every Python
+    file in the source folder, analyzed in-process (one parse per file).
     """
-    cmd = ["python", "-m", "radon", command, "-j", target]
-    try:
-        result = subprocess.check_output(cmd, universal_newlines=True)
-        return json.loads(result)
-    except subprocess.CalledProcessError as e:
-        print(f"Error running radon {command} on {target}: {e}")
-        return {}
-
-def main():
-    # Create output folder if it doesn't exist
-    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    with span("radon"):
+        with span("scan"):
+            inventory = scan_tree(source_folder, extensions=[".py"])
+        metrics = {}
+        with span("analyze", files=len(inventory)) as sp:
+            for entry in inventory:
+                filename = os.path.join(source_folder, entry.rel_path)
+                sp.count("bytes", entry.size)
+                metrics[filename] = analyze_file(filename, cache)
+                if "error" in metrics[filename]:
+                    sp.count("errors")
+                    print(f"Error analyzing {filename}: {metrics[filename]['error']}")
+    return metrics
 
-    # Run radon commands on the source folder
-    raw_metrics = run_radon("raw", SOURCE_FOLDER)
-    cc_metrics = run_radon("cc", SOURCE_FOLDER)
-    mi_metrics = run_radon("mi", SOURCE_FOLDER)
+def history_values(result):
+    """Per-file values kept in the metrics history for one radon result."""
+    raw_data = result["raw"]
+    return {
+        "radon.loc": raw_data.get("loc"),
+        "radon.lloc": raw_data.get("lloc"),
+        "radon.sloc": raw_data.get("sloc"),
+        "radon.comments": raw_data.get("comments"),
+        "radon.avg_cc": average_complexity(result["cc"]),
+        "radon.mi": result["mi"].get("mi"),
+    }
 
-    with open(OUTPUT_FILE, mode="w", newline="") as csvfile:
+def write_code_metrics(file_metrics, output_file=OUTPUT_FILE):
+    """Write the per-file radon summary CSV."""
+    with span("radon_write"), open(output_file, mode="w", newline="") as csvfile:
         writer = csv.writer(csvfile)
         writer.writerow(["filename", "loc", "lloc", "comments", "avg_cyclomatic_complexity", "maintainability_index"])
         
         # Loop through each file that radon analyzed (keys are file paths)
-        for filename in raw_metrics:
-            raw_data = raw_metrics.get(filename, {})
+        for filename, result in file_metrics.items():
+            raw_data = result["raw"]
             loc = raw_data.get("loc", "N/A")
             lloc = raw_data.get("lloc", "N/A")
             comments = raw_data.get("comments", "N/A")
             
             # Calculate average cyclomatic complexity for the file
-            cc_data = cc_metrics.get(filename, [])
-            if cc_data:
-                avg_cc = sum(item["complexity"] for item in cc_data) / len(cc_data)
-                avg_cc = round(avg_cc, 2)
-            else:
-                avg_cc = "N/A"
+            avg_cc = average_complexity(result["cc"])
+            avg_cc = "N/A" if avg_cc is None else round(avg_cc, 2)
             
             # Get maintainability index
-            mi_data = mi_metrics.get(filename, {})
+            mi_data = result["mi"]
             mi = mi_data.get("mi", "N/A")
             if mi != "N/A":
                 mi = round(mi, 2)
             
             writer.writerow([filename, loc, lloc, comments, avg_cc, mi])
     
-    print(f"Code metrics saved to {OUTPUT_FILE}")
+    print(f"Code metrics saved to {output_file}")
+
+def main():
+    # Create output folder if it doesn't exist
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+
+    # Analyze the source folder, reusing cached results for unchanged files
+    with open_cache(".") as cache:
+        file_metrics = collect_radon_metrics(SOURCE_FOLDER, cache)
+
+    write_code_metrics(file_metrics)
+
+    record_run(".", "radon", {filename: history_values(result) for filename, result in file_metrics.items()})
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
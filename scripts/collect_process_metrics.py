@@ -1,37 +1,218 @@
-import git
 import csv
 import os
+import json
+import argparse
+import subprocess
 from datetime import datetime
 
+from metrics_history import record_run
+from tracing import span
+
 OUTPUT_FOLDER = "metrics"
 OUTPUT_FILE = os.path.join(OUTPUT_FOLDER, "process_metrics.csv")
+# Remembers the last commit written to OUTPUT_FILE, so later runs only append new ones
+STATE_FILE = os.path.join(OUTPUT_FOLDER, "process_metrics_state.json")
+CSV_HEADER = ["commit_hash", "date", "author", "lines_added", "lines_deleted", "files_changed"]
+
+# NUL-prefixed header line per commit, followed by its --numstat lines
+LOG_FORMAT = "%x00%H%x00%ct%x00%an"
+
+
+def git_log_stream(args, repo_dir="."):
+    """Run a git log command and yield its output lines as they are produced."""
+    cmd = ["git", "-C", repo_dir, "log"] + list(args)
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, encoding="utf-8", errors="replace")
+    try:
+        yield from proc.stdout
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+
+def iter_commit_stats(rev_range, repo_dir="."):
+    """
+    Yield (hash, commit time, author, lines added, lines deleted, files changed)
+    for every commit in rev_range, oldest first, from a single streamed
+    `git log --numstat`. Merges are diffed against their first parent and
+    renames are not detected, matching GitPython's Commit.stats.
+    """
+    args = ["--reverse", "--numstat", "--no-renames", "--diff-merges=first-parent",
+            f"--format={LOG_FORMAT}", rev_range, "--"]
+    current = None
+    for line in git_log_stream(args, repo_dir):
+        if line.startswith("\0"):
+            if current is not None:
+                yield tuple(current)
+            _, commit_hash, committed, author = line.rstrip("\n").split("\0", 3)
+            current = [commit_hash, int(committed), author, 0, 0, 0]
+        elif current is not None and line.strip():
+            added, deleted, _ = line.split("\t", 2)
+            # Binary files report "-" for both counts
+            current[3] += int(added) if added != "-" else 0
+            current[4] += int(deleted) if deleted != "-" else 0
+            current[5] += 1
+    if current is not None:
+        yield tuple(current)
+
+
+def iter_commits(branch, repo_dir=".", first_parent=True):
+    """Yield (hash, commit time) of every commit on branch, oldest first."""
+    args = ["--reverse", "--format=%H %ct", branch, "--"]
+    if first_parent:
+        args.insert(0, "--first-parent")
+    for line in git_log_stream(args, repo_dir):
+        commit_hash, committed = line.split()
+        yield commit_hash, int(committed)
+
+
+def list_tree(commit, repo_dir="."):
+    """Return (path, blob id, size) of every regular file in a commit, without a checkout."""
+    cmd = ["git", "-C", repo_dir, "ls-tree", "-r", "-z", "--long", "--full-tree", commit]
+    output = subprocess.run(cmd, stdout=subprocess.PIPE, check=True).stdout
+    files = []
+    for record in output.split(b"\0"):
+        if not record:
+            continue
+        meta, path = record.split(b"\t", 1)
+        mode, kind, blob_id, size = meta.split()
+        # Skip submodules (commit), symlinks (120000) and anything else that is not a file
+        if kind != b"blob" or mode == b"120000":
+            continue
+        files.append((os.fsdecode(path), blob_id.decode(), int(size)))
+    return files
+
+
+class BlobReader:
+    """Read git objects by id through one long-running `git cat-file --batch` process."""
+
+    def __init__(self, repo_dir="."):
+        self.proc = subprocess.Popen(["git", "-C", repo_dir, "cat-file", "--batch"],
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def read(self, blob_id):
+        self.proc.stdin.write(blob_id.encode() + b"\n")
+        self.proc.stdin.flush()
+        header = self.proc.stdout.readline().split()
+        if len(header) < 3 or header[1] == b"missing":
+            raise KeyError(blob_id)
+        data = self.proc.stdout.read(int(header[2]))
+        self.proc.stdout.read(1)  # Trailing newline after the content
+        return data
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.stdout.close()
+        self.proc.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def is_ancestor(commit, branch, repo_dir="."):
+    """Return True if commit exists and is reachable from branch."""
+    result = subprocess.run(["git", "-C", repo_dir, "merge-base", "--is-ancestor", commit, branch],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return result.returncode == 0
+
+
+def load_state(state_file=STATE_FILE):
+    try:
+        with open(state_file, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, state_file=STATE_FILE):
+    with open(state_file, "w") as f:
+        json.dump(state, f, indent=2)
+
+
+def update_process_metrics(branch="main", full=False, repo_dir="."):
+    """
+    Bring the process metrics CSV of a repository up to date with branch.
+    Returns the number of commits written, or None if git history could not be read.
+    """
+    output_file = os.path.join(repo_dir, OUTPUT_FILE)
+    state_file = os.path.join(repo_dir, STATE_FILE)
 
-def main():
     # Create output folder if it doesn't exist
-    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-
-    # Open the current repository (assumes the script is run from the repo root)
-    repo = git.Repo(".")
-    
-    # Get commits from the main branch (adjust branch name if necessary)
-    commits = list(repo.iter_commits("main"))
-    
-    with open(OUTPUT_FILE, mode="w", newline="") as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(["commit_hash", "date", "author", "lines_added", "lines_deleted", "files_changed"])
-        
-        for commit in commits:
-            commit_hash = commit.hexsha
-            commit_date = datetime.fromtimestamp(commit.committed_date).strftime("%Y-%m-%d %H:%M:%S")
-            author = commit.author.name
-            stats = commit.stats.total
-            lines_added = stats.get("insertions", 0)
-            lines_deleted = stats.get("deletions", 0)
-            files_changed = stats.get("files", 0)
-            
-            writer.writerow([commit_hash, commit_date, author, lines_added, lines_deleted, files_changed])
-    
-    print(f"Process metrics saved to {OUTPUT_FILE}")
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+    # Continue from the last processed commit when the previous run covered the same branch
+    state = load_state(state_file)
+    last_commit = None
+    if not full and state.get("branch") == branch and os.path.exists(output_file):
+        last_commit = state.get("last_commit")
+    if last_commit and not is_ancestor(last_commit, branch, repo_dir):
+        print(f"{last_commit} is no longer on {branch}; rebuilding {output_file}")
+        last_commit = None
+
+    # Commits are written oldest first so new ones can be appended; a rebuild goes to a
+    # temporary file that replaces the CSV only once git has succeeded
+    rev_range = f"{last_commit}..{branch}" if last_commit else branch
+    target_file = output_file if last_commit else output_file + ".tmp"
+    written = 0
+    totals = {"process.commits": 0, "process.lines_added": 0, "process.lines_deleted": 0, "process.files_changed": 0}
+    try:
+        with open(target_file, mode="a" if last_commit else "w", newline="") as csvfile:
+            start_offset = csvfile.tell()
+            try:
+                writer = csv.writer(csvfile)
+                if not last_commit:
+                    writer.writerow(CSV_HEADER)
+                with span("process_git_log") as sp:
+                    for commit_hash, committed, author, added, deleted, files in iter_commit_stats(rev_range, repo_dir):
+                        commit_date = datetime.fromtimestamp(committed).strftime("%Y-%m-%d %H:%M:%S")
+                        writer.writerow([commit_hash, commit_date, author, added, deleted, files])
+                        last_commit = commit_hash
+                        written += 1
+                        totals["process.lines_added"] += added
+                        totals["process.lines_deleted"] += deleted
+                        totals["process.files_changed"] += files
+                    sp.count("commits", written)
+                    sp.count("files_changed", totals["process.files_changed"])
+            except BaseException:
+                # Drop a partial append (git failed, Ctrl+C, disk full) so the CSV matches the saved state
+                csvfile.truncate(start_offset)
+                raise
+    except BaseException as e:
+        if target_file != output_file and os.path.exists(target_file):
+            os.remove(target_file)
+        if isinstance(e, subprocess.CalledProcessError):
+            print(f"Error reading git history for {branch}: {e}")
+            return None
+        raise
+
+    if target_file != output_file:
+        # Cleared first, so a crash between the two writes forces a rebuild rather than a wrong append
+        save_state({}, state_file)
+        os.replace(target_file, output_file)
+    save_state({"branch": branch, "last_commit": last_commit}, state_file)
+    print(f"Process metrics saved to {OUTPUT_FILE} ({written} new commits)")
+    if not written:
+        return 0
+
+    # Project-level churn of the commits this run added
+    totals["process.commits"] = written
+    record_run(repo_dir, "process", run_values=totals)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect per-commit process metrics from git history.")
+    parser.add_argument("--branch", default="main", help="branch to walk (default: main)")
+    parser.add_argument("--full", action="store_true", help="rewrite the CSV from scratch")
+    args = parser.parse_args()
+
+    # Runs from the repository root
+    update_process_metrics(args.branch, args.full)
+
 
 if __name__ == "__main__":
     main()
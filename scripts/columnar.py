@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import mmap
+import struct
+from array import array
+
+# File layout: MAGIC, the header length (little-endian uint64), a JSON header,
+# then every column's raw values, each starting on an 8-byte boundary
+MAGIC = b"MCOLS\x00\x00\x01"
+ALIGNMENT = 8
+
+
+def _padding(position):
+    return -position % ALIGNMENT
+
+
+def write_columns(path, columns, strings=None, meta=None):
+    """
+    Write typed columns (name -> array.array) and string columns (name ->
+    list of str) to one file. A string column is stored as a dictionary:
+    the UTF-8 bytes of all its strings back to back, and their offsets.
+    Written atomically, so a reader never sees half a file.
+    """
+    blocks = []
+    for name, values in columns.items():
+        blocks.append((name, values.typecode, values))
+    for name, values in (strings or {}).items():
+        encoded = [value.encode("utf-8") for value in values]
+        offsets = [0]
+        for value in encoded:
+            offsets.append(offsets[-1] + len(value))
+        blocks.append((f"{name}.offsets", "q", array("q", offsets)))
+        blocks.append((f"{name}.data", "B", array("B", b"".join(encoded))))
+
+    # Column offsets are relative to the start of the data, which follows the header
+    header = {"byteorder": sys.byteorder, "strings": sorted(strings or {}), "meta": meta or {}, "columns": []}
+    position = 0
+    for name, typecode, values in blocks:
+        header["columns"].append({"name": name, "type": typecode, "offset": position, "count": len(values)})
+        position += len(values) * values.itemsize
+        position += _padding(position)
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    data_start = len(MAGIC) + 8 + len(header_bytes)
+    data_start += _padding(data_start)
+
+    temp_file = path + ".tmp"
+    with open(temp_file, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_start - f.tell()))
+        for name, typecode, values in blocks:
+            f.write(memoryview(values).cast("B"))
+            f.write(b"\0" * _padding(f.tell()))
+    os.replace(temp_file, path)
+
+
+class StringColumn:
+    """Strings stored as a dictionary; each is decoded when it is read."""
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+        self._index = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def index(self, value):
+        """Position of a string; the lookup table is built on first use."""
+        if self._index is None:
+            self._index = {string: i for i, string in enumerate(self)}
+        return self._index[value]
+
+
+class Columns:
+    """
+    Columns of a file written by write_columns, memory-mapped: opening it
+    reads only the header, and each column is a memoryview cast to its
+    type over the mapped pages, so values are paged in as they are used.
+    Use as a context manager, or call close() once done with the columns.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        self._views = [view]
+        if view[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a columnar metrics file")
+        header_length, = struct.unpack_from("<Q", self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        header = json.loads(bytes(view[header_start:header_start + header_length]))
+        if header["byteorder"] != sys.byteorder:
+            self.close()
+            raise ValueError(f"{path} was written on a {header['byteorder']}-endian machine")
+        data_start = header_start + header_length
+        data_start += _padding(data_start)
+
+        self.meta = header["meta"]
+        self.columns = {}
+        for column in header["columns"]:
+            start = data_start + column["offset"]
+            raw = view[start:start + column["count"] * struct.calcsize(column["type"])]
+            values = raw.cast(column["type"])
+            self._views.extend((raw, values))
+            self.columns[column["name"]] = values
+        self.strings = {name: StringColumn(self.columns[f"{name}.offsets"], self.columns[f"{name}.data"])
+                        for name in header["strings"]}
+
+    def __getitem__(self, name):
+        if name in self.strings:
+            return self.strings[name]
+        return self.columns[name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        # Views must be released before the mapping can be closed
+        self.columns = {}
+        self.strings = {}
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
@@ -0,0 +1,72 @@
+from array import array
+
+
+class DependencyGraph:
+    """
+    Directed module graph keyed by normalized path.
+
+    Nodes are numbered densely in insertion order and edges are kept as two
+    parallel integer arrays (source id, target id), so degrees and adjacency
+    lists are built in O(V + E) without per-node Python containers.
+    """
+
+    def __init__(self):
+        self.nodes = []              # node id -> normalized path
+        self.index = {}              # normalized path -> node id
+        self.sources = array("i")    # edge id -> source node id
+        self.targets = array("i")    # edge id -> target node id
+        self._edge_keys = set()      # (source << 32 | target) of every edge, to drop duplicates
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def edge_count(self):
+        return len(self.sources)
+
+    def add_node(self, path):
+        """Return the id of a path, registering it if it is new."""
+        node = self.index.get(path)
+        if node is None:
+            node = len(self.nodes)
+            self.nodes.append(path)
+            self.index[path] = node
+        return node
+
+    def add_edge(self, source, target):
+        """Add a source -> target edge; self-loops and duplicates are ignored."""
+        key = source << 32 | target
+        if source == target or key in self._edge_keys:
+            return False
+        self._edge_keys.add(key)
+        self.sources.append(source)
+        self.targets.append(target)
+        return True
+
+    def degrees(self):
+        """Return (fan_in, fan_out) arrays indexed by node id."""
+        fan_in = array("i", [0]) * len(self.nodes)
+        fan_out = array("i", [0]) * len(self.nodes)
+        for source, target in zip(self.sources, self.targets):
+            fan_out[source] += 1
+            fan_in[target] += 1
+        return fan_in, fan_out
+
+    def adjacency(self, reverse=False):
+        """
+        Return a CSR adjacency (offsets, neighbors): the neighbors of node i
+        are neighbors[offsets[i]:offsets[i + 1]], in edge insertion order.
+        With reverse=True the lists hold each node's dependents instead.
+        """
+        heads, tails = (self.targets, self.sources) if reverse else (self.sources, self.targets)
+        offsets = array("i", [0]) * (len(self.nodes) + 1)
+        for head in heads:
+            offsets[head + 1] += 1
+        for i in range(len(self.nodes)):
+            offsets[i + 1] += offsets[i]
+        fill = array("i", offsets[:-1])
+        neighbors = array("i", [0]) * len(heads)
+        for head, tail in zip(heads, tails):
+            neighbors[fill[head]] = tail
+            fill[head] += 1
+        return offsets, neighbors
@@ -0,0 +1,332 @@
+import os
+import json
+import math
+import argparse
+
+from feedback_log import FEEDBACK_LOG_DIR, PROJECT_ROOT, iter_records, list_segments, segment_number
+
+# Running aggregates and the log position they cover
+AGGREGATES_FILE = os.path.join(PROJECT_ROOT, "metrics", "feedback_aggregates.json")
+AGGREGATES_VERSION = 1
+
+RATINGS = range(1, 6)
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with a bounded relative error (DDSketch).
+
+    Positive values go into logarithmic buckets: value x lands in bucket
+    ceil(log_gamma(x)), gamma = (1 + a) / (1 - a), and every quantile is
+    answered within a relative error a of the true value. Two sketches
+    with the same accuracy merge by adding bucket counts, and the number
+    of buckets depends on the range of the values (about 800 for 1 ms to
+    3 hours at 1%), not on how many were added.
+    """
+
+    MIN_VALUE = 1e-9        # smaller values (and zero) are counted in their own bucket
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, count=1):
+        """Count a value; infinite and NaN values have no bucket and are ignored."""
+        if not math.isfinite(value):
+            return
+        if value > self.MIN_VALUE:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        else:
+            value = max(value, 0.0)
+            self.zeros += count
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same relative accuracy can be merged")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """Estimated q-quantile (0 <= q <= 1), or None for an empty sketch."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def to_dict(self):
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "buckets": {str(index): count for index, count in self.buckets.items()},
+            "zeros": self.zeros,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["relative_accuracy"])
+        sketch.buckets = {int(index): count for index, count in data["buckets"].items()}
+        sketch.zeros = data["zeros"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if sketch.count:
+            sketch.min, sketch.max = data["min"], data["max"]
+        return sketch
+
+
+def _duration(value):
+    """A usable time in seconds (a finite number > 0), or None."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and 0 < value < math.inf:
+        return value
+    return None
+
+
+class FeedbackAggregates:
+    """
+    Running feedback aggregates, updated one record at a time:
+    a rating histogram per role, a response-time sketch per prompt,
+    a session-time sketch, and per-day rollups (responses, rating
+    histogram, session time). Each query reads one aggregate, never
+    the feedback records themselves.
+    """
+
+    def __init__(self):
+        self.position = None                # (segment, offset) of the log read so far
+        self.records = 0
+        self.ratings = {}                   # role -> [count of rating 1 .. 5]
+        self.response_times = {}            # prompt -> QuantileSketch (seconds)
+        self.session_times = QuantileSketch()
+        self.daily = {}                     # "YYYY-MM-DD" -> rollup
+
+    def add(self, record):
+        """
+        Fold in one record. The log cannot be edited, so fields of the wrong
+        shape (and times that are not finite and positive) are skipped, not
+        raised on, or the aggregates could never read past that record.
+        """
+        self.records += 1
+        rating = record.get("rating")
+        if not isinstance(rating, int) or isinstance(rating, bool) or rating not in RATINGS:
+            rating = None
+        role = record.get("role")
+        if rating is not None:
+            self.ratings.setdefault(role if isinstance(role, str) and role else "Unknown", [0] * 5)[rating - 1] += 1
+
+        analytics = record.get("analytics")
+        if not isinstance(analytics, dict):
+            analytics = {}
+        total_time = _duration(analytics.get("total_time"))
+        if total_time is not None:
+            self.session_times.add(total_time)
+        interactions = analytics.get("interactions")
+        for interaction in interactions if isinstance(interactions, list) else ():
+            details = interaction.get("details") if isinstance(interaction, dict) else None
+            response_time = _duration(details.get("response_time")) if isinstance(details, dict) else None
+            if response_time is not None:
+                prompt = details.get("prompt")
+                prompt = prompt if isinstance(prompt, str) and prompt else "?"
+                sketch = self.response_times.get(prompt)
+                if sketch is None:
+                    sketch = self.response_times[prompt] = QuantileSketch()
+                sketch.add(response_time)
+
+        timestamp = record.get("timestamp")
+        day = (timestamp if isinstance(timestamp, str) else "")[:10] or "unknown"
+        rollup = self.daily.get(day)
+        if rollup is None:
+            rollup = self.daily[day] = {"responses": 0, "ratings": [0] * 5, "session_time": 0.0}
+        rollup["responses"] += 1
+        if rating is not None:
+            rollup["ratings"][rating - 1] += 1
+        if total_time is not None:
+            rollup["session_time"] += total_time
+
+    def merge(self, other):
+        """Fold in aggregates of other records (e.g. another log); positions are not merged."""
+        self.records += other.records
+        for role, counts in other.ratings.items():
+            mine = self.ratings.setdefault(role, [0] * 5)
+            for i, count in enumerate(counts):
+                mine[i] += count
+        for prompt, sketch in other.response_times.items():
+            if prompt in self.response_times:
+                self.response_times[prompt].merge(sketch)
+            else:
+                self.response_times[prompt] = QuantileSketch.from_dict(sketch.to_dict())
+        self.session_times.merge(other.session_times)
+        for day, rollup in other.daily.items():
+            mine = self.daily.setdefault(day, {"responses": 0, "ratings": [0] * 5, "session_time": 0.0})
+            mine["responses"] += rollup["responses"]
+            mine["ratings"] = [a + b for a, b in zip(mine["ratings"], rollup["ratings"])]
+            mine["session_time"] += rollup["session_time"]
+
+    def rating_histogram(self, role=None):
+        """Counts of ratings 1-5 for one role, or for everyone."""
+        if role is not None:
+            return list(self.ratings.get(role, [0] * 5))
+        return [sum(counts[i] for counts in self.ratings.values()) for i in range(5)]
+
+    def response_time(self, prompt, q):
+        sketch = self.response_times.get(prompt)
+        return sketch.quantile(q) if sketch is not None else None
+
+    def day(self, date):
+        return self.daily.get(date)
+
+    def to_dict(self):
+        return {
+            "version": AGGREGATES_VERSION,
+            "position": list(self.position) if self.position else None,
+            "records": self.records,
+            "ratings": self.ratings,
+            "response_times": {prompt: sketch.to_dict() for prompt, sketch in self.response_times.items()},
+            "session_times": self.session_times.to_dict(),
+            "daily": self.daily,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregates = cls()
+        aggregates.position = tuple(data["position"]) if data["position"] else None
+        aggregates.records = data["records"]
+        aggregates.ratings = data["ratings"]
+        aggregates.response_times = {prompt: QuantileSketch.from_dict(sketch)
+                                     for prompt, sketch in data["response_times"].items()}
+        aggregates.session_times = QuantileSketch.from_dict(data["session_times"])
+        aggregates.daily = data["daily"]
+        return aggregates
+
+
+def load_aggregates(state_file=AGGREGATES_FILE):
+    try:
+        with open(state_file) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return FeedbackAggregates()
+    if data.get("version") != AGGREGATES_VERSION:
+        return FeedbackAggregates()
+    return FeedbackAggregates.from_dict(data)
+
+
+def save_aggregates(aggregates, state_file=AGGREGATES_FILE):
+    os.makedirs(os.path.dirname(os.path.abspath(state_file)), exist_ok=True)
+    temp_file = state_file + ".tmp"
+    with open(temp_file, "w") as f:
+        json.dump(aggregates.to_dict(), f)
+    os.replace(temp_file, state_file)
+
+
+def _position_valid(log_dir, position):
+    """Whether the log still holds everything up to position (segments are never rewritten)."""
+    if position is None:
+        return True
+    number, offset = position
+    for path in list_segments(log_dir):
+        if segment_number(path) == number:
+            return os.path.getsize(path) >= offset
+    return False
+
+
+def update_aggregates(log_dir=FEEDBACK_LOG_DIR, state_file=AGGREGATES_FILE, rebuild=False):
+    """
+    Bring the saved aggregates up to date with the feedback log, reading only
+    the records appended since the last update. Returns (aggregates, new records).
+    """
+    aggregates = FeedbackAggregates() if rebuild else load_aggregates(state_file)
+    if not _position_valid(log_dir, aggregates.position):
+        print("Feedback log no longer matches the saved aggregates; rebuilding")
+        aggregates = FeedbackAggregates()
+    added = 0
+    for position, record in iter_records(log_dir, aggregates.position):
+        aggregates.add(record)
+        aggregates.position = position
+        added += 1
+    if added or rebuild:
+        save_aggregates(aggregates, state_file)
+    return aggregates, added
+
+
+def format_seconds(value):
+    return f"{value:.2f}s" if value is not None else "-"
+
+
+def print_report(aggregates, days=7):
+    print(f"\nFeedback records: {aggregates.records:,}")
+
+    print("\n{:<16} {:>8} {:>6} {:>6} {:>6} {:>6} {:>6} {:>7}".format("Role", "Total", "1", "2", "3", "4", "5", "Mean"))
+    print("=" * 68)
+    for role in sorted(aggregates.ratings):
+        counts = aggregates.rating_histogram(role)
+        total = sum(counts)
+        mean = sum(r * c for r, c in zip(RATINGS, counts)) / total if total else 0
+        print("{:<16} {:>8} {:>6} {:>6} {:>6} {:>6} {:>6} {:>7.2f}".format(role[:16], total, *counts, mean))
+
+    labels = [f"p{round(q * 100)}" for q in PERCENTILES]
+    print("\n{:<36} {:>8} {:>9} {:>9} {:>9}".format("Prompt response time", "Count", *labels))
+    print("=" * 75)
+    for prompt in sorted(aggregates.response_times):
+        sketch = aggregates.response_times[prompt]
+        print("{:<36} {:>8} {:>9} {:>9} {:>9}".format(
+            prompt[:36], sketch.count, *(format_seconds(sketch.quantile(q)) for q in PERCENTILES)))
+    session = aggregates.session_times
+    print("{:<36} {:>8} {:>9} {:>9} {:>9}".format(
+        "(whole session)", session.count, *(format_seconds(session.quantile(q)) for q in PERCENTILES)))
+
+    print(f"\n{'Day':<12} {'Responses':>10} {'Mean rating':>12} {'Mean session':>13}")
+    print("=" * 50)
+    for day in sorted(aggregates.daily)[-days:]:
+        rollup = aggregates.daily[day]
+        rated = sum(rollup["ratings"])
+        mean_rating = sum(r * c for r, c in zip(RATINGS, rollup["ratings"])) / rated if rated else 0
+        print(f"{day:<12} {rollup['responses']:>10} {mean_rating:>12.2f} "
+              f"{format_seconds(rollup['session_time'] / rollup['responses']):>13}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally aggregate the feedback log and report on it.")
+    parser.add_argument("--log-dir", default=FEEDBACK_LOG_DIR)
+    parser.add_argument("--state-file", default=AGGREGATES_FILE)
+    parser.add_argument("--rebuild", action="store_true", help="recompute from the start of the log")
+    parser.add_argument("--days", type=int, default=7, help="daily rollups to show (default: 7)")
+    args = parser.parse_args()
+
+    aggregates, added = update_aggregates(args.log_dir, args.state_file, args.rebuild)
+    print(f"Read {added:,} new feedback records from {args.log_dir}")
+    print_report(aggregates, args.days)
+
+
+if __name__ == "__main__":
+    main()
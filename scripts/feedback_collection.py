@@ -1,26 +1,163 @@
 #!/usr/bin/env python3
 """
 Feedback Collection Script for Primary School Homework Portal
-This script collects user feedback via terminal input and stores it in a text file.
+This script collects user feedback via terminal input, or imports it in bulk
+from JSONL exports, and appends it to the feedback log (metrics/feedback/).
+Feedback saved before the log existed is imported once with --import-legacy.
 """
 
 import os
+import sys
+import math
 import time
 import datetime
 import json
+import argparse
 from pathlib import Path
 
+from feedback_log import FeedbackLog
+
+ROLES = ["Teacher", "Parent", "Administrator", "Student"]
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def validate_feedback(record):
+    """
+    Check one feedback record and return it normalized; raises ValueError.
+    A missing timestamp is set to now and missing analytics to an empty log.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("feedback must be a JSON object")
+    for field in ("name", "email", "role", "comments"):
+        if not isinstance(record.get(field), str):
+            raise ValueError(f"{field!r} must be a string")
+    rating = record.get("rating")
+    if isinstance(rating, str) and rating.strip().isdigit():
+        rating = int(rating)
+    if not isinstance(rating, int) or isinstance(rating, bool) or not 1 <= rating <= 5:
+        raise ValueError("'rating' must be an integer from 1 to 5")
+    timestamp = record.get("timestamp")
+    if timestamp is None:
+        timestamp = datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
+    elif not isinstance(timestamp, str):
+        raise ValueError("'timestamp' must be a string")
+    analytics = record.get("analytics")
+    if analytics is None:
+        analytics = {"total_time": 0.0, "interactions": []}
+    else:
+        validate_analytics(analytics)
+    return dict(record, timestamp=timestamp, rating=rating, analytics=analytics)
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _check_finite(values, field):
+    """Raise ValueError if a number among the values of a dict is infinite or NaN."""
+    for key, value in values.items():
+        if isinstance(value, float) and not math.isfinite(value):
+            raise ValueError(f"'{field}.{key}' must be a finite number")
+
+def validate_analytics(analytics):
+    """
+    Check the analytics of a feedback record; raises ValueError. The log is
+    append-only, so anything the aggregates could not use is refused here:
+    total_time must be a finite number >= 0 and interactions a list of
+    objects whose numbers (and those of their details) are finite.
+    """
+    if not isinstance(analytics, dict):
+        raise ValueError("'analytics' must be an object")
+    total_time = analytics.get("total_time")
+    if not _is_number(total_time) or not math.isfinite(total_time) or total_time < 0:
+        raise ValueError("'analytics.total_time' must be a finite number >= 0")
+    interactions = analytics.get("interactions")
+    if not isinstance(interactions, list):
+        raise ValueError("'analytics.interactions' must be a list")
+    for interaction in interactions:
+        if not isinstance(interaction, dict):
+            raise ValueError("'analytics.interactions' must only hold objects")
+        _check_finite(interaction, "analytics.interactions")
+        details = interaction.get("details")
+        if isinstance(details, dict):
+            _check_finite(details, "analytics.interactions.details")
+
+def import_feedback(lines, log):
+    """
+    Validate JSONL feedback lines (bytes, decoded as UTF-8 by json.loads, or
+    str) and append them to the log in batches. Returns (accepted, rejected);
+    rejected lines, including ones that are not valid UTF-8, are reported
+    with their number.
+    """
+    accepted = rejected = 0
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            log.append(validate_feedback(json.loads(line)))
+        except ValueError as e:
+            rejected += 1
+            print(f"Line {number}: skipped ({e})", file=sys.stderr)
+            continue
+        accepted += 1
+    log.flush()
+    return accepted, rejected
+
+def import_legacy(log, metrics_dir):
+    """
+    One-time import of the feedback saved before the log existed. Each
+    metrics/analytics_*.json holds one full record (or a list of them);
+    user_feedback.txt repeats the same entries as text, without analytics,
+    so it is not imported. Imported files are listed in legacy_imported.txt
+    in the log directory and skipped on later runs.
+    Returns (accepted, rejected).
+    """
+    marker = os.path.join(log.log_dir, "legacy_imported.txt")
+    try:
+        with open(marker, encoding="utf-8") as f:
+            done = set(f.read().split())
+    except FileNotFoundError:
+        done = set()
+    accepted = rejected = 0
+    imported = []
+    for path in sorted(Path(metrics_dir).glob("analytics_*.json")):
+        if path.name in done:
+            continue
+        try:
+            with open(path, "rb") as f:
+                records = json.load(f)
+        except ValueError as e:
+            rejected += 1
+            print(f"{path.name}: skipped ({e})", file=sys.stderr)
+            continue
+        if not isinstance(records, list):
+            records = [records]
+        for number, record in enumerate(records, 1):
+            try:
+                log.append(validate_feedback(record))
+            except ValueError as e:
+                rejected += 1
+                print(f"{path.name} record {number}: skipped ({e})", file=sys.stderr)
+                continue
+            accepted += 1
+        imported.append(path.name)
+    log.flush()
+    # Listed only once their records are on disk
+    with open(marker, "a", encoding="utf-8") as f:
+        for name in imported:
+            f.write(name + "\n")
+    return accepted, rejected
+
 class FeedbackCollector:
-    def __init__(self):
+    def __init__(self, log=None):
         # Set up paths
         self.script_dir = Path(os.path.dirname(os.path.abspath(__file__)))
         self.project_root = self.script_dir.parent
         self.metrics_dir = self.project_root / "metrics"
-        self.feedback_file = self.metrics_dir / "user_feedback.txt"
         
         # Create metrics directory if it doesn't exist
         os.makedirs(self.metrics_dir, exist_ok=True)
         
+        # Append-only feedback log shared by interactive and bulk submissions
+        self.log = log or FeedbackLog(str(self.metrics_dir / "feedback"))
+        
         # Analytics data
         self.start_time = time.time()
         self.interaction_log = []
@@ -89,7 +226,7 @@ class FeedbackCollector:
         name = self.get_input("Please enter your name:")
         email = self.get_input("Please enter your email address:")
         role = self.get_input("Please select your role:", 
-                             options=["Teacher", "Parent", "Administrator", "Student"])
+                             options=ROLES)
         
         print("\nOn a scale of 1-5, how would you rate your experience with the portal?")
         print("(1 = Very Poor, 2 = Poor, 3 = Average, 4 = Good, 5 = Excellent)")
@@ -100,7 +237,7 @@ class FeedbackCollector:
         
         # Create feedback data
         feedback_data = {
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "timestamp": datetime.datetime.now().strftime(TIMESTAMP_FORMAT),
             "name": name,
             "email": email,
             "role": role,
@@ -115,35 +252,64 @@ class FeedbackCollector:
         return feedback_data
     
     def save_feedback(self, feedback_data):
-        """Save feedback to file"""
+        """Append feedback to the log and sync it to disk"""
         try:
-            # Create the file if it doesn't exist
-            if not os.path.exists(self.feedback_file):
-                with open(self.feedback_file, 'w') as f:
-                    f.write("# Primary School Homework Portal - User Feedback Log\n\n")
-            
-            # Append the new feedback
-            with open(self.feedback_file, 'a') as f:
-                f.write(f"\n--- Feedback Entry: {feedback_data['timestamp']} ---\n")
-                f.write(f"Name: {feedback_data['name']}\n")
-                f.write(f"Email: {feedback_data['email']}\n")
-                f.write(f"Role: {feedback_data['role']}\n")
-                f.write(f"Rating: {feedback_data['rating']}/5\n")
-                f.write(f"Comments: {feedback_data['comments']}\n")
-                f.write(f"Session Duration: {feedback_data['analytics']['total_time']:.2f} seconds\n")
-                
-            # Save detailed analytics to a separate JSON file
-            analytics_file = self.metrics_dir / f"analytics_{int(time.time())}.json"
-            with open(analytics_file, 'w') as f:
-                json.dump(feedback_data, f, indent=2)
-                
+            self.log.append(validate_feedback(feedback_data))
+            self.log.flush()
             return True
         except Exception as e:
             print(f"Error saving feedback: {e}")
             return False
+    
+    def submit(self, name, email, role, rating, comments, analytics=None):
+        """Record feedback without prompting; returns True once it is on disk"""
+        return self.save_feedback({
+            "name": name,
+            "email": email,
+            "role": role,
+            "rating": rating,
+            "comments": comments,
+            "analytics": analytics,
+        })
+
+def bulk_import(collector, source):
+    """Import a JSONL export (a path, or "-" for stdin) into the feedback log"""
+    start = time.perf_counter()
+    with collector.log:
+        # Read as bytes so a line that is not valid UTF-8 is rejected on its own
+        if source == "-":
+            accepted, rejected = import_feedback(sys.stdin.buffer, collector.log)
+        else:
+            with open(source, "rb") as f:
+                accepted, rejected = import_feedback(f, collector.log)
+    elapsed = time.perf_counter() - start
+    rate = accepted / elapsed if elapsed else 0
+    print(f"Imported {accepted:,} feedback records ({rejected:,} rejected) in {elapsed:.2f}s "
+          f"({rate:,.0f} records/s) into {collector.log.log_dir}")
+    return 1 if rejected else 0
+
+def legacy_import(collector):
+    """Import the analytics_*.json files of the old text log into the feedback log"""
+    with collector.log:
+        accepted, rejected = import_legacy(collector.log, collector.metrics_dir)
+    print(f"Imported {accepted:,} legacy feedback records ({rejected:,} rejected) into {collector.log.log_dir}")
+    return 1 if rejected else 0
 
 def main():
-    feedback_collector = FeedbackCollector()
+    parser = argparse.ArgumentParser(description="Collect homework portal feedback.")
+    parser.add_argument("--import", dest="import_file", metavar="FILE",
+                        help="bulk-import feedback records from a JSONL file (- for stdin) instead of prompting")
+    parser.add_argument("--import-legacy", action="store_true",
+                        help="import the metrics/analytics_*.json files written before the feedback log (once)")
+    parser.add_argument("--log-dir", help="feedback log directory (default: metrics/feedback)")
+    args = parser.parse_args()
+    
+    feedback_collector = FeedbackCollector(FeedbackLog(args.log_dir) if args.log_dir else None)
+    
+    if args.import_file:
+        sys.exit(bulk_import(feedback_collector, args.import_file))
+    if args.import_legacy:
+        sys.exit(legacy_import(feedback_collector))
     
     try:
         feedback_data = feedback_collector.collect_feedback()
@@ -163,6 +329,8 @@ def main():
         print("\n\nFeedback collection cancelled. Thank you for your time!")
     except Exception as e:
         print(f"\n\nAn unexpected error occurred: {e}")
+    finally:
+        feedback_collector.log.close()
     
     print("\nPress Enter to exit...")
     input()
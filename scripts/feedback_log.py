@@ -0,0 +1,182 @@
+import os
+import re
+import sys
+import json
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Feedback records, one JSON object per line, split over numbered segment files
+FEEDBACK_LOG_DIR = os.path.join(PROJECT_ROOT, "metrics", "feedback")
+SEGMENT_PATTERN = re.compile(r"^feedback-(\d{6})\.jsonl$")
+# Held by the one process writing to a log while it has a segment open
+LOCK_FILE = "writer.lock"
+
+# A segment is closed and a new one started once it grows past this size
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+# Records buffered before one write() and fsync() of the whole batch
+DEFAULT_BATCH_RECORDS = 1000
+
+
+def segment_name(number):
+    return f"feedback-{number:06d}.jsonl"
+
+
+def segment_number(path):
+    return int(SEGMENT_PATTERN.match(os.path.basename(path)).group(1))
+
+
+def list_segments(log_dir):
+    """Segment file paths of a log, oldest first."""
+    try:
+        names = os.listdir(log_dir)
+    except FileNotFoundError:
+        return []
+    numbered = sorted((int(m.group(1)), name) for name in names for m in [SEGMENT_PATTERN.match(name)] if m)
+    return [os.path.join(log_dir, name) for _, name in numbered]
+
+
+def _repair_tail(path):
+    """Drop a partial last line left by a crash mid-write, so appends start on a fresh line."""
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Walk back to the last complete line
+        position = size
+        while position > 0:
+            step = min(65536, position)
+            f.seek(position - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                f.truncate(position - step + newline + 1)
+                return
+            position -= step
+        f.truncate(0)
+
+
+class FeedbackLog:
+    """
+    Append-only JSONL log of feedback records.
+
+    Records are buffered and written batch_records at a time with a single
+    write() followed by fsync(), so a bulk import costs one sync per batch
+    instead of one per record; flush() forces the pending batch out.
+    Segments rotate at segment_bytes and are never rewritten, except that
+    a torn last line from a crash is cut off when the log is reopened.
+    One writer process at a time: a writer holds an exclusive lock on the
+    log from its first write until close(), and another one (a bulk import
+    while the form is in use) waits for it before touching any segment.
+    """
+
+    def __init__(self, log_dir=FEEDBACK_LOG_DIR, segment_bytes=DEFAULT_SEGMENT_BYTES,
+                 batch_records=DEFAULT_BATCH_RECORDS):
+        self.log_dir = log_dir
+        self.segment_bytes = segment_bytes
+        self.batch_records = batch_records
+        self._pending = []
+        self._fd = None
+        self._lock = None
+        self._segment = 0
+        self._size = 0
+        self.appended = 0
+        os.makedirs(log_dir, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _open_segment(self, number):
+        path = os.path.join(self.log_dir, segment_name(number))
+        if os.path.exists(path):
+            _repair_tail(path)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._segment = number
+        self._size = os.fstat(self._fd).st_size
+
+    def _acquire(self):
+        self._lock = open(os.path.join(self.log_dir, LOCK_FILE), "w")
+        if fcntl is None:
+            return
+        try:
+            fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            print(f"Waiting for another process writing to {self.log_dir}...", file=sys.stderr)
+            fcntl.flock(self._lock, fcntl.LOCK_EX)
+
+    def _open(self):
+        # The tail is only repaired under the lock, so it is never a line another writer is writing
+        self._acquire()
+        segments = list_segments(self.log_dir)
+        last = segment_number(segments[-1]) if segments else 1
+        self._open_segment(last)
+
+    def append(self, record):
+        """Queue one record (a JSON-serializable dict); it is written with its batch."""
+        self._pending.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        if len(self._pending) >= self.batch_records:
+            self.flush()
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def flush(self):
+        """Write and fsync the pending records."""
+        if not self._pending:
+            return
+        if self._fd is None:
+            self._open()
+        if self._size >= self.segment_bytes:
+            os.close(self._fd)
+            self._open_segment(self._segment + 1)
+        data = ("\n".join(self._pending) + "\n").encode("utf-8")
+        view = memoryview(data)
+        while view:
+            written = os.write(self._fd, view)
+            view = view[written:]
+        os.fsync(self._fd)
+        self._size += len(data)
+        self.appended += len(self._pending)
+        self._pending = []
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            if self._lock is not None:
+                self._lock.close()
+                self._lock = None
+
+
+def iter_records(log_dir=FEEDBACK_LOG_DIR, position=None):
+    """
+    Yield (position, record) for every record of a log in append order,
+    starting after position, a (segment number, byte offset) pair as
+    yielded for an earlier record. A torn last line is skipped.
+    """
+    start_segment, offset = position or (0, 0)
+    for path in list_segments(log_dir):
+        number = segment_number(path)
+        if number < start_segment:
+            continue
+        with open(path, "rb") as f:
+            end = f.seek(offset if number == start_segment else 0)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                end += len(line)
+                yield (number, end), json.loads(line)
@@ -0,0 +1,320 @@
+import os
+import re
+import zlib
+from typing import NamedTuple
+
+# Directories that are never descended into, matched on the exact directory name
+DEFAULT_EXCLUDE_DIRS = {'node_modules', '.git', '__pycache__', 'dist', 'build'}
+
+# Top-level folders that hold the frontend (templates and static assets)
+FRONTEND_DIRS = {'public', 'views'}
+BACKEND_EXTENSIONS = {'.js'}
+DATABASE_EXTENSIONS = {'.sql'}
+
+
+def shard_of(rel_path, shard_count):
+    """
+    The shard (0 .. shard_count - 1) a file belongs to. A CRC of the relative
+    path, unlike hash(), is the same in every process and on every host.
+    """
+    return zlib.crc32(rel_path.encode("utf-8")) % shard_count
+
+
+class FileEntry(NamedTuple):
+    path: str        # Absolute path of the file
+    rel_path: str    # Path relative to the scan root, always with "/" separators
+    extension: str   # Lower-cased extension including the dot ("" if none)
+    size: int        # Size in bytes
+    mtime: float     # Last modification time (seconds since the epoch)
+    category: str    # "frontend", "backend", "database" or "other"
+
+
+def categorize(rel_path, extension):
+    """Classify a file by where it lives in the project and its extension."""
+    if extension in DATABASE_EXTENSIONS:
+        return "database"
+    parts = rel_path.lower().split("/")[:-1]
+    if any(part in FRONTEND_DIRS for part in parts):
+        return "frontend"
+    if extension in BACKEND_EXTENSIONS:
+        return "backend"
+    return "other"
+
+
+def _glob_to_regex(pattern):
+    """Translate a gitignore glob into a regular expression body."""
+    regex = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex.append("/.*")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            regex.append("[^/]*")
+        elif c == "?":
+            regex.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        elif c == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex.append(re.escape(pattern[i]))
+        else:
+            regex.append(re.escape(c))
+        i += 1
+    return "".join(regex)
+
+
+class IgnoreRule(NamedTuple):
+    base: str        # Directory (relative to the scan root) holding the .gitignore
+    regex: re.Pattern
+    negate: bool
+    dir_only: bool
+    anchored: bool
+
+
+def parse_gitignore(text, base=""):
+    """Parse the contents of a .gitignore file into a list of IgnoreRules."""
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # A slash anywhere but the end anchors the pattern to the .gitignore directory
+        anchored = "/" in line
+        line = line.lstrip("/")
+        regex = re.compile("^" + _glob_to_regex(line) + "$")
+        rules.append(IgnoreRule(base, regex, negate, dir_only, anchored))
+    return rules
+
+
+def is_ignored(rel_path, is_dir, rules):
+    """Apply gitignore rules to a path; the last matching rule wins."""
+    ignored = False
+    name = rel_path.rsplit("/", 1)[-1]
+    for rule in rules:
+        if rule.dir_only and not is_dir:
+            continue
+        if rule.base:
+            if not rel_path.startswith(rule.base + "/"):
+                continue
+            local = rel_path[len(rule.base) + 1:]
+        else:
+            local = rel_path
+        target = local if rule.anchored else name
+        if rule.regex.match(target):
+            ignored = not rule.negate
+    return ignored
+
+
+def read_gitignore(directory, rel_dir=""):
+    """Parse the .gitignore of a directory, if it has one."""
+    gitignore = os.path.join(directory, ".gitignore")
+    if not os.path.isfile(gitignore):
+        return []
+    try:
+        with open(gitignore, "r", encoding="utf-8", errors="ignore") as f:
+            return parse_gitignore(f.read(), rel_dir)
+    except OSError as e:
+        print(f"Error reading {gitignore}: {e}")
+        return []
+
+
+class FileInventory:
+    """The result of a single scan of a project tree."""
+
+    def __init__(self, root, entries):
+        self.root = root
+        self.entries = entries
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def with_extensions(self, extensions):
+        """Return the entries whose extension is in the given collection."""
+        extensions = {ext.lower() for ext in extensions}
+        return [entry for entry in self.entries if entry.extension in extensions]
+
+    def in_category(self, category):
+        """Return the entries of one category (frontend, backend, ...)."""
+        return [entry for entry in self.entries if entry.category == category]
+
+    def excluding(self, exclude_dirs):
+        """Return the inventory a scan that also pruned these directory names would have produced."""
+        exclude_dirs = set(exclude_dirs)
+        entries = [entry for entry in self.entries
+                   if not any(part in exclude_dirs for part in entry.rel_path.split("/")[:-1])]
+        return FileInventory(self.root, entries)
+
+    def shard(self, index, shard_count):
+        """Return the inventory of one shard (see shard_of), entries in scan order."""
+        entries = [entry for entry in self.entries if shard_of(entry.rel_path, shard_count) == index]
+        return FileInventory(self.root, entries)
+
+    def paths(self, extensions=None):
+        """Return absolute file paths, optionally filtered by extension."""
+        entries = self.entries if extensions is None else self.with_extensions(extensions)
+        return [entry.path for entry in entries]
+
+
+def scan_tree(root, exclude_dirs=None, extensions=None, use_gitignore=True):
+    """
+    Walk a project tree exactly once and return a FileInventory.
+
+    Excluded directories (matched by exact name) and paths ignored by any
+    .gitignore on the way down are pruned before they are descended into.
+    Entries are returned in a stable, sorted order.
+    """
+    root = os.path.abspath(root)
+    exclude_dirs = DEFAULT_EXCLUDE_DIRS if exclude_dirs is None else set(exclude_dirs)
+    if extensions is not None:
+        extensions = {ext.lower() for ext in extensions}
+
+    entries = []
+    # Each stack item: (absolute dir, relative dir, gitignore rules in effect)
+    stack = [(root, "", [])]
+    while stack:
+        directory, rel_dir, rules = stack.pop()
+
+        if use_gitignore:
+            rules = rules + read_gitignore(directory, rel_dir)
+
+        try:
+            with os.scandir(directory) as it:
+                children = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            print(f"Error scanning {directory}: {e}")
+            continue
+
+        subdirs = []
+        for child in children:
+            rel_path = f"{rel_dir}/{child.name}" if rel_dir else child.name
+            try:
+                if child.is_dir(follow_symlinks=False):
+                    if child.name in exclude_dirs:
+                        continue
+                    if rules and is_ignored(rel_path, True, rules):
+                        continue
+                    subdirs.append((child.path, rel_path, rules))
+                    continue
+                if not child.is_file():
+                    continue
+            except OSError:
+                continue
+
+            extension = os.path.splitext(child.name)[1].lower()
+            if extensions is not None and extension not in extensions:
+                continue
+            if rules and is_ignored(rel_path, False, rules):
+                continue
+            try:
+                stat = child.stat()
+            except OSError as e:
+                print(f"Error reading {child.path}: {e}")
+                continue
+            entries.append(FileEntry(
+                child.path, rel_path, extension, stat.st_size, stat.st_mtime,
+                categorize(rel_path, extension)
+            ))
+
+        # Push in reverse so directories are visited in sorted order
+        stack.extend(reversed(subdirs))
+
+    return FileInventory(root, entries)
+
+
+def stat_entry(root, rel_path):
+    """Build the FileEntry of one file, or return None if it is not a regular file."""
+    path = os.path.join(os.path.abspath(root), *rel_path.split("/"))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if not os.path.isfile(path):
+        return None
+    extension = os.path.splitext(rel_path)[1].lower()
+    return FileEntry(path, rel_path, extension, stat.st_size, stat.st_mtime,
+                     categorize(rel_path, extension))
+
+
+class PathFilter:
+    """
+    Answers, for a single path, whether scan_tree would include it with the
+    same exclude, extension and .gitignore settings. Used to check paths
+    reported by a file watcher without rescanning the tree.
+    """
+
+    def __init__(self, root, exclude_dirs=None, extensions=None, use_gitignore=True):
+        self.root = os.path.abspath(root)
+        self.exclude_dirs = DEFAULT_EXCLUDE_DIRS if exclude_dirs is None else set(exclude_dirs)
+        self.extensions = None if extensions is None else {ext.lower() for ext in extensions}
+        self.use_gitignore = use_gitignore
+        self._rules = {}   # relative dir -> gitignore rules in effect inside it
+
+    def rules_for(self, rel_dir):
+        """Gitignore rules in effect inside a directory (relative to the root)."""
+        rules = self._rules.get(rel_dir)
+        if rules is None:
+            parent = self.rules_for(rel_dir.rsplit("/", 1)[0] if "/" in rel_dir else "") if rel_dir else []
+            own = read_gitignore(os.path.join(self.root, *rel_dir.split("/")), rel_dir) if self.use_gitignore else []
+            rules = parent + own
+            self._rules[rel_dir] = rules
+        return rules
+
+    def includes_dir(self, rel_dir):
+        """True if scan_tree would descend into this directory."""
+        if not rel_dir:
+            return True
+        parts = rel_dir.split("/")
+        for depth in range(1, len(parts) + 1):
+            if parts[depth - 1] in self.exclude_dirs:
+                return False
+            prefix = "/".join(parts[:depth])
+            rules = self.rules_for("/".join(parts[:depth - 1]))
+            if rules and is_ignored(prefix, True, rules):
+                return False
+        return True
+
+    def includes(self, rel_path):
+        """True if scan_tree would list this file (it need not exist)."""
+        rel_dir, _, name = rel_path.rpartition("/")
+        extension = os.path.splitext(name)[1].lower()
+        if self.extensions is not None and extension not in self.extensions:
+            return False
+        if not self.includes_dir(rel_dir):
+            return False
+        rules = self.rules_for(rel_dir)
+        return not (rules and is_ignored(rel_path, False, rules))
+
+    def invalidate(self):
+        """Forget cached .gitignore rules (after a .gitignore changed)."""
+        self._rules.clear()
@@ -0,0 +1,213 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+
+from file_scanner import PathFilter, scan_tree
+
+# inotify event flags (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+EVENT_HEADER = struct.Struct("iIII")   # wd, mask, cookie, name length
+
+
+def _snapshot(root, exclude_dirs, extensions):
+    """Map each in-scope file to (size, mtime) from one scan of the tree."""
+    inventory = scan_tree(root, exclude_dirs=exclude_dirs, extensions=extensions)
+    return {entry.rel_path: (entry.size, entry.mtime) for entry in inventory}
+
+
+def _diff(old, new):
+    """Relative paths that were created, deleted or modified between two snapshots."""
+    changed = {path for path, state in new.items() if old.get(path) != state}
+    changed.update(path for path in old if path not in new)
+    return changed
+
+
+def _load_libc():
+    """Return libc with the inotify calls, or None where inotify is unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    import ctypes.util      # only needed in watch mode; it pulls in subprocess and shutil
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def poll_changes(root, exclude_dirs=None, extensions=None, interval=1.0):
+    """Yield sets of changed relative paths by rescanning the tree every interval seconds."""
+    known = _snapshot(root, exclude_dirs, extensions)
+    while True:
+        time.sleep(interval)
+        current = _snapshot(root, exclude_dirs, extensions)
+        changed = _diff(known, current)
+        known = current
+        if changed:
+            yield changed
+
+
+class InotifyWatcher:
+    """Recursive inotify watch over every directory scan_tree would descend into."""
+
+    def __init__(self, libc, root, exclude_dirs=None, extensions=None, debounce=0.05):
+        self.libc = libc
+        self.root = os.path.abspath(root)
+        self.exclude_dirs = exclude_dirs
+        self.extensions = extensions
+        self.debounce = debounce
+        self.filter = PathFilter(root, exclude_dirs, extensions)
+        self.dirs = {}    # watch descriptor -> relative dir
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.known = _snapshot(root, exclude_dirs, extensions)
+        self._watch_tree("")
+
+    def close(self):
+        os.close(self.fd)
+
+    def _watch_tree(self, rel_dir):
+        """Add watches for a directory and every included directory below it."""
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            path = os.path.join(self.root, *current.split("/")) if current else self.root
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == errno.ENOSPC:
+                    raise OSError(err, "inotify watch limit reached (fs.inotify.max_user_watches)")
+                continue
+            self.dirs[wd] = current
+            try:
+                with os.scandir(path) as it:
+                    for child in it:
+                        child_rel = f"{current}/{child.name}" if current else child.name
+                        if child.is_dir(follow_symlinks=False) and self.filter.includes_dir(child_rel):
+                            stack.append(child_rel)
+            except OSError:
+                continue
+
+    def _read_events(self, timeout):
+        """Read one buffer of events, waiting at most timeout seconds (None = forever)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        buffer = os.read(self.fd, 64 * 1024)
+        events = []
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def _rescan(self):
+        """Recover from a queue overflow by diffing a fresh snapshot."""
+        current = _snapshot(self.root, self.exclude_dirs, self.extensions)
+        changed = _diff(self.known, current)
+        self.known = current
+        return changed
+
+    def _refresh(self, rel_path):
+        """Update the known state of one file; return True if it actually changed."""
+        full_path = os.path.join(self.root, *rel_path.split("/"))
+        try:
+            stat = os.stat(full_path)
+            state = (stat.st_size, stat.st_mtime) if os.path.isfile(full_path) else None
+        except OSError:
+            state = None
+        old = self.known.get(rel_path)
+        if state is None:
+            self.known.pop(rel_path, None)
+        else:
+            self.known[rel_path] = state
+        return old != state
+
+    def changes(self):
+        """Yield sets of changed relative paths, batching events that arrive within debounce."""
+        while True:
+            events = self._read_events(None)
+            # Editors touch a file several times per save; collect the whole burst
+            while True:
+                more = self._read_events(self.debounce)
+                if not more:
+                    break
+                events.extend(more)
+
+            candidates = set()
+            overflow = False
+            for wd, mask, name in events:
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                rel_dir = self.dirs.get(wd)
+                if rel_dir is None or not name:
+                    continue
+                rel_path = f"{rel_dir}/{name}" if rel_dir else name
+                if mask & IN_ISDIR:
+                    prefix = rel_path + "/"
+                    if mask & (IN_CREATE | IN_MOVED_TO) and self.filter.includes_dir(rel_path):
+                        # Files may have been written before the new watch was in place
+                        self._watch_tree(rel_path)
+                        inventory = scan_tree(os.path.join(self.root, *rel_path.split("/")),
+                                              exclude_dirs=self.exclude_dirs, extensions=self.extensions)
+                        candidates.update(prefix + entry.rel_path for entry in inventory)
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        candidates.update(path for path in self.known if path.startswith(prefix))
+                    continue
+                if name == ".gitignore":
+                    self.filter.invalidate()
+                if self.filter.includes(rel_path) or rel_path in self.known:
+                    candidates.add(rel_path)
+
+            changed = self._rescan() if overflow else set()
+            changed.update(path for path in candidates if self._refresh(path))
+            if changed:
+                yield changed
+
+
+def watch_changes(root, exclude_dirs=None, extensions=None, interval=1.0, debounce=0.05):
+    """
+    Yield sets of relative paths of in-scope files (same rules as scan_tree)
+    that were created, modified or deleted. Uses inotify on Linux and falls
+    back to rescanning the tree every interval seconds elsewhere.
+    """
+    libc = _load_libc()
+    watcher = None
+    if libc is not None:
+        try:
+            watcher = InotifyWatcher(libc, root, exclude_dirs, extensions, debounce)
+        except OSError as e:
+            print(f"inotify unavailable ({e}); polling every {interval}s instead")
+    if watcher is None:
+        yield from poll_changes(root, exclude_dirs, extensions, interval)
+        return
+    try:
+        yield from watcher.changes()
+    finally:
+        watcher.close()
@@ -0,0 +1,150 @@
+import os
+import csv
+import argparse
+from datetime import datetime
+
+from file_scanner import FileEntry, categorize, DEFAULT_EXCLUDE_DIRS
+from metrics_cache import open_cache
+from collect_process_metrics import iter_commits, list_tree, BlobReader
+from halstead_analysis import SOURCE_EXTENSIONS, content_analysis as halstead_analysis
+from COCOMO_estimation import COCOMOEstimator, loc_analysis
+from info_flow_complexity import (EXCLUDED_DIRS, INFO_FLOW_VERSION, MODULE_ANALYZERS,
+                                  graph_from_modules, compute_ifc_scores)
+
+OUTPUT_FILE = os.path.join("metrics", "history_trend.csv")
+CSV_HEADER = [
+    "commit_hash", "date",
+    "halstead_files", "halstead_volume", "halstead_effort",
+    "backend_loc", "frontend_loc", "database_loc", "total_loc", "cocomo_effort",
+    "ifc_modules", "ifc_edges", "ifc_total", "ifc_max",
+]
+
+
+def in_excluded_dir(rel_path, exclude_dirs):
+    """True if any directory on the path is excluded, as scan_tree would prune it."""
+    return any(part in exclude_dirs for part in rel_path.split("/")[:-1])
+
+
+def extension_of(rel_path):
+    return os.path.splitext(rel_path)[1].lower()
+
+
+class HistoryAnalyzer:
+    """
+    Computes Halstead, COCOMO LOC and IFC for a commit straight from git
+    objects. Every analysis is memoized by blob id (in the metrics cache),
+    so a file that is identical across many commits is read and analyzed
+    once, however many of them are sampled.
+    """
+
+    def __init__(self, repo_dir, cache, blobs):
+        self.repo_dir = repo_dir
+        self.cache = cache
+        self.blobs = blobs
+
+    def _analyze(self, analyzer, version, blob_id, compute):
+        return self.cache.get_or_compute_blob(analyzer, version, blob_id,
+                                              lambda: self.blobs.read(blob_id), compute)
+
+    def halstead(self, files):
+        volume = effort = 0.0
+        count = 0
+        for rel_path, blob_id, _ in files:
+            if extension_of(rel_path) not in SOURCE_EXTENSIONS or in_excluded_dir(rel_path, DEFAULT_EXCLUDE_DIRS):
+                continue
+            analyzer, version, compute = halstead_analysis(extension_of(rel_path))
+            metrics = self._analyze(analyzer, version, blob_id, compute)
+            if metrics:
+                count += 1
+                volume += metrics["Volume (V)"]
+                effort += metrics["Effort (E)"]
+        return {"halstead_files": count, "halstead_volume": round(volume, 2), "halstead_effort": round(effort, 2)}
+
+    def cocomo(self, files):
+        estimator = COCOMOEstimator()
+        code_extensions = estimator.backend_extensions | estimator.frontend_extensions | estimator.database_extensions
+        for rel_path, blob_id, size in files:
+            extension = extension_of(rel_path)
+            if extension not in code_extensions or in_excluded_dir(rel_path, estimator.exclude_dirs):
+                continue
+            entry = FileEntry(rel_path, rel_path, extension, size, 0.0, categorize(rel_path, extension))
+            component = estimator.component_of(entry)
+            if component is not None:
+                analyzer, version, compute = loc_analysis(extension)
+                estimator.add_loc(component, self._analyze(analyzer, version, blob_id, compute))
+        total_loc, _, effort = estimator.calculate_cocomo()
+        return {
+            "backend_loc": estimator.backend_loc,
+            "frontend_loc": estimator.frontend_loc,
+            "database_loc": estimator.database_loc,
+            "total_loc": total_loc,
+            "cocomo_effort": round(effort, 2),
+        }
+
+    def information_flow(self, files):
+        modules = []
+        for rel_path, blob_id, _ in files:
+            extension = extension_of(rel_path)
+            if extension not in MODULE_ANALYZERS or in_excluded_dir(rel_path, EXCLUDED_DIRS):
+                continue
+            name, analyzer = MODULE_ANALYZERS[extension]
+            modules.append((rel_path, extension, self._analyze(name, INFO_FLOW_VERSION, blob_id, analyzer)))
+        graph, loc = graph_from_modules(modules)
+        scores = compute_ifc_scores(graph, loc)
+        ifc_values = [data["IFC"] for data in scores.values()]
+        return {
+            "ifc_modules": len(graph),
+            "ifc_edges": graph.edge_count,
+            "ifc_total": sum(ifc_values),
+            "ifc_max": max(ifc_values, default=0),
+        }
+
+    def analyze_commit(self, commit):
+        # ls-tree lists paths in sorted order, like scan_tree
+        files = list_tree(commit, self.repo_dir)
+        row = {}
+        row.update(self.halstead(files))
+        row.update(self.cocomo(files))
+        row.update(self.information_flow(files))
+        return row
+
+
+def sample_commits(commits, every):
+    """Every Nth commit, oldest first, always including the newest one."""
+    sampled = commits[::every]
+    if commits and sampled[-1] != commits[-1]:
+        sampled.append(commits[-1])
+    return sampled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Halstead, COCOMO and IFC trends over git history, without checkouts.")
+    parser.add_argument("--branch", default="main", help="branch to walk (default: main)")
+    parser.add_argument("--every", type=int, default=1, help="analyze every Nth commit (default: all)")
+    parser.add_argument("-o", "--output", default=OUTPUT_FILE, help=f"CSV file (default: {OUTPUT_FILE})")
+    args = parser.parse_args()
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    commits = sample_commits(list(iter_commits(args.branch, project_root)), max(1, args.every))
+    print(f"Analyzing {len(commits)} commits of {args.branch}...")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open_cache(project_root) as cache, BlobReader(project_root) as blobs, \
+            open(args.output, "w", newline="") as csvfile:
+        analyzer = HistoryAnalyzer(project_root, cache, blobs)
+        writer = csv.DictWriter(csvfile, fieldnames=CSV_HEADER)
+        writer.writeheader()
+        for commit_hash, committed in commits:
+            row = analyzer.analyze_commit(commit_hash)
+            row["commit_hash"] = commit_hash
+            row["date"] = datetime.fromtimestamp(committed).strftime("%Y-%m-%d %H:%M:%S")
+            writer.writerow(row)
+            print(f"{commit_hash[:10]} {row['date']}  LOC {row['total_loc']:>7,}  "
+                  f"Halstead effort {row['halstead_effort']:>14,.0f}  IFC {row['ifc_total']:>10,}")
+        print(f"Blob analyses: {cache.misses} computed, {cache.hits} reused")
+
+    print(f"History trend saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
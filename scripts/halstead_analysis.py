@@ -1,35 +1,53 @@
 import os
-import re
 import math
-import sys
+import mmap
+import heapq
+import argparse
+from collections import Counter
 
-def get_source_files(directory, extensions=(".py", ".java", ".c", ".cpp", ".js")):
-    """ Recursively get all source code files in a directory. """
-    source_files = []
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith(extensions):
-                source_files.append(os.path.join(root, file))
-    return source_files
+from file_scanner import scan_tree
+from file_watcher import watch_changes
+from metrics_cache import open_cache, read_text
+from metrics_history import record_run
+from source_lexer import OPERATOR, language_for, lex_counts, tokenize
+from tracing import span
 
-def tokenize_code(content):
-    """ Extract operators and operands from source code using regex. """
-    operators = set(r"+-*/%=<>!&|^~?:,.(){}[];")
-    pattern = r"[A-Za-z_]\w*|\d+|[+\-*/%=<>!&|^~?:,(){}[\];]"
-    tokens = re.findall(pattern, content)
+SOURCE_EXTENSIONS = (".py", ".java", ".c", ".cpp", ".js")
+# Bump whenever the lexers, the function tracking or halstead_from_counts change, to invalidate cached results
+HALSTEAD_VERSION = "3"
+# Files at least this large are lexed straight from an mmap instead of read whole
+STREAMING_MIN_BYTES = 8 * 1024 * 1024
 
-    operators_found = [t for t in tokens if t in operators]
-    operands_found = [t for t in tokens if t not in operators]
+def get_source_files(directory, extensions=SOURCE_EXTENSIONS, inventory=None):
+    """ Get all source code files in a directory from a single tree scan. """
+    if inventory is None:
+        inventory = scan_tree(directory, extensions=extensions)
+    # Keep paths relative to the directory that was asked for, as before
+    return [os.path.join(directory, entry.rel_path) for entry in inventory.with_extensions(extensions)]
 
+def tokenize_code(content, extension=".js"):
+    """ Operators and operands of source code; comments are skipped and a string literal is one operand. """
+    stream = tokenize(content, extension)
+    operators_found, operands_found = [], []
+    for token_id in stream.ids:
+        token = stream.vocabulary[token_id].decode("utf-8", "replace")
+        (operators_found if stream.kinds[token_id] == OPERATOR else operands_found).append(token)
     return operators_found, operands_found
 
 def halstead_metrics(operators, operands):
     """ Calculate Halstead complexity measures. """
-    n1 = len(set(operators))  # Number of distinct operators
-    n2 = len(set(operands))   # Number of distinct operands
-    N1 = len(operators)       # Total occurrences of operators
-    N2 = len(operands)        # Total occurrences of operands
+    return halstead_from_counts(Counter(operators), Counter(operands))
+
+def halstead_from_counts(operator_counts, operand_counts):
+    """ Calculate Halstead complexity measures from operator/operand counts (token -> occurrences). """
+    return halstead_from_totals(
+        len(operator_counts),              # Number of distinct operators
+        len(operand_counts),               # Number of distinct operands
+        sum(operator_counts.values()),     # Total occurrences of operators
+        sum(operand_counts.values()))      # Total occurrences of operands
 
+def halstead_from_totals(n1, n2, N1, N2):
+    """ Calculate Halstead complexity measures from distinct (n1, n2) and total (N1, N2) operator/operand counts. """
     n = n1 + n2  # Program vocabulary
     N = N1 + N2  # Program length
 
@@ -48,28 +66,199 @@ def halstead_metrics(operators, operands):
         "Difficulty (D)": D, "Effort (E)": E
     }
 
-def analyze_directory(directory):
-    """ Analyze all source code files in a directory. """
-    files = get_source_files(directory)
-    results = {}
+def count_metrics(kinds, counts):
+    """ Halstead measures of a Counter of token ids, kinds being the stream's token kinds. """
+    operators, operands = {}, {}
+    for token_id, count in counts.items():
+        (operators if kinds[token_id] == OPERATOR else operands)[token_id] = count
+    return halstead_from_counts(operators, operands)
+
+def function_metrics(kinds, function, counts):
+    """ The "functions" entry of one function, or None if it has no operators or operands. """
+    metrics = count_metrics(kinds, counts)
+    if metrics:
+        return dict({"name": function.name, "line": function.line, "end_line": function.end_line}, **metrics)
+    return None
+
+def stream_metrics(stream, functions=None):
+    """
+    Halstead measures of a TokenStream plus "functions", one entry per
+    function body found while lexing. Counting is one Counter over the
+    token ids (of the file, or of a function's slice, nested functions
+    included), so no token is looked at in Python. For a TokenCounts the
+    function entries are made as each function closes, and passed in.
+    """
+    metrics = count_metrics(stream.kinds, stream.token_counts())
+    if metrics:
+        if functions is None:
+            functions = [function_metrics(stream.kinds, function, counts)
+                         for function, counts in zip(stream.functions, stream.function_token_counts())]
+        metrics["functions"] = [function for function in functions if function]
+    return metrics
+
+def analyze_content(content, extension=".js"):
+    """ Score the content of one file: its Halstead measures plus "functions", one entry per function. """
+    return stream_metrics(tokenize(content, extension))
+
+def content_analysis(extension):
+    """ The (analyzer, version, compute) cache analysis scoring one file type. """
+    return (f"halstead{extension}", HALSTEAD_VERSION, lambda content: analyze_content(content, extension))
+
+def analyze_file(path):
+    """
+    Score one file. Large files are lexed from an mmap into token counts,
+    so neither the file nor its tokens are ever held whole.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if os.path.getsize(path) >= STREAMING_MIN_BYTES:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            stream = lex_counts(mm, language_for(extension),
+                                lambda stream, function, counts: function_metrics(stream.kinds, function, counts))
+            return stream_metrics(stream, stream.function_summaries)
+    return analyze_content(read_text(path), extension)
+
+def _analyze_chunk(files):
+    """ Worker entry point: score a chunk of files in a pool process. """
+    return [analyze_file(file) for file in files]
+
+def balance_chunks(files, chunk_count):
+    """ Split files into chunks of roughly equal total size (largest file first). """
+    sized = sorted(((os.path.getsize(file), file) for file in files), reverse=True)
+    heap = [(0, index) for index in range(min(chunk_count, len(files)))]
+    chunks = [[] for _ in heap]
+    for size, file in sized:
+        total, index = heapq.heappop(heap)
+        chunks[index].append(file)
+        heapq.heappush(heap, (total + size, index))
+    return [chunk for chunk in chunks if chunk]
+
+def _analyze_parallel(files, jobs):
+    """ Score files across a process pool, returning metrics in the input order. """
+    # Imported here: multiprocessing adds ~10 ms to every start, serial or not
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Several chunks per worker, so a worker that drew big files doesn't hold up the rest
+    chunks = balance_chunks(files, jobs * 4)
+    scored = {}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for chunk, chunk_metrics in zip(chunks, executor.map(_analyze_chunk, chunks)):
+            scored.update(zip(chunk, chunk_metrics))
+    return [scored[file] for file in files]
+
+def analyze_directory(directory, inventory=None, cache=None, jobs=1):
+    """
+    Analyze all source code files in a directory.
+
+    With jobs > 1 (or 0 for one per CPU) files are scored in a process pool;
+    the results are identical to, and in the same order as, a serial run.
+    """
+    with span("halstead") as sp:
+        with span("scan"):
+            files = get_source_files(directory, inventory=inventory)
+        results = {}
+        if jobs == 0:
+            jobs = os.cpu_count() or 1
 
-    for file in files:
-        with open(file, "r", encoding="utf-8", errors="ignore") as f:
-            content = f.read()
-        
-        operators, operands = tokenize_code(content)
-        metrics = halstead_metrics(operators, operands)
+        # Resolve cache hits up front so only changed files are scored
+        file_metrics = {}
+        pending = []
+        with span("cache_lookup") as lookup_span:
+            for file in files:
+                analyzer = "halstead" + os.path.splitext(file)[1].lower()
+                found, metrics = (False, None) if cache is None else cache.lookup(analyzer, HALSTEAD_VERSION, file)
+                if found:
+                    file_metrics[file] = metrics
+                else:
+                    pending.append(file)
+            lookup_span.count("hits", len(files) - len(pending))
 
-        if metrics:
-            results[file] = metrics
+        with span("tokenize", files=len(pending)) as tokenize_span:
+            if jobs > 1 and len(pending) > 1:
+                scored = _analyze_parallel(pending, jobs)
+            else:
+                scored = [analyze_file(file) for file in pending]
+            if tokenize_span.active:
+                tokenize_span.count("bytes", sum(os.path.getsize(file) for file in pending))
+                tokenize_span.count("tokens", sum(m["N1"] + m["N2"] for m in scored if m))
+
+        with span("cache_store"):
+            for file, metrics in zip(pending, scored):
+                file_metrics[file] = metrics
+                if cache is not None:
+                    cache.store("halstead" + os.path.splitext(file)[1].lower(), HALSTEAD_VERSION, file, metrics)
+
+        for file in files:
+            metrics = file_metrics[file]
+            if metrics:
+                results[file] = metrics
+        sp.count("files", len(results))
 
     return results
 
+# Names under which each measure is kept in the metrics history
+HISTORY_NAMES = {
+    "n1": "halstead.n1", "n2": "halstead.n2", "N1": "halstead.N1", "N2": "halstead.N2",
+    "Vocabulary (n)": "halstead.vocabulary", "Length (N)": "halstead.length",
+    "Calculated Length (L)": "halstead.calculated_length", "Volume (V)": "halstead.volume",
+    "Difficulty (D)": "halstead.difficulty", "Effort (E)": "halstead.effort",
+}
+
+def record_history(project_root, results):
+    """Append this run's per-file measures to the metrics history store."""
+    file_values = {
+        file: {HISTORY_NAMES[key]: value for key, value in metrics.items() if key in HISTORY_NAMES}
+        for file, metrics in results.items()
+    }
+    total_effort = sum(metrics["Effort (E)"] for metrics in results.values())
+    record_run(project_root, "halstead", file_values,
+               {"halstead.files": len(results), "halstead.total_effort": total_effort})
+
+def print_metrics(file, metrics):
+    print(f"\nFile: {file}")
+    for key, value in metrics.items():
+        if key != "functions":
+            print(f"{key}: {value:.2f}")
+    functions = metrics.get("functions")
+    if functions:
+        print("\n  {:<44} {:>11} {:>7} {:>10} {:>12}".format("Function", "Lines", "Length", "Volume", "Effort"))
+        for function in functions:
+            print("  {:<44} {:>11} {:>7} {:>10.2f} {:>12.2f}".format(
+                function["name"][:44], f"{function['line']}-{function['end_line']}",
+                function["Length (N)"], function["Volume (V)"], function["Effort (E)"]))
+
+def watch_directory(directory, results):
+    """ Keep results up to date, rescoring only the files that change. Runs until interrupted. """
+    print(f"\nWatching {directory} for changes (Ctrl+C to stop)...")
+    for changed in watch_changes(directory, extensions=SOURCE_EXTENSIONS):
+        for rel_path in sorted(changed):
+            file = os.path.join(directory, rel_path)
+            metrics = analyze_file(file) if os.path.isfile(file) else None
+            if metrics:
+                results[file] = metrics
+                print_metrics(file, metrics)
+            elif results.pop(file, None) is not None:
+                print(f"\nFile: {file} (removed)")
+
 if __name__ == "__main__":
-    directory = sys.argv[1] if len(sys.argv) > 1 else "."
-    results = analyze_directory(directory)
+    parser = argparse.ArgumentParser(description="Halstead complexity measures for a source tree.")
+    parser.add_argument("directory", nargs="?", default=".", help="directory to analyze")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of worker processes (0 = one per CPU)")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and rescore files as they change")
+    args = parser.parse_args()
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open_cache(project_root) as cache:
+        results = analyze_directory(args.directory, cache=cache, jobs=args.jobs)
 
     for file, metrics in results.items():
-        print(f"\nFile: {file}")
-        for key, value in metrics.items():
-            print(f"{key}: {value:.2f}")
+        print_metrics(file, metrics)
+
+    record_history(project_root, results)
+
+    if args.watch:
+        try:
+            watch_directory(args.directory, results)
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
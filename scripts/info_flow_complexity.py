@@ -2,184 +2,340 @@ import os
 import re
 import json
 import csv
+import argparse
+import posixpath
+from array import array
 from collections import defaultdict
 
-def get_files_by_extension(directory, extension):
-    """Get all files with a given extension recursively."""
-    return [
-        os.path.join(root, file)
-        for root, _, files in os.walk(directory)
-        for file in files if file.endswith(extension)
-    ]
+from file_scanner import scan_tree, stat_entry, DEFAULT_EXCLUDE_DIRS
+from file_watcher import watch_changes
+from metrics_cache import compute_cached, open_cache
+from dependency_graph import DependencyGraph
+from columnar import Columns, write_columns
+from metrics_history import record_run
+from source_lexer import STRING, WORD, line_counts, tokenize
+from tracing import span
+
+# Directories skipped by the information flow analysis
+EXCLUDED_DIRS = DEFAULT_EXCLUDE_DIRS | {"backup"}
+# Bump whenever the per-file LOC or import extraction changes, to invalidate cached results
+INFO_FLOW_VERSION = "4"
+
+# Suffixes tried, in order, when resolving an import or include to a file
+JS_RESOLVE_SUFFIXES = ("", ".js", ".mjs", ".cjs", "/index.js")
+EJS_RESOLVE_SUFFIXES = ("", ".ejs")
+# Where Express looks up templates (app "views") and serves static files from (express.static)
+VIEWS_DIRS = ("views",)
+STATIC_DIRS = ("public",)
+
+# Tokens allowed between "import" and "from": import x, {a as b} from 'y' / import * as z from 'y'
+IMPORT_CLAUSE_PUNCTUATION = {b"*", b"{", b"}", b","}
+
+def _quoted(token):
+    """The text of a '...' or "..." string token, or None for other tokens and empty strings."""
+    if len(token) > 2 and token[:1] in (b"'", b'"') and token[-1:] == token[:1]:
+        return token[1:-1].decode("utf-8", "replace")
+    return None
 
 def extract_js_imports(content):
-    """Extract dependencies from JS files including relative imports."""
-    require_pattern = r'require\([\'"](.+?)[\'"]\)'
-    import_pattern = r'import\s+(?:[\w*{}\s,]+\s+from\s+)?[\'"](.+?)[\'"]'
-    matches = re.findall(require_pattern, content) + re.findall(import_pattern, content)
-    
-    # Process paths to get just the filename without extension
-    resolved_imports = []
-    for m in matches:
-        # Keep all imports, including relative ones
-        parts = m.split('/')
-        # Get the last part (filename or module name)
-        filename = parts[-1]
-        # Remove extension if present
-        if '.' in filename:
-            filename = os.path.splitext(filename)[0]
-        resolved_imports.append(filename)
-    
-    return resolved_imports
+    """
+    Extract the module specifiers of require() calls and import statements in JS files,
+    from the file's shared token stream, so commented-out imports are not counted.
+    """
+    stream = tokenize(content, ".js")
+    ids, vocabulary, kinds = stream.ids, stream.vocabulary, stream.kinds
+    require_ids, import_ids = stream.ids_of([b"require"]), stream.ids_of([b"import"])
+    keywords = require_ids | import_ids
+    requires, imports = [], []
+    for index in [index for index, token_id in enumerate(ids) if token_id in keywords]:
+        following = [vocabulary[token_id] for token_id in ids[index + 1:index + 4]]
+        if ids[index] in require_ids:
+            # require('x'), the specifier being the whole argument
+            if len(following) == 3 and following[0] == b"(" and following[2] == b")":
+                specifier = _quoted(following[1])
+                if specifier is not None:
+                    requires.append(specifier)
+            continue
+        # import 'x' / import ... from 'x'
+        position = index + 1
+        while position < len(ids):
+            token_id = ids[position]
+            token = vocabulary[token_id]
+            if kinds[token_id] == STRING:
+                if position == index + 1 or vocabulary[ids[position - 1]] == b"from":
+                    specifier = _quoted(token)
+                    if specifier is not None:
+                        imports.append(specifier)
+                break
+            if kinds[token_id] != WORD and token not in IMPORT_CLAUSE_PUNCTUATION:
+                break
+            position += 1
+    return requires + imports
+
+# Pattern to match various link formats, ignoring any query string or fragment
+CSS_LINK_PATTERN = r'<link\s+[^>]*href=["\']([^"\']+?\.css)(?:[?#][^"\']*)?["\']'
+INCLUDE_PATTERN = r'<%[-=]?\s*include\([\'"](.+?)[\'"](?:\s*,\s*{.+?})?\)\s*%>'
+# Both in one regex, so a template is searched once
+EJS_REFERENCE_PATTERN = re.compile(f"{INCLUDE_PATTERN}|{CSS_LINK_PATTERN}")
 
 def extract_css_links_from_ejs(content):
-    """Find linked CSS files in EJS templates."""
-    # Pattern to match various link formats
-    pattern = r'<link\s+[^>]*href=["\'](?:.*?)?([^/"\']+\.css)["\']'
-    matches = re.findall(pattern, content)
-    return [os.path.splitext(match)[0] for match in matches]
+    """Find the hrefs of linked CSS files in EJS templates."""
+    return re.findall(CSS_LINK_PATTERN, content)
 
 def extract_ejs_includes(content):
-    """Find included EJS templates in other templates."""
-    include_pattern = r'<%[-=]?\s*include\([\'"](.+?)[\'"](?:\s*,\s*{.+?})?\)\s*%>'
-    matches = re.findall(include_pattern, content)
-    # Process paths to get just the filename without extension
-    return [os.path.splitext(os.path.basename(m))[0] for m in matches]
-
-def calculate_information_flow_metrics(project_root):
-    """Calculate Information Flow Complexity for all project files."""
-    # Output directories
-    metrics_dir = os.path.join(project_root, "metrics")
-    os.makedirs(metrics_dir, exist_ok=True)
-    
-    print(f"\n📊 Analyzing Information Flow for project: {project_root}\n")
-    
-    # Get all files by extension across the entire project
-    js_files = get_files_by_extension(project_root, ".js")
-    css_files = get_files_by_extension(project_root, ".css")
-    ejs_files = get_files_by_extension(project_root, ".ejs")
-
-    # Filter out node_modules and other unnecessary directories
-    def should_include(file_path):
-        excluded_dirs = ["node_modules", "dist", "build", ".git", "__pycache__", "backup"]
-        return not any(excluded in file_path for excluded in excluded_dirs)
-    
-    js_files = [f for f in js_files if should_include(f)]
-    css_files = [f for f in css_files if should_include(f)]
-    ejs_files = [f for f in ejs_files if should_include(f)]
+    """Find the paths of EJS templates included by other templates."""
+    return re.findall(INCLUDE_PATTERN, content)
+
+def extract_ejs_references(content):
+    """(included templates, linked CSS hrefs) of an EJS template, in one search."""
+    includes, css_links = [], []
+    for include, css_link in EJS_REFERENCE_PATTERN.findall(content):
+        if include:
+            includes.append(include)
+        else:
+            css_links.append(css_link)
+    return includes, css_links
+
+def _first_known(candidates, graph):
+    """Return the node id of the first candidate path that is in the graph."""
+    for candidate in candidates:
+        node = graph.index.get(candidate)
+        if node is not None:
+            return node
+    return None
+
+def js_import_candidates(importer, specifier):
+    """Paths a relative require/import may refer to, in resolution order; package names have none."""
+    if specifier.startswith("/"):
+        base = specifier.lstrip("/")
+    elif specifier.startswith("."):
+        base = posixpath.join(posixpath.dirname(importer), specifier)
+    else:
+        return []
+    return [posixpath.normpath(base + suffix) for suffix in JS_RESOLVE_SUFFIXES]
+
+def ejs_include_candidates(importer, specifier):
+    """Paths an include may refer to, like EJS: relative to the template, absolute ones from the views folder."""
+    if specifier.startswith("/"):
+        bases = [posixpath.join(views, specifier.lstrip("/")) for views in VIEWS_DIRS]
+    else:
+        bases = [posixpath.join(posixpath.dirname(importer), specifier)]
+        bases += [posixpath.join(views, specifier) for views in VIEWS_DIRS]
+    return [posixpath.normpath(base + suffix) for base in bases for suffix in EJS_RESOLVE_SUFFIXES]
+
+def css_link_candidates(importer, href):
+    """Paths a stylesheet href may refer to; absolute hrefs are served from the static folders."""
+    if "://" in href or href.startswith("//"):
+        return []
+    if href.startswith("/"):
+        href = href.lstrip("/")
+        candidates = [posixpath.join(static, href) for static in STATIC_DIRS] + [href]
+    else:
+        candidates = [posixpath.join(posixpath.dirname(importer), href)]
+        candidates += [posixpath.join(static, href) for static in STATIC_DIRS]
+    return [posixpath.normpath(candidate) for candidate in candidates]
+
+def resolve_js_import(importer, specifier, graph):
+    """Resolve a relative require/import against the importing file; package names are external."""
+    return _first_known(js_import_candidates(importer, specifier), graph)
+
+def resolve_ejs_include(importer, specifier, graph):
+    """Resolve an include like EJS does: relative to the template, absolute ones from the views folder."""
+    return _first_known(ejs_include_candidates(importer, specifier), graph)
+
+def resolve_css_link(importer, href, graph):
+    """Resolve a stylesheet href; absolute hrefs are served from the static folders."""
+    return _first_known(css_link_candidates(importer, href), graph)
+
+def analyze_js_content(content):
+    """LOC (code lines) and imports of a JS file."""
+    return {"loc": line_counts(content, ".js").code, "imports": extract_js_imports(content)}
+
+def analyze_ejs_content(content):
+    """LOC (lines outside HTML and EJS comments), included templates and linked CSS of an EJS template."""
+    includes, css_links = extract_ejs_references(content)
+    return {"loc": line_counts(content, ".ejs").code, "includes": includes, "css_links": css_links}
+
+def analyze_css_content(content):
+    """LOC (code lines) of a CSS file."""
+    return {"loc": line_counts(content, ".css").code}
+
+# Per-extension analyzer: (cache name, content analyzer)
+MODULE_ANALYZERS = {
+    ".js": ("info_flow_js", analyze_js_content),
+    ".ejs": ("info_flow_ejs", analyze_ejs_content),
+    ".css": ("info_flow_css", analyze_css_content),
+}
+MODULE_EXTENSIONS = tuple(MODULE_ANALYZERS)
+
+def analyze_module(path, extension, cache=None):
+    """LOC and raw references of one module, going through the cache when one is given."""
+    name, analyzer = MODULE_ANALYZERS[extension]
+    return compute_cached(cache, name, INFO_FLOW_VERSION, path, analyzer)
+
+def reference_candidates(rel_path, extension, info):
+    """One list of candidate paths per import, include or stylesheet link of a module."""
+    if extension == ".js":
+        references = [js_import_candidates(rel_path, spec) for spec in info["imports"]]
+    elif extension == ".ejs":
+        references = [ejs_include_candidates(rel_path, spec) for spec in info["includes"]]
+        references += [css_link_candidates(rel_path, href) for href in info["css_links"]]
+    else:
+        references = []
+    return [candidates for candidates in references if candidates]
+
+def build_dependency_graph(project_root, inventory=None, cache=None):
+    """
+    Build the module graph of a project: one node per JS, CSS and EJS file,
+    keyed by its path relative to the project root, with an edge for every
+    import, include or stylesheet link that resolves to another project file.
+    Returns (graph, loc) where loc[node id] is the file's length in lines.
+    """
+    # Walk the project once; excluded directories are pruned by exact name
+    if inventory is None:
+        with span("scan"):
+            inventory = scan_tree(project_root, exclude_dirs=EXCLUDED_DIRS, extensions=MODULE_EXTENSIONS)
+    js_files = inventory.with_extensions([".js"])
+    css_files = inventory.with_extensions([".css"])
+    ejs_files = inventory.with_extensions([".ejs"])
 
     print(f"📄 Found {len(js_files)} JS files, {len(css_files)} CSS files, {len(ejs_files)} EJS files\n")
 
-    module_files = {}
-    imports_map = defaultdict(set)
-    reverse_imports = defaultdict(set)
-    loc_map = {}
-
-    # Register all files with their module names
-    for path in js_files + css_files + ejs_files:
-        name = os.path.splitext(os.path.basename(path))[0]
-        module_files[name] = path
-        # Also register common variations
-        module_files[f"{name}.js"] = path
-        module_files[f"{name}.css"] = path
-        module_files[f"{name}.ejs"] = path
-
-    # JS analysis - find imports and calculate LOC
-    print("⚙️ Analyzing JavaScript dependencies...")
-    for path in js_files:
-        name = os.path.splitext(os.path.basename(path))[0]
-        try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
-                
-            # Count LOC (non-empty, non-comment lines)
-            code_lines = [
-                line.strip() for line in content.splitlines() 
-                if line.strip() and not line.strip().startswith("//")
-            ]
-            loc_map[name] = len(code_lines)
-            
-            # Find imports
-            imports = extract_js_imports(content)
-            for imp in imports:
-                if imp in module_files and imp != name:
-                    imports_map[name].add(imp)
-                    reverse_imports[imp].add(name)
-        except Exception as e:
-            print(f"Error processing {path}: {e}")
+    # Register every file first so imports can be resolved to any of them
+    graph = DependencyGraph()
+    for entry in inventory.with_extensions(MODULE_EXTENSIONS):
+        graph.add_node(entry.rel_path)
+    loc = array("i", [0]) * len(graph)
 
-    # EJS analysis - find includes and linked CSS
-    print("⚙️ Analyzing EJS template dependencies...")
-    for path in ejs_files:
-        name = os.path.splitext(os.path.basename(path))[0]
-        try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
-                
-            # Count LOC (non-empty lines)
-            code_lines = [line.strip() for line in content.splitlines() if line.strip()]
-            loc_map[name] = len(code_lines)
-            
-            # Find included templates
-            includes = extract_ejs_includes(content)
-            for inc in includes:
-                if inc in module_files and inc != name:
-                    imports_map[name].add(inc)
-                    reverse_imports[inc].add(name)
-            
-            # Find linked CSS
-            linked_css = extract_css_links_from_ejs(content)
-            for css_name in linked_css:
-                if css_name in module_files:
-                    imports_map[name].add(css_name)
-                    reverse_imports[css_name].add(name)
-        except Exception as e:
-            print(f"Error processing {path}: {e}")
+    # JS imports, then EJS includes and linked CSS, then CSS (LOC only)
+    stages = [
+        ("analyze_js", "⚙️ Analyzing JavaScript dependencies...", js_files),
+        ("analyze_ejs", "⚙️ Analyzing EJS template dependencies...", ejs_files),
+        ("analyze_css", "⚙️ Analyzing CSS metrics...", css_files),
+    ]
+    for stage, message, entries in stages:
+        print(message)
+        with span(stage, files=len(entries)) as sp:
+            edges_before = graph.edge_count
+            for entry in entries:
+                node = graph.index[entry.rel_path]
+                sp.count("bytes", entry.size)
+                try:
+                    info = analyze_module(entry.path, entry.extension, cache)
+                    loc[node] = info["loc"]
+                    for candidates in reference_candidates(entry.rel_path, entry.extension, info):
+                        target = _first_known(candidates, graph)
+                        if target is not None:
+                            graph.add_edge(node, target)
+                except Exception as e:
+                    print(f"Error processing {entry.path}: {e}")
+            sp.count("edges", graph.edge_count - edges_before)
 
-    # CSS analysis - calculate LOC
-    print("⚙️ Analyzing CSS metrics...")
-    for path in css_files:
-        name = os.path.splitext(os.path.basename(path))[0]
-        try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
-            
-            # Count LOC (non-empty, non-comment lines)
-            code_lines = [
-                line.strip() for line in content.splitlines() 
-                if line.strip() and not line.strip().startswith("/*")
-            ]
-            loc_map[name] = len(code_lines)
-        except Exception as e:
-            print(f"Error processing {path}: {e}")
+    return graph, loc
+
+def graph_from_modules(modules):
+    """
+    Build the module graph from already analyzed modules, given as
+    (rel_path, extension, info) tuples, with the same resolution rules as
+    build_dependency_graph. Returns (graph, loc).
+    """
+    known = {rel_path for rel_path, _, _ in modules}
+    return graph_from_edges(resolve_modules(modules, known))
+
+def resolve_modules(modules, known):
+    """
+    Resolve the references of analyzed (rel_path, extension, info) modules
+    against the set of known module paths, which may hold more modules than
+    are given (a shard resolves its own modules against the whole project).
+    Returns (rel_path, extension, loc, targets) tuples, targets being the
+    paths referenced, in reference order.
+    """
+    resolved = []
+    for rel_path, extension, info in modules:
+        targets = []
+        for candidates in reference_candidates(rel_path, extension, info):
+            target = next((candidate for candidate in candidates if candidate in known), None)
+            if target is not None:
+                targets.append(target)
+        resolved.append((rel_path, extension, info["loc"], targets))
+    return resolved
+
+def graph_from_edges(modules):
+    """
+    Build the module graph from resolved (rel_path, extension, loc, targets)
+    modules, in the order they were scanned. Returns (graph, loc).
+    """
+    graph = DependencyGraph()
+    for rel_path, _, _, _ in modules:
+        graph.add_node(rel_path)
+    loc = array("i", [0]) * len(graph)
+    # Edges are added JS first, then EJS, as build_dependency_graph does
+    stage_order = {".js": 0, ".ejs": 1, ".css": 2}
+    for rel_path, extension, length, targets in sorted(modules, key=lambda module: stage_order[module[1]]):
+        node = graph.index[rel_path]
+        loc[node] = length
+        for target in targets:
+            # A module another shard failed to read has no node
+            if target in graph.index:
+                graph.add_edge(node, graph.index[target])
+    return graph, loc
+
+def compute_ifc_scores(graph, loc):
+    """Fan-in, fan-out and Henry-Kafura IFC of every module, in O(V + E)."""
+    fan_in, fan_out = graph.degrees()
+    dep_offsets, dependencies = graph.adjacency()
+    rev_offsets, dependents = graph.adjacency(reverse=True)
+    nodes = graph.nodes
 
-    # IFC Calculation
-    print("\n📈 Calculating Information Flow Complexity...\n")
     ifc_scores = {}
-    
-    # Get unique modules (removing duplicates like name.js, etc.)
-    base_modules = set()
-    for mod in module_files.keys():
-        if "." not in mod:
-            base_modules.add(mod)
-    
-    for mod in base_modules:
-        fan_in = len(reverse_imports.get(mod, []))
-        fan_out = len(imports_map.get(mod, []))
-        length = loc_map.get(mod, 0)
+    for node, mod in enumerate(nodes):
+        length = loc[node]
         
         # Henry-Kafura IFC formula: length * (fan_in * fan_out)^2
-        ifc = length * (fan_in * fan_out) ** 2 if fan_in > 0 and fan_out > 0 else 0
+        ifc = length * (fan_in[node] * fan_out[node]) ** 2
 
         ifc_scores[mod] = {
-            "fan_in": fan_in,
-            "fan_out": fan_out,
+            "fan_in": fan_in[node],
+            "fan_out": fan_out[node],
             "length": length,
-            "dependencies": list(imports_map.get(mod, [])),
-            "dependent_modules": list(reverse_imports.get(mod, [])),
+            # Sorted, as LiveInformationFlow.scores lists them, so batch and watch output match
+            "dependencies": sorted(nodes[i] for i in dependencies[dep_offsets[node]:dep_offsets[node + 1]]),
+            "dependent_modules": sorted(nodes[i] for i in dependents[rev_offsets[node]:rev_offsets[node + 1]]),
             "IFC": ifc
         }
+    return ifc_scores
+
+def calculate_information_flow_metrics(project_root, inventory=None, cache=None, output_format="json"):
+    """
+    Calculate Information Flow Complexity for all project files. The detailed
+    results are written as JSON, as columns (see save_ifc_columns), or both.
+    """
+    # Output directories
+    metrics_dir = os.path.join(project_root, "metrics")
+    os.makedirs(metrics_dir, exist_ok=True)
+    
+    print(f"\n📊 Analyzing Information Flow for project: {project_root}\n")
+
+    with span("info_flow") as sp:
+        graph, loc = build_dependency_graph(project_root, inventory, cache)
+        sp.count("modules", len(graph))
+        sp.count("edges", graph.edge_count)
+
+        # IFC Calculation
+        print("\n📈 Calculating Information Flow Complexity...\n")
+        with span("score"):
+            ifc_scores = compute_ifc_scores(graph, loc)
+
+        with span("write"):
+            save_ifc_results(metrics_dir, ifc_scores, detailed_json=output_format != "columnar")
+            if output_format != "json":
+                save_ifc_columns(metrics_dir, graph, loc)
+        print_ifc_summary(ifc_scores)
+    
+    return ifc_scores
 
+def save_ifc_results(metrics_dir, ifc_scores, detailed_json=True):
+    """Write the IFC scores to the CSV summary and (unless detailed_json is False) the detailed JSON file."""
     # Save results to CSV
     csv_file = os.path.join(metrics_dir, "information_flow_metrics.csv")
     with open(csv_file, 'w', newline='') as f:
@@ -195,26 +351,229 @@ def calculate_information_flow_metrics(project_root):
                 data["IFC"]
             ])
     
+    print(f"✅ Information flow metrics saved to {csv_file}")
+    if not detailed_json:
+        return
+
     # Save detailed results to JSON
     json_file = os.path.join(metrics_dir, "information_flow_detailed.json")
     with open(json_file, 'w') as f:
         json.dump(ifc_scores, f, indent=2)
         
-    print(f"✅ Information flow metrics saved to {csv_file}")
     print(f"✅ Detailed results saved to {json_file}")
+
+def save_ifc_columns(metrics_dir, graph, loc):
+    """
+    Write the graph and its scores as typed columns to information_flow.cols,
+    for tools that load big graphs (see load_ifc_columns): module names as a
+    string dictionary, per-module fan_in, fan_out, loc and IFC (float, as it
+    can outgrow 64 bits), and the dependencies and dependents of module i as
+    node ids dependencies[dependency_offsets[i]:dependency_offsets[i + 1]]
+    (likewise dependents), in edge order; the detailed JSON lists are sorted.
+    """
+    fan_in, fan_out = graph.degrees()
+    dep_offsets, dependencies = graph.adjacency()
+    rev_offsets, dependents = graph.adjacency(reverse=True)
+    ifc = array("d", (float(loc[node] * (fan_in[node] * fan_out[node]) ** 2) for node in range(len(graph))))
+    columns_file = os.path.join(metrics_dir, "information_flow.cols")
+    write_columns(columns_file, {
+        "fan_in": fan_in, "fan_out": fan_out, "loc": loc, "ifc": ifc,
+        "dependency_offsets": dep_offsets, "dependencies": dependencies,
+        "dependent_offsets": rev_offsets, "dependents": dependents,
+    }, strings={"modules": graph.nodes}, meta={"modules": len(graph), "edges": graph.edge_count})
+    print(f"✅ Columnar results saved to {columns_file}")
+
+def load_ifc_columns(metrics_dir):
+    """Memory-map information_flow.cols; close the returned Columns (or use it in a with block) when done."""
+    return Columns(os.path.join(metrics_dir, "information_flow.cols"))
+
+def module_dependencies(columns, module, reverse=False):
+    """Names of the modules a module depends on (or with reverse=True, that depend on it) in loaded columns."""
+    modules = columns["modules"]
+    node = modules.index(module)
+    offsets, neighbors = ((columns["dependent_offsets"], columns["dependents"]) if reverse
+                          else (columns["dependency_offsets"], columns["dependencies"]))
+    return [modules[i] for i in neighbors[offsets[node]:offsets[node + 1]]]
+
+def print_ifc_summary(ifc_scores, modules=None, title="Summary of Top 10 Modules by IFC"):
+    """Print a table of the given modules, or of the top 10 modules by IFC."""
+    print(f"\n📊 {title}:")
+    print("{:<40} {:<8} {:<8} {:<8} {:<12}".format("Module", "Fan In", "Fan Out", "LOC", "IFC"))
+    print("="*80)
     
-    # Print summary
-    print("\n📊 Summary of Top 10 Modules by IFC:")
-    print("{:<20} {:<8} {:<8} {:<8} {:<12}".format("Module", "Fan In", "Fan Out", "LOC", "IFC"))
-    print("="*60)
-    
-    for mod, data in sorted(ifc_scores.items(), key=lambda x: x[1]["IFC"], reverse=True)[:10]:
-        print("{:<20} {:<8} {:<8} {:<8} {:<12.2f}".format(
+    if modules is None:
+        rows = sorted(ifc_scores.items(), key=lambda x: x[1]["IFC"], reverse=True)[:10]
+    else:
+        rows = [(mod, ifc_scores[mod]) for mod in sorted(modules) if mod in ifc_scores]
+    for mod, data in rows:
+        print("{:<40} {:<8} {:<8} {:<8} {:<12.2f}".format(
             mod, data["fan_in"], data["fan_out"], data["length"], data["IFC"]))
-    
-    return ifc_scores
+
+def record_history(project_root, ifc_scores):
+    """Append this run's per-module fan-in, fan-out, LOC and IFC to the metrics history store."""
+    file_values = {
+        os.path.join(project_root, mod): {
+            "info_flow.fan_in": data["fan_in"],
+            "info_flow.fan_out": data["fan_out"],
+            "info_flow.loc": data["length"],
+            "info_flow.ifc": data["IFC"],
+        }
+        for mod, data in ifc_scores.items()
+    }
+    record_run(project_root, "info_flow", file_values,
+               {"info_flow.modules": len(ifc_scores),
+                "info_flow.total_ifc": sum(data["IFC"] for data in ifc_scores.values())})
+
+class LiveInformationFlow:
+    """
+    In-memory information-flow state for --watch mode.
+
+    Each module keeps its dependency and dependent sets, so a changed file
+    only re-resolves its own references and fan-in/fan-out change edge by
+    edge. Candidate paths that did not resolve are remembered, so creating a
+    file re-resolves only the modules that may refer to it.
+    """
+
+    def __init__(self, project_root, inventory=None, cache=None):
+        self.project_root = project_root
+        self.loc = {}                       # module path -> LOC (insertion ordered: the module list)
+        self.references = {}                # module path -> candidate path lists
+        self.dependencies = {}              # module path -> set of module paths it uses
+        self.dependents = defaultdict(set)  # module path -> set of module paths using it
+        self.waiting = defaultdict(set)     # missing candidate path -> modules that tried it
+
+        if inventory is None:
+            inventory = scan_tree(project_root, exclude_dirs=EXCLUDED_DIRS, extensions=MODULE_EXTENSIONS)
+        entries = inventory.with_extensions(MODULE_EXTENSIONS)
+        for entry in entries:
+            self.loc[entry.rel_path] = 0
+        for entry in entries:
+            self._analyze(entry, cache)
+        for entry in entries:
+            self._resolve(entry.rel_path)
+
+    def _analyze(self, entry, cache=None):
+        try:
+            info = analyze_module(entry.path, entry.extension, cache)
+        except Exception as e:
+            print(f"Error processing {entry.path}: {e}")
+            info = {"loc": 0, "imports": [], "includes": [], "css_links": []}
+        self.loc[entry.rel_path] = info["loc"]
+        self.references[entry.rel_path] = reference_candidates(entry.rel_path, entry.extension, info)
+
+    def _resolve(self, module):
+        """Recompute the outgoing edges of one module; return the modules whose fan-in changed."""
+        old_targets = self.dependencies.pop(module, set())
+        for target in old_targets:
+            self.dependents[target].discard(module)
+
+        targets = set()
+        if module in self.loc:
+            for candidates in self.references.get(module, ()):
+                for candidate in candidates:
+                    if candidate in self.loc:
+                        if candidate != module:
+                            targets.add(candidate)
+                        break
+                    self.waiting[candidate].add(module)
+            self.dependencies[module] = targets
+            for target in targets:
+                self.dependents[target].add(module)
+        return old_targets ^ targets
+
+    def update(self, rel_path):
+        """Apply a created, modified or deleted file; return the modules whose metrics changed."""
+        entry = stat_entry(self.project_root, rel_path)
+        existed = rel_path in self.loc
+        if entry is None and not existed:
+            return set()
+
+        affected = {rel_path}
+        if entry is None:
+            del self.loc[rel_path]
+            self.references.pop(rel_path, None)
+            affected |= self._resolve(rel_path)
+            # Modules that used it may now resolve to another candidate, or to nothing
+            importers = self.dependents.pop(rel_path, set())
+        else:
+            if not existed:
+                self.loc[rel_path] = 0
+            self._analyze(entry)
+            affected |= self._resolve(rel_path)
+            importers = self.waiting.pop(rel_path, set()) if not existed else set()
+
+        for importer in importers:
+            if importer in self.loc:
+                affected.add(importer)
+                affected |= self._resolve(importer)
+        return affected
+
+    def scores(self):
+        """IFC scores of every module, in the same form as calculate_information_flow_metrics."""
+        ifc_scores = {}
+        for mod, length in self.loc.items():
+            dependencies = self.dependencies.get(mod, set())
+            dependents = self.dependents.get(mod, set())
+            fan_in, fan_out = len(dependents), len(dependencies)
+            ifc_scores[mod] = {
+                "fan_in": fan_in,
+                "fan_out": fan_out,
+                "length": length,
+                "dependencies": sorted(dependencies),
+                "dependent_modules": sorted(dependents),
+                # Henry-Kafura IFC formula: length * (fan_in * fan_out)^2
+                "IFC": length * (fan_in * fan_out) ** 2
+            }
+        return ifc_scores
+
+    def graph(self):
+        """The live state as (graph, loc), as build_dependency_graph returns it, for save_ifc_columns."""
+        graph = DependencyGraph()
+        for mod in self.loc:
+            graph.add_node(mod)
+        loc = array("i", self.loc.values())
+        for mod in self.loc:
+            for target in sorted(self.dependencies.get(mod, ())):
+                graph.add_edge(graph.index[mod], graph.index[target])
+        return graph, loc
+
+def watch_information_flow(project_root, live, output_format="json"):
+    """
+    Apply file changes to the live graph and rewrite the outputs after each
+    batch, in the same output_format as calculate_information_flow_metrics.
+    Runs until interrupted.
+    """
+    metrics_dir = os.path.join(project_root, "metrics")
+    print(f"\nWatching {project_root} for changes (Ctrl+C to stop)...")
+    for changed in watch_changes(project_root, exclude_dirs=EXCLUDED_DIRS, extensions=MODULE_EXTENSIONS):
+        affected = set()
+        for rel_path in sorted(changed):
+            affected |= live.update(rel_path)
+        ifc_scores = live.scores()
+        save_ifc_results(metrics_dir, ifc_scores, detailed_json=output_format != "columnar")
+        if output_format != "json":
+            save_ifc_columns(metrics_dir, *live.graph())
+        print_ifc_summary(ifc_scores, affected, title=f"Updated modules ({', '.join(sorted(changed))})")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Information Flow Complexity of the project modules.")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and update fan-in/fan-out as files change")
+    parser.add_argument("--format", choices=("json", "columnar", "both"), default="json",
+                        help="detailed output: information_flow_detailed.json, information_flow.cols "
+                             "(typed columns, memory-mapped by load_ifc_columns), or both (default: json)")
+    args = parser.parse_args()
+
     # Run from the project root directory
     project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    calculate_information_flow_metrics(project_dir)
\ No newline at end of file
+    inventory = scan_tree(project_dir, exclude_dirs=EXCLUDED_DIRS, extensions=MODULE_EXTENSIONS)
+    with open_cache(project_dir) as cache:
+        ifc_scores = calculate_information_flow_metrics(project_dir, inventory, cache, args.format)
+        live = LiveInformationFlow(project_dir, inventory, cache) if args.watch else None
+    record_history(project_dir, ifc_scores)
+
+    if live is not None:
+        try:
+            watch_information_flow(project_dir, live, args.format)
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
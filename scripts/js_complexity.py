@@ -0,0 +1,193 @@
+import os
+import re
+import csv
+import argparse
+
+from file_scanner import scan_tree
+from metrics_cache import open_cache, compute_cached
+from metrics_history import record_run
+from source_lexer import NUMBER, tokenize
+from tracing import span
+
+JS_EXTENSIONS = (".js", ".mjs", ".cjs")
+# Bump whenever scan_complexity changes its output, to invalidate cached results
+JS_COMPLEXITY_VERSION = "1"
+OUTPUT_FILE = os.path.join("metrics", "js_complexity.csv")
+
+# Each of these adds a path through a function, as in cyclomaticComplexity.js;
+# "&&", "||", "??" and the ternary "?" are recognized from their operator tokens
+DECISION_KEYWORDS = {b"if", b"for", b"while", b"case", b"catch"}
+DECISION_OPERATORS = {b"&", b"|", b"?"}
+
+# Handler names the block tracker gives Express routes: app.get('/login'), router.post("/x")
+ROUTE_NAME = re.compile(r"^\w+\.(get|post|put|patch|delete|all)\((['\"`])(.*)\2\)$")
+
+
+def _is_decision_operator(stream, index, token_id):
+    """Whether the & | or ? token at index begins a "&&", "||", "??" or ternary "?"."""
+    ids = stream.ids
+    following = ids[index + 1] if index + 1 < len(ids) else None
+    if index > 0 and ids[index - 1] == token_id:
+        return False                 # second character of a pair already counted
+    if stream.vocabulary[token_id] == b"?":
+        # "?." is optional chaining, unless it is "? .5 : x"
+        if following is None or stream.vocabulary[following] != b".":
+            return True
+        return index + 2 < len(ids) and stream.kinds[ids[index + 2]] == NUMBER
+    return following == token_id
+
+
+def stream_complexity(stream):
+    """
+    Cyclomatic complexity of a JavaScript TokenStream. Decision points
+    (outside comments and strings, which the stream leaves out) are found
+    by token id and attributed to the innermost function body around them.
+
+    Returns {"complexity": 1 + every decision point in the file,
+    "functions": [{"name", "line", "end_line", "complexity", "total_complexity"}],
+    "routes": [{"method", "path", "line", "end_line", "complexity"}]}, where
+    complexity counts a function's own body and total_complexity includes
+    the functions nested in it; a route's complexity is the total of its
+    handler, callbacks and all.
+    """
+    ids = stream.ids
+    keyword_ids = stream.ids_of(DECISION_KEYWORDS)
+    candidates = keyword_ids | stream.ids_of(DECISION_OPERATORS)
+    decisions = [index for index, token_id in enumerate(ids) if token_id in candidates
+                 and (token_id in keyword_ids or _is_decision_operator(stream, index, token_id))]
+
+    # Function spans nest, and are ordered by start: sweep them and the decisions together
+    functions = stream.functions
+    own = [0] * len(functions)
+    parents = [None] * len(functions)
+    top_level = 0
+    stack = []
+    next_function = 0
+    for index in decisions + [len(ids)]:
+        while next_function < len(functions) and functions[next_function].start <= index:
+            while stack and functions[stack[-1]].end <= functions[next_function].start:
+                stack.pop()
+            parents[next_function] = stack[-1] if stack else None
+            stack.append(next_function)
+            next_function += 1
+        if index == len(ids):
+            break
+        while stack and functions[stack[-1]].end <= index:
+            stack.pop()
+        if stack:
+            own[stack[-1]] += 1
+        else:
+            top_level += 1
+
+    totals = list(own)
+    for position in range(len(functions) - 1, -1, -1):
+        if parents[position] is not None:
+            totals[parents[position]] += totals[position]
+
+    results = sorted(({"name": function.name, "line": function.line, "end_line": function.end_line,
+                       "complexity": 1 + own[position], "total_complexity": 1 + totals[position]}
+                      for position, function in enumerate(functions)), key=lambda function: function["line"])
+    routes = []
+    for function in results:
+        route = ROUTE_NAME.match(function["name"])
+        if route:
+            routes.append({"method": route.group(1).upper(), "path": route.group(3), "line": function["line"],
+                           "end_line": function["end_line"], "complexity": function["total_complexity"]})
+    return {"complexity": 1 + top_level + sum(own), "functions": results, "routes": routes}
+
+
+def scan_complexity(content):
+    """stream_complexity of JavaScript source (str or bytes), sharing its token stream with other analyzers."""
+    return stream_complexity(tokenize(content, ".js"))
+
+
+def complexity_analysis():
+    """The (analyzer, version, compute) cache analysis for one JavaScript file."""
+    return ("js_complexity", JS_COMPLEXITY_VERSION, scan_complexity)
+
+
+def analyze_directory(directory, inventory=None, cache=None):
+    """{path: scan_complexity result} for every JavaScript file under directory."""
+    with span("js_complexity") as sp:
+        if inventory is None:
+            inventory = scan_tree(directory, extensions=JS_EXTENSIONS)
+        results = {}
+        for entry in inventory.with_extensions(JS_EXTENSIONS):
+            path = os.path.join(directory, entry.rel_path)
+            analyzer, version, compute = complexity_analysis()
+            try:
+                results[path] = compute_cached(cache, analyzer, version, path, compute, entry.size, entry.mtime)
+            except OSError as e:
+                print(f"Error reading {path}: {e}")
+            sp.count("bytes", entry.size)
+        sp.count("files", len(results))
+    return results
+
+
+def write_results(results, output_file=OUTPUT_FILE):
+    """One CSV row per function, with its route if it is an Express handler."""
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    with open(output_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["file", "function", "line", "end_line", "complexity", "total_complexity", "route"])
+        for path, result in results.items():
+            for function in result["functions"]:
+                route = ROUTE_NAME.match(function["name"])
+                writer.writerow([path, function["name"], function["line"], function["end_line"],
+                                 function["complexity"], function["total_complexity"],
+                                 f"{route.group(1).upper()} {route.group(3)}" if route else ""])
+    print(f"JavaScript complexity saved to {output_file}")
+
+
+def record_history(project_root, results):
+    """Append this run's per-file complexity to the metrics history store."""
+    file_values = {}
+    for path, result in results.items():
+        functions = result["functions"]
+        file_values[path] = {
+            "js.complexity": result["complexity"],
+            "js.functions": len(functions),
+            "js.max_function_complexity": max((f["complexity"] for f in functions), default=None),
+            "js.routes": len(result["routes"]),
+        }
+    record_run(project_root, "js_complexity", file_values,
+               {"js.files": len(results), "js.routes": sum(len(r["routes"]) for r in results.values())})
+
+
+def print_results(results, threshold=1):
+    print("\n{:<40} {:>10} {:>10} {:>8}".format("File", "Complexity", "Functions", "Routes"))
+    print("=" * 71)
+    for path, result in results.items():
+        print("{:<40} {:>10} {:>10} {:>8}".format(path[-40:], result["complexity"],
+                                                 len(result["functions"]), len(result["routes"])))
+    for path, result in results.items():
+        routes = [route for route in result["routes"] if route["complexity"] >= threshold]
+        if not routes:
+            continue
+        print(f"\nRoutes in {path}:")
+        print("  {:<7} {:<44} {:>11} {:>10}".format("Method", "Path", "Lines", "Complexity"))
+        for route in routes:
+            print("  {:<7} {:<44} {:>11} {:>10}".format(route["method"], route["path"][:44],
+                                                       f"{route['line']}-{route['end_line']}", route["complexity"]))
+
+
+def main():
+    # Scans and writes under the project root, wherever it is run from
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Cyclomatic complexity of JavaScript, per function and route.")
+    parser.add_argument("directory", nargs="?", default=project_root,
+                        help="directory to analyze (default: the project root)")
+    parser.add_argument("-o", "--output", default=os.path.join(project_root, OUTPUT_FILE),
+                        help=f"CSV output (default: {OUTPUT_FILE} under the project root)")
+    parser.add_argument("--min-complexity", type=int, default=1, help="only list routes at least this complex")
+    args = parser.parse_args()
+
+    with open_cache(project_root) as cache:
+        results = analyze_directory(args.directory, cache=cache)
+    print_results(results, args.min_complexity)
+    write_results(results, args.output)
+    record_history(project_root, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import hashlib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+CACHE_FILE_NAME = "metrics_cache.json"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024   # Evict least recently used results above this size
+DEFAULT_MAX_AGE_DAYS = 30              # Evict results not used for this long
+USED_RESOLUTION = 24 * 3600            # "used" is only refreshed once this old, so a warm run writes nothing
+STREAM_HASH_MIN_BYTES = 8 * 1024 * 1024  # Larger files are hashed in chunks, never held whole
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def hash_content(data):
+    """Return the content hash used as the cache key for a file."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def hash_file(path):
+    """Hash a file's content in fixed-size chunks; equal to hash_content of the whole file."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def decode_text(data):
+    """Decode file bytes the way the collectors read files (UTF-8, universal newlines)."""
+    return data.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def read_text(path):
+    """Read a file as text, dropping undecodable bytes."""
+    with open(path, "rb") as f:
+        return decode_text(f.read())
+
+
+class MetricsCache:
+    """
+    On-disk cache of per-file metric results.
+
+    Results are keyed by analyzer name, analyzer version and the file's content
+    hash, so renamed or reverted files are still hits. A file whose size and
+    mtime match the last run is not even read: its recorded hash is reused.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.cache_dir = str(cache_dir)
+        self.cache_file = os.path.join(self.cache_dir, CACHE_FILE_NAME)
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 24 * 3600
+        self.files = {}     # abs path -> {"size", "mtime", "hash", "used"}
+        self.results = {}   # "analyzer:version:hash" -> {"result", "bytes", "used"}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._now = time.time()
+        self.load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.save()
+
+    def load(self):
+        """Load the cache file; a missing or corrupt cache starts empty."""
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.results = data.get("results", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable metrics cache {self.cache_file}: {e}")
+
+    def save(self):
+        """
+        Evict stale entries and write the cache back atomically. Processes
+        sharing the cache (shards run side by side) save one at a time under
+        a lock, each merging what the others saved, so no entry is lost.
+        """
+        self.evict()
+        if not self._dirty:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.cache_file + ".lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            self._merge_saved()
+            self.evict()
+            # Per process, so shards run side by side never write the same temporary file
+            tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump({"files": self.files, "results": self.results}, f, separators=(",", ":"))
+            os.replace(tmp_file, self.cache_file)
+        self._dirty = False
+
+    def _merge_saved(self):
+        """Add the entries another process saved since this cache was loaded, keeping the latest use of each."""
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, entry in data.get("results", {}).items():
+            mine = self.results.get(key)
+            if mine is None or entry["used"] > mine["used"]:
+                self.results[key] = entry
+        for path, record in data.get("files", {}).items():
+            mine = self.files.get(path)
+            if mine is None or (record["mtime"], record["used"]) > (mine["mtime"], mine["used"]):
+                self.files[path] = record
+
+    def _touch(self, entry):
+        """Mark a file record or result as used by this run."""
+        if self._now - entry["used"] >= USED_RESOLUTION:
+            entry["used"] = self._now
+            self._dirty = True
+
+    def evict(self):
+        """Drop entries older than max_age, then least recently used results above max_bytes."""
+        cutoff = self._now - self.max_age
+        stale = [key for key, entry in self.results.items() if entry["used"] < cutoff]
+        stale_files = [path for path, rec in self.files.items() if rec["used"] < cutoff]
+        for key in stale:
+            del self.results[key]
+        for path in stale_files:
+            del self.files[path]
+
+        total = sum(entry["bytes"] for entry in self.results.values())
+        if total > self.max_bytes:
+            for key, entry in sorted(self.results.items(), key=lambda item: item[1]["used"]):
+                if total <= self.max_bytes:
+                    break
+                total -= entry["bytes"]
+                del self.results[key]
+                stale.append(key)
+
+        if stale or stale_files:
+            self._dirty = True
+
+    def _file_state(self, path, size=None, mtime=None):
+        """
+        Return (content hash, file bytes or None) for a file.
+
+        The file is only read when its size or mtime differ from the last
+        recorded state; otherwise the stored hash is reused and bytes is None.
+        Large files are hashed in chunks and bytes is None as well.
+        """
+        if size is None or mtime is None:
+            stat = os.stat(path)
+            size, mtime = stat.st_size, stat.st_mtime
+        record = self.files.get(path)
+        if record is not None and record["size"] == size and record["mtime"] == mtime:
+            self._touch(record)
+            return record["hash"], None
+
+        if size >= STREAM_HASH_MIN_BYTES:
+            data = None
+            digest = hash_file(path)
+        else:
+            with open(path, "rb") as f:
+                data = f.read()
+            digest = hash_content(data)
+        self.files[path] = {"size": size, "mtime": mtime, "hash": digest, "used": self._now}
+        self._dirty = True
+        return digest, data
+
+    def lookup(self, analyzer, version, path, size=None, mtime=None):
+        """Return (found, result) for a file's cached result of one analyzer."""
+        path = os.path.abspath(path)
+        digest, _ = self._file_state(path, size, mtime)
+        entry = self.results.get(f"{analyzer}:{version}:{digest}")
+        if entry is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self._touch(entry)
+        return True, entry["result"]
+
+    def store(self, analyzer, version, path, result):
+        """Record a result for a file's current content. Results must be JSON serializable."""
+        path = os.path.abspath(path)
+        digest, _ = self._file_state(path)
+        self._put(f"{analyzer}:{version}:{digest}", result)
+
+    def _put(self, key, result):
+        self.results[key] = {
+            "result": result,
+            "bytes": len(json.dumps(result, separators=(",", ":"))),
+            "used": self._now,
+        }
+        self._dirty = True
+
+    def get_or_compute(self, analyzer, version, path, compute, size=None, mtime=None):
+        """Return the cached result, or call compute(text) on the file content and store it."""
+        return self.get_or_compute_many(path, [(analyzer, version, compute)], size, mtime)[0]
+
+    def get_or_compute_many(self, path, analyses, size=None, mtime=None):
+        """
+        Results of several (analyzer, version, compute) analyses of one file.
+        The file is read and decoded at most once, and only if one of them
+        is not cached.
+        """
+        path = os.path.abspath(path)
+        digest, data = self._file_state(path, size, mtime)
+        text = None
+        results = []
+        for analyzer, version, compute in analyses:
+            key = f"{analyzer}:{version}:{digest}"
+            entry = self.results.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._touch(entry)
+                results.append(entry["result"])
+                continue
+
+            self.misses += 1
+            if text is None:
+                text = read_text(path) if data is None else decode_text(data)
+            result = compute(text)
+            self._put(key, result)
+            results.append(result)
+        return results
+
+    def get_or_compute_blob(self, analyzer, version, blob_id, read, compute):
+        """
+        Like get_or_compute, for content identified by a git blob id instead
+        of a file: read() is only called (and returns bytes) on a miss.
+        """
+        key = f"{analyzer}:{version}:blob:{blob_id}"
+        entry = self.results.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._touch(entry)
+            return entry["result"]
+
+        self.misses += 1
+        result = compute(decode_text(read()))
+        self._put(key, result)
+        return result
+
+
+def open_cache(project_root, **kwargs):
+    """Open the metrics cache stored under <project_root>/metrics/.cache."""
+    return MetricsCache(os.path.join(str(project_root), "metrics", ".cache"), **kwargs)
+
+
+def compute_cached(cache, analyzer, version, path, compute, size=None, mtime=None):
+    """Run compute(text) on a file, going through the cache when one is given."""
+    if cache is None:
+        return compute(read_text(path))
+    return cache.get_or_compute(analyzer, version, path, compute, size, mtime)
+
+
+def compute_cached_many(cache, path, analyses, size=None, mtime=None):
+    """Run several (analyzer, version, compute) analyses on one file, reading it once."""
+    if cache is None:
+        text = read_text(path)
+        return [compute(text) for _, _, compute in analyses]
+    return cache.get_or_compute_many(path, analyses, size, mtime)
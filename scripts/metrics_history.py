@@ -0,0 +1,307 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import subprocess
+
+# Lives next to the CSV outputs; the CSVs still hold the latest run only
+HISTORY_FILE = os.path.join("metrics", "history.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    collector TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    git_commit TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS file_metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    metric_id INTEGER NOT NULL REFERENCES metrics(id),
+    value REAL,
+    PRIMARY KEY (file_id, metric_id, run_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS file_metrics_by_file ON file_metrics (file_id, run_id);
+CREATE INDEX IF NOT EXISTS file_metrics_by_metric ON file_metrics (metric_id, run_id);
+CREATE TABLE IF NOT EXISTS run_metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    metric_id INTEGER NOT NULL REFERENCES metrics(id),
+    value REAL,
+    PRIMARY KEY (metric_id, run_id)
+) WITHOUT ROWID;
+"""
+
+# Rows buffered by a run before they are inserted with one executemany
+BATCH_ROWS = 5000
+
+
+def current_commit(repo_dir="."):
+    """HEAD commit of the repository, or None outside a git checkout."""
+    try:
+        result = subprocess.run(["git", "-C", str(repo_dir), "rev-parse", "HEAD"],
+                                capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def history_path(project_root, path):
+    """Key a file by its path relative to the project root, with "/" separators."""
+    rel_path = os.path.relpath(os.path.abspath(path), os.path.abspath(project_root))
+    return rel_path.replace(os.sep, "/")
+
+
+class MetricsRun:
+    """
+    One collector run being recorded. The whole run is a single transaction;
+    metric values are buffered and inserted BATCH_ROWS rows at a time, and
+    nothing is visible until commit(), so an interrupted run leaves no
+    partial history behind.
+    """
+
+    def __init__(self, history, collector, git_commit=None):
+        self.history = history
+        self.collector = collector
+        self.git_commit = git_commit
+        self.started_at = time.time()
+        self.id = None
+        self._file_rows = []
+        self._run_rows = []
+
+    def _begin(self):
+        """Open the run's transaction and insert its row on first use."""
+        if self.id is None:
+            db = self.history.db
+            db.execute("BEGIN")
+            self.id = db.execute("INSERT INTO runs (collector, started_at, git_commit) VALUES (?, ?, ?)",
+                                 (self.collector, self.started_at, self.git_commit)).lastrowid
+
+    def add_file_metrics(self, path, values):
+        """Record {metric name: number} for one file; None values are skipped."""
+        self._begin()
+        file_id = self.history.file_id(path)
+        for name, value in values.items():
+            if value is None:
+                continue
+            self._file_rows.append((file_id, self.history.metric_id(name), float(value)))
+        if len(self._file_rows) >= BATCH_ROWS:
+            self.flush()
+
+    def add_metrics(self, values):
+        """Record project-level {metric name: number} values for this run."""
+        self._begin()
+        for name, value in values.items():
+            if value is not None:
+                self._run_rows.append((self.history.metric_id(name), float(value)))
+
+    def flush(self):
+        """Write the buffered rows inside the open transaction."""
+        self._begin()
+        db = self.history.db
+        db.executemany("INSERT OR REPLACE INTO file_metrics (run_id, file_id, metric_id, value) VALUES (?, ?, ?, ?)",
+                       [(self.id, file_id, metric_id, value) for file_id, metric_id, value in self._file_rows])
+        db.executemany("INSERT OR REPLACE INTO run_metrics (run_id, metric_id, value) VALUES (?, ?, ?)",
+                       [(self.id, metric_id, value) for metric_id, value in self._run_rows])
+        self._file_rows = []
+        self._run_rows = []
+
+    def commit(self):
+        self.flush()
+        self.history.db.execute("COMMIT")
+
+    def rollback(self):
+        if self.history.db.in_transaction:
+            self.history.db.execute("ROLLBACK")
+        self.history.forget_ids()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+
+class MetricsHistory:
+    """
+    SQLite store of every collector run.
+
+    Per-file values live in file_metrics, indexed on (file, run) and
+    (metric, run), so a trend for one file or one metric is an index range
+    scan. File paths and metric names are interned in their own tables.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # Transactions are managed explicitly by MetricsRun
+        self.db = sqlite3.connect(db_path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._file_ids = {}
+        self._metric_ids = {}
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _intern(self, table, column, value, ids):
+        key = ids.get(value)
+        if key is None:
+            row = self.db.execute(f"SELECT id FROM {table} WHERE {column} = ?", (value,)).fetchone()
+            if row is None:
+                key = self.db.execute(f"INSERT INTO {table} ({column}) VALUES (?)", (value,)).lastrowid
+            else:
+                key = row[0]
+            ids[value] = key
+        return key
+
+    def file_id(self, path):
+        return self._intern("files", "path", path, self._file_ids)
+
+    def metric_id(self, name):
+        return self._intern("metrics", "name", name, self._metric_ids)
+
+    def forget_ids(self):
+        """Drop cached ids, which may refer to rows of a rolled back transaction."""
+        self._file_ids.clear()
+        self._metric_ids.clear()
+
+    def start_run(self, collector, git_commit=None):
+        """Return a MetricsRun; use it as a context manager or call commit()."""
+        return MetricsRun(self, collector, git_commit)
+
+    def runs(self, collector=None, limit=20):
+        """Most recent runs as (id, collector, started_at, git_commit), newest first."""
+        query = "SELECT id, collector, started_at, git_commit FROM runs"
+        params = []
+        if collector:
+            query += " WHERE collector = ?"
+            params.append(collector)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        return self.db.execute(query, params).fetchall()
+
+    def file_trend(self, path, metric, limit=200):
+        """(run id, started_at, value) of a file's metric over its last runs, oldest first."""
+        rows = self.db.execute("""
+            SELECT r.id, r.started_at, fm.value
+            FROM file_metrics fm
+            JOIN runs r ON r.id = fm.run_id
+            WHERE fm.file_id = (SELECT id FROM files WHERE path = ?)
+              AND fm.metric_id = (SELECT id FROM metrics WHERE name = ?)
+            ORDER BY fm.run_id DESC LIMIT ?
+        """, (path, metric, limit)).fetchall()
+        return rows[::-1]
+
+    def metric_trend(self, metric, limit=200):
+        """(run id, started_at, value) of a project-level metric over its last runs, oldest first."""
+        rows = self.db.execute("""
+            SELECT r.id, r.started_at, rm.value
+            FROM run_metrics rm
+            JOIN runs r ON r.id = rm.run_id
+            WHERE rm.metric_id = (SELECT id FROM metrics WHERE name = ?)
+            ORDER BY rm.run_id DESC LIMIT ?
+        """, (metric, limit)).fetchall()
+        return rows[::-1]
+
+    def latest_values(self, metric, collector=None):
+        """{file: value} of a metric from the most recent run that recorded it."""
+        query = """
+            SELECT MAX(fm.run_id) FROM file_metrics fm JOIN runs r ON r.id = fm.run_id
+            WHERE fm.metric_id = (SELECT id FROM metrics WHERE name = ?)
+        """
+        params = [metric]
+        if collector:
+            query += " AND r.collector = ?"
+            params.append(collector)
+        run_id = self.db.execute(query, params).fetchone()[0]
+        if run_id is None:
+            return {}
+        return dict(self.db.execute("""
+            SELECT f.path, fm.value FROM file_metrics fm JOIN files f ON f.id = fm.file_id
+            WHERE fm.metric_id = (SELECT id FROM metrics WHERE name = ?) AND fm.run_id = ?
+        """, (metric, run_id)).fetchall())
+
+
+def open_history(project_root="."):
+    """Open the history store of a project (metrics/history.sqlite3)."""
+    return MetricsHistory(os.path.join(str(project_root), HISTORY_FILE))
+
+
+def record_run(project_root, collector, file_values=None, run_values=None):
+    """
+    Record one collector run: file_values maps file path -> {metric: value},
+    run_values holds project-level metrics. Errors are reported, not raised,
+    so a locked or unwritable database never fails the collector itself.
+    """
+    try:
+        with open_history(project_root) as history:
+            with history.start_run(collector, current_commit(project_root)) as run:
+                for path, values in (file_values or {}).items():
+                    run.add_file_metrics(history_path(project_root, path), values)
+                run.add_metrics(run_values or {})
+        print(f"Run recorded in {os.path.join(str(project_root), HISTORY_FILE)}")
+    except sqlite3.Error as e:
+        print(f"Could not record {collector} run in the metrics history: {e}")
+
+
+def _format_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the metrics history store.")
+    parser.add_argument("--db", default=None, help=f"database file (default: <project>/{HISTORY_FILE})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    runs_parser = sub.add_parser("runs", help="list recent runs")
+    runs_parser.add_argument("--collector", help="only runs of this collector")
+    runs_parser.add_argument("--limit", type=int, default=20)
+
+    trend_parser = sub.add_parser("trend", help="values of one metric over the last runs")
+    trend_parser.add_argument("metric", help="metric name, e.g. halstead.effort")
+    trend_parser.add_argument("file", nargs="?", help="file path relative to the project root; "
+                                                      "omit for project-level metrics")
+    trend_parser.add_argument("--limit", type=int, default=200)
+    args = parser.parse_args()
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    db_path = args.db or os.path.join(project_root, HISTORY_FILE)
+    if not os.path.exists(db_path):
+        print(f"No metrics history at {db_path}")
+        sys.exit(1)
+
+    with MetricsHistory(db_path) as history:
+        if args.command == "runs":
+            for run_id, collector, started_at, git_commit in history.runs(args.collector, args.limit):
+                print(f"{run_id:>6}  {_format_time(started_at)}  {collector:<16} {git_commit or ''}")
+        elif args.file:
+            for run_id, started_at, value in history.file_trend(args.file, args.metric, args.limit):
+                print(f"{run_id:>6}  {_format_time(started_at)}  {value:.2f}")
+        else:
+            for run_id, started_at, value in history.metric_trend(args.metric, args.limit):
+                print(f"{run_id:>6}  {_format_time(started_at)}  {value:.2f}")
+
+
+if __name__ == "__main__":
+    main()
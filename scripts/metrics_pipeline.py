@@ -0,0 +1,458 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import subprocess
+import argparse
+from pathlib import Path
+from typing import Callable, NamedTuple, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from file_scanner import FileEntry, scan_tree, DEFAULT_EXCLUDE_DIRS
+from metrics_cache import open_cache, compute_cached_many
+from tracing import span, start_tracing
+from halstead_analysis import (SOURCE_EXTENSIONS, HALSTEAD_VERSION, STREAMING_MIN_BYTES,
+                               content_analysis as halstead_analysis, analyze_file as halstead_file)
+from halstead_analysis import record_history as record_halstead
+from COCOMO_estimation import COCOMOEstimator, loc_analysis, save_report
+from COCOMO_estimation import record_history as record_cocomo
+from info_flow_complexity import (EXCLUDED_DIRS as INFO_FLOW_EXCLUDED_DIRS, INFO_FLOW_VERSION, MODULE_ANALYZERS,
+                                  resolve_modules, graph_from_edges, compute_ifc_scores, save_ifc_results,
+                                  print_ifc_summary)
+from info_flow_complexity import record_history as record_info_flow
+from collect_code_metrics import SOURCE_FOLDER as RADON_SOURCE_FOLDER, OUTPUT_FILE as RADON_OUTPUT_FILE
+from collect_code_metrics import history_values as radon_history_values, write_code_metrics
+from collect_process_metrics import update_process_metrics
+from metrics_history import record_run
+from radon_engine import RADON_ENGINE_VERSION, analyze_source
+from js_complexity import JS_EXTENSIONS, OUTPUT_FILE as JS_COMPLEXITY_OUTPUT_FILE, complexity_analysis
+from js_complexity import write_results as write_js_complexity, record_history as record_js_complexity
+
+COLLECTORS = ("halstead", "cocomo", "info_flow", "radon", "js_complexity", "process")
+# Collectors that can run as shards of the inventory on separate processes or hosts
+SHARDED_COLLECTORS = ("halstead", "cocomo", "info_flow")
+# Bump whenever the partial result layout changes; merge refuses mixed versions
+PARTIAL_VERSION = 1
+SHARD_DIR = os.path.join("metrics", "shards")
+
+
+class Stage(NamedTuple):
+    name: str
+    run: Callable         # run(inputs) -> result, where inputs maps each dependency to its result
+    deps: Tuple[str, ...] = ()
+
+
+def run_stages(stages, max_workers=None):
+    """
+    Run stages as soon as their dependencies have finished, independent ones
+    concurrently on threads. A failed stage is reported and its dependents
+    are skipped. Returns ({stage: result}, {stage: seconds}, [failed stages]).
+    """
+    pending = {stage.name: stage for stage in stages}
+    results, timings, failed = {}, {}, []
+    running = {}
+
+    def execute(stage, inputs):
+        start = time.perf_counter()
+        with span(stage.name):
+            result = stage.run(inputs)
+        return result, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(pending) or 1) as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if any(dep in failed for dep in stage.deps):
+                    print(f"Skipping {name}: {', '.join(dep for dep in stage.deps if dep in failed)} failed")
+                    failed.append(name)
+                    del pending[name]
+                elif all(dep in results for dep in stage.deps):
+                    del pending[name]
+                    running[pool.submit(execute, stage, {dep: results[dep] for dep in stage.deps})] = name
+            if not running:
+                if pending:
+                    raise ValueError(f"Stages with unknown or circular dependencies: {sorted(pending)}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name], timings[name] = future.result()
+                except Exception as e:
+                    print(f"Stage {name} failed: {e}")
+                    failed.append(name)
+    return results, timings, failed
+
+
+class MetricsPipeline:
+    """
+    All collectors as one dependency graph of stages:
+
+        scan -> source_pass -> halstead, cocomo, info_flow, radon, js_complexity
+        process (git history, independent of the source tree)
+
+    The source pass reads and decodes every file once and hands its text to
+    every analyzer that covers it, with the same per-analyzer cache keys as
+    the individual scripts. The git pass runs concurrently with it.
+    """
+
+    def __init__(self, project_root, collectors=COLLECTORS, branch="main", full=False):
+        self.project_root = os.path.abspath(project_root)
+        self.metrics_dir = os.path.join(self.project_root, "metrics")
+        self.collectors = [name for name in COLLECTORS if name in collectors]
+        self.branch = branch
+        self.full = full
+        self.cache = None
+        self.cocomo = COCOMOEstimator()
+        self.cocomo.project_root = Path(self.project_root)
+
+    def stages(self):
+        source_collectors = [name for name in self.collectors if name != "process"]
+        stages = []
+        if source_collectors:
+            stages.append(Stage("scan", self.scan))
+            stages.append(Stage("source_pass", self.source_pass, ("scan",)))
+            for name in source_collectors:
+                stages.append(Stage(name, getattr(self, f"report_{name}"), ("source_pass",)))
+        if "process" in self.collectors:
+            stages.append(Stage("process", self.process))
+        return stages
+
+    # ------------------------------------------------------------ source tree
+
+    def scan(self, inputs):
+        """One walk of the tree; each collector's own exclusions are applied on the result."""
+        inventory = scan_tree(self.project_root, exclude_dirs=DEFAULT_EXCLUDE_DIRS)
+        scopes = {}
+        if "halstead" in self.collectors:
+            scopes["halstead"] = {entry.rel_path for entry in inventory.with_extensions(SOURCE_EXTENSIONS)}
+        if "cocomo" in self.collectors:
+            cocomo_inventory = inventory.excluding(self.cocomo.exclude_dirs)
+            scopes["cocomo"] = {entry.rel_path for entry in cocomo_inventory
+                                if self.cocomo.component_of(entry) is not None}
+        if "info_flow" in self.collectors:
+            scopes["info_flow"] = {entry.rel_path for entry in
+                                   inventory.excluding(INFO_FLOW_EXCLUDED_DIRS).with_extensions(MODULE_ANALYZERS)}
+        if "radon" in self.collectors:
+            prefix = RADON_SOURCE_FOLDER + "/"
+            scopes["radon"] = {entry.rel_path for entry in inventory.with_extensions([".py"])
+                               if entry.rel_path.startswith(prefix)}
+        if "js_complexity" in self.collectors:
+            scopes["js_complexity"] = {entry.rel_path for entry in inventory.with_extensions(JS_EXTENSIONS)}
+        return inventory, scopes
+
+    def _analyses(self, entry, scopes):
+        """The (collector, (analyzer, version, compute)) pairs that apply to one file."""
+        analyses = []
+        rel_path = entry.rel_path
+        if rel_path in scopes.get("halstead", ()) and entry.size < STREAMING_MIN_BYTES:
+            analyses.append(("halstead", halstead_analysis(entry.extension)))
+        if rel_path in scopes.get("cocomo", ()):
+            analyses.append(("cocomo", loc_analysis(entry.extension)))
+        if rel_path in scopes.get("info_flow", ()):
+            name, analyzer = MODULE_ANALYZERS[entry.extension]
+            analyses.append(("info_flow", (name, INFO_FLOW_VERSION, analyzer)))
+        if rel_path in scopes.get("radon", ()):
+            filename = os.path.join(RADON_SOURCE_FOLDER, rel_path[len(RADON_SOURCE_FOLDER) + 1:])
+            analyses.append(("radon", ("radon", RADON_ENGINE_VERSION,
+                                       lambda code, filename=filename: analyze_source(code, filename))))
+        if rel_path in scopes.get("js_complexity", ()):
+            analyses.append(("js_complexity", complexity_analysis()))
+        return analyses
+
+    def source_pass(self, inputs):
+        """
+        Read each in-scope file once; returns {collector: [(entry, result), ...]}
+        in scan order. Information-flow results are (loc, resolved targets).
+        """
+        inventory, scopes = inputs["scan"]
+        per_collector = {name: [] for name in scopes}
+        with span("read_and_analyze") as sp:
+            for entry in inventory:
+                analyses = self._analyses(entry, scopes)
+                if entry.rel_path in scopes.get("halstead", ()) and entry.size >= STREAMING_MIN_BYTES:
+                    # Huge files are tokenized in chunks, as analyze_directory does
+                    per_collector["halstead"].append((entry, self._stream_halstead(entry)))
+                if not analyses:
+                    continue
+                try:
+                    results = compute_cached_many(self.cache, entry.path, [analysis for _, analysis in analyses],
+                                                  entry.size, entry.mtime)
+                except OSError as e:
+                    print(f"Error reading {entry.path}: {e}")
+                    continue
+                sp.count("files")
+                sp.count("bytes", entry.size)
+                for (collector, _), result in zip(analyses, results):
+                    per_collector[collector].append((entry, result))
+        if "info_flow" in per_collector:
+            # Resolved against every module in scope, so a shard's edges are those of a full run
+            pairs = per_collector["info_flow"]
+            modules = resolve_modules([(entry.rel_path, entry.extension, info) for entry, info in pairs],
+                                      scopes["info_flow"])
+            per_collector["info_flow"] = [(entry, (loc, targets))
+                                          for (entry, _), (_, _, loc, targets) in zip(pairs, modules)]
+        return per_collector
+
+    def _stream_halstead(self, entry):
+        if self.cache is not None:
+            found, metrics = self.cache.lookup("halstead" + entry.extension, HALSTEAD_VERSION, entry.path,
+                                               entry.size, entry.mtime)
+            if found:
+                return metrics
+        metrics = halstead_file(entry.path)
+        if self.cache is not None:
+            self.cache.store("halstead" + entry.extension, HALSTEAD_VERSION, entry.path, metrics)
+        return metrics
+
+    # ------------------------------------------------------------ reports
+
+    def report_halstead(self, inputs):
+        results = {entry.path: metrics for entry, metrics in inputs["source_pass"]["halstead"] if metrics}
+        total_effort = sum(metrics["Effort (E)"] for metrics in results.values())
+        print(f"Halstead: {len(results)} files, total effort {total_effort:,.2f}")
+        record_halstead(self.project_root, results)
+        return results
+
+    def report_cocomo(self, inputs):
+        estimator = self.cocomo
+        for entry, loc in inputs["source_pass"]["cocomo"]:
+            component = estimator.component_of(entry)
+            estimator.add_loc(component, loc)
+            estimator.file_loc[entry.rel_path] = (component, loc)
+        save_report(estimator)
+        record_cocomo(estimator)
+        return estimator.calculate_cocomo()
+
+    def report_info_flow(self, inputs):
+        modules = [(entry.rel_path, entry.extension, loc, targets)
+                   for entry, (loc, targets) in inputs["source_pass"]["info_flow"]]
+        graph, loc = graph_from_edges(modules)
+        ifc_scores = compute_ifc_scores(graph, loc)
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        save_ifc_results(self.metrics_dir, ifc_scores)
+        print_ifc_summary(ifc_scores)
+        record_info_flow(self.project_root, ifc_scores)
+        return ifc_scores
+
+    def report_radon(self, inputs):
+        file_metrics = {}
+        for entry, result in inputs["source_pass"]["radon"]:
+            # Same relative names as collect_code_metrics.py run from the project root
+            filename = os.path.join(RADON_SOURCE_FOLDER, entry.rel_path[len(RADON_SOURCE_FOLDER) + 1:])
+            file_metrics[filename] = result
+            if "error" in result:
+                print(f"Error analyzing {filename}: {result['error']}")
+        write_code_metrics(file_metrics, os.path.join(self.project_root, RADON_OUTPUT_FILE))
+        record_run(self.project_root, "radon", {
+            os.path.join(self.project_root, filename): radon_history_values(result)
+            for filename, result in file_metrics.items()
+        })
+        return file_metrics
+
+    def report_js_complexity(self, inputs):
+        results = {entry.path: result for entry, result in inputs["source_pass"]["js_complexity"]}
+        routes = sum(len(result["routes"]) for result in results.values())
+        print(f"JavaScript complexity: {len(results)} files, {routes} routes")
+        write_js_complexity(results, os.path.join(self.project_root, JS_COMPLEXITY_OUTPUT_FILE))
+        record_js_complexity(self.project_root, results)
+        return results
+
+    # ------------------------------------------------------------ shards
+
+    def run_shard(self, index, shard_count):
+        """
+        Run the source pass over one shard of the inventory and return its
+        partial result: every file of the shard with its position in the full
+        scan, and each collector's per-file results (Halstead measures, COCOMO
+        LOC, information-flow LOC and edges). The whole tree is still scanned,
+        for the positions and for resolving imports into other shards.
+        Nothing is written or recorded.
+        """
+        inventory, scopes = self.scan({})
+        positions = {entry.rel_path: position for position, entry in enumerate(inventory)}
+        shard = inventory.shard(index, shard_count)
+        with open_cache(self.project_root) as cache:
+            self.cache = cache
+            try:
+                per_collector = self.source_pass({"scan": (shard, scopes)})
+            finally:
+                self.cache = None
+        return {
+            "version": PARTIAL_VERSION,
+            "shard": index,
+            "shards": shard_count,
+            "collectors": self.collectors,
+            "inventory": inventory_digest(inventory),
+            "files": [[positions[entry.rel_path], entry.rel_path, entry.extension, entry.size, entry.mtime,
+                       entry.category] for entry in shard],
+            "results": {name: [[positions[entry.rel_path], result] for entry, result in pairs]
+                        for name, pairs in per_collector.items()},
+        }
+
+    def merge(self, partials):
+        """
+        Combine the partial results of every shard, back in scan order, and
+        write and record the reports exactly as a single run would.
+        Returns {collector: report result}.
+        """
+        check_partials(partials)
+        entries = {}
+        results = {name: [] for name in self.collectors}
+        for partial in partials:
+            for position, rel_path, extension, size, mtime, category in partial["files"]:
+                path = os.path.join(self.project_root, *rel_path.split("/"))
+                entries[position] = FileEntry(path, rel_path, extension, size, mtime, category)
+            for name in self.collectors:
+                results[name].extend(partial["results"][name])
+        source_pass = {name: [(entries[position], result) for position, result in sorted(pairs, key=lambda pair: pair[0])]
+                       for name, pairs in results.items()}
+        return {name: getattr(self, f"report_{name}")({"source_pass": source_pass}) for name in self.collectors}
+
+    # ------------------------------------------------------------ git history
+
+    def process(self, inputs):
+        written = update_process_metrics(self.branch, self.full, self.project_root)
+        if written is None:
+            raise RuntimeError(f"could not read git history of {self.branch}")
+        return written
+
+    def run(self, max_workers=None):
+        with open_cache(self.project_root) as cache:
+            self.cache = cache
+            try:
+                return run_stages(self.stages(), max_workers)
+            finally:
+                self.cache = None
+
+
+def inventory_digest(inventory):
+    """Digest of the scanned paths; shards are only merged if they scanned the same tree."""
+    paths = "\n".join(entry.rel_path for entry in inventory)
+    return hashlib.blake2b(paths.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def check_partials(partials):
+    """Raise ValueError unless partials are shards 0 .. K-1 of one tree, run with the same collectors."""
+    if not partials:
+        raise ValueError("no partial results to merge")
+    first = partials[0]
+    for partial in partials:
+        if partial.get("version") != PARTIAL_VERSION:
+            raise ValueError(f"shard {partial.get('shard')} has partial version {partial.get('version')}, "
+                             f"expected {PARTIAL_VERSION}")
+        for key, what in (("shards", "shard count"), ("collectors", "collectors"), ("inventory", "file inventory")):
+            if partial[key] != first[key]:
+                raise ValueError(f"shard {partial['shard']} has a different {what} than shard {first['shard']}")
+    found = sorted(partial["shard"] for partial in partials)
+    if found != list(range(first["shards"])):
+        raise ValueError(f"expected one partial for each of shards 0-{first['shards'] - 1}, got {found}")
+
+
+def shard_file(shard_dir, index, shard_count):
+    return os.path.join(shard_dir, f"shard-{index}-of-{shard_count}.json")
+
+
+def write_partial(partial, output_file):
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    temp_file = output_file + ".tmp"
+    with open(temp_file, "w") as f:
+        json.dump(partial, f, separators=(",", ":"))
+    os.replace(temp_file, output_file)
+
+
+def run_local_shards(shard_count, collectors, shard_dir):
+    """Run every shard as its own process on this machine; returns the partial files they wrote."""
+    outputs = [shard_file(shard_dir, index, shard_count) for index in range(shard_count)]
+    processes = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "shard", "--index", str(index),
+                                   "--count", str(shard_count), "--only", *collectors, "--output", output])
+                 for index, output in enumerate(outputs)]
+    failed = [index for index, process in enumerate(processes) if process.wait() != 0]
+    if failed:
+        raise RuntimeError(f"shards {', '.join(map(str, failed))} failed")
+    return outputs
+
+
+def run_shard_command(project_root, args):
+    if args.count < 1 or (args.index is not None and not 0 <= args.index < args.count):
+        sys.exit(f"Shard index must be in 0-{args.count - 1} (of --count {args.count})")
+    shard_dir = os.path.join(project_root, args.dir)
+    if args.index is None:
+        start = time.perf_counter()
+        outputs = run_local_shards(args.count, args.only, shard_dir)
+        print(f"\n{args.count} shards done in {time.perf_counter() - start:.3f}s; merge with:")
+        print(f"  python {os.path.relpath(__file__)} merge {' '.join(os.path.relpath(path) for path in outputs)}")
+        return
+    output = args.output or shard_file(shard_dir, args.index, args.count)
+    pipeline = MetricsPipeline(project_root, args.only)
+    start = time.perf_counter()
+    partial = pipeline.run_shard(args.index, args.count)
+    write_partial(partial, output)
+    print(f"Shard {args.index}/{args.count}: {len(partial['files'])} files in "
+          f"{time.perf_counter() - start:.3f}s -> {output}")
+
+
+def merge_command(project_root, partial_files):
+    partials = []
+    for partial_file in partial_files:
+        with open(partial_file) as f:
+            partials.append(json.load(f))
+    collectors = partials[0]["collectors"]
+    try:
+        MetricsPipeline(project_root, collectors).merge(partials)
+    except ValueError as e:
+        sys.exit(f"Cannot merge: {e}")
+    print(f"\nMerged {len(partials)} shards ({', '.join(collectors)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="metrics", description="Project metrics pipeline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="run all collectors, reading each file once")
+    run_parser.add_argument("--only", nargs="+", choices=COLLECTORS, default=list(COLLECTORS),
+                            help="collectors to run (default: all)")
+    run_parser.add_argument("--skip", nargs="+", choices=COLLECTORS, default=[], help="collectors to leave out")
+    run_parser.add_argument("--branch", default="main", help="branch for the process metrics (default: main)")
+    run_parser.add_argument("--full", action="store_true", help="rebuild the process metrics CSV from scratch")
+    run_parser.add_argument("--trace", metavar="PREFIX", help="write tracing spans to PREFIX.summary.json / .trace.json")
+    shard_parser = sub.add_parser("shard", help="analyze one shard of the files and write its partial result")
+    shard_parser.add_argument("--count", type=int, required=True, help="number of shards K")
+    shard_parser.add_argument("--index", type=int,
+                              help="shard to analyze, 0 .. K-1 (default: all of them, each in its own process)")
+    shard_parser.add_argument("--only", nargs="+", choices=SHARDED_COLLECTORS, default=list(SHARDED_COLLECTORS),
+                              help="collectors to run (default: all that can be sharded)")
+    shard_parser.add_argument("-o", "--output", help="partial result file (default: under --dir)")
+    shard_parser.add_argument("--dir", default=SHARD_DIR, help=f"directory of partial results (default: {SHARD_DIR})")
+    merge_parser = sub.add_parser("merge", help="combine the partial results of all shards into the reports")
+    merge_parser.add_argument("partials", nargs="+", help="partial result files, one per shard")
+    args = parser.parse_args()
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if args.command == "shard":
+        run_shard_command(project_root, args)
+        return
+    if args.command == "merge":
+        merge_command(project_root, args.partials)
+        return
+
+    if args.trace:
+        start_tracing(args.trace)
+
+    collectors = [name for name in args.only if name not in args.skip]
+    pipeline = MetricsPipeline(project_root, collectors, args.branch, args.full)
+
+    start = time.perf_counter()
+    _, timings, failed = pipeline.run()
+    elapsed = time.perf_counter() - start
+
+    print("\nStage timings:")
+    for name, seconds in sorted(timings.items(), key=lambda item: item[1], reverse=True):
+        print(f"  {name:<14} {seconds:8.3f}s")
+    print(f"  {'total':<14} {elapsed:8.3f}s")
+    if failed:
+        print(f"Failed stages: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
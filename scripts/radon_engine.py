@@ -0,0 +1,56 @@
+import ast
+
+from metrics_cache import compute_cached
+
+# Bump whenever analyze_source changes its output (or radon is upgraded)
+RADON_ENGINE_VERSION = "1"
+
+
+def analyze_source(code, filename="<unknown>"):
+    """
+    Compute radon's raw, cc and mi metrics for Python source in-process.
+
+    The source is parsed into an AST once and that tree feeds both the
+    cyclomatic complexity and the maintainability index, instead of three
+    `python -m radon` runs that each re-read and re-parse the file. The
+    result has the same shape as radon's JSON output for one file:
+    {"raw": {...}, "cc": [...], "mi": {"mi": ..., "rank": ...}}.
+    """
+    # radon (radon.cli alone costs ~20 ms) is imported on first use, not at startup
+    from radon.raw import analyze
+    from radon.complexity import ComplexityVisitor, sorted_results
+    from radon.metrics import h_visit_ast, mi_compute, mi_rank
+    from radon.cli.tools import cc_to_dict
+
+    try:
+        raw = analyze(code)
+        tree = ast.parse(code, filename)
+    except (SyntaxError, ValueError) as e:
+        return {"raw": {}, "cc": [], "mi": {}, "error": str(e)}
+
+    visitor = ComplexityVisitor.from_ast(tree)
+    blocks = sorted_results(visitor.blocks)
+
+    # Same inputs radon's mi_parameters derives (multi-line strings count as comments)
+    comment_lines = raw.comments + raw.multi
+    comments = comment_lines / float(raw.sloc) * 100 if raw.sloc != 0 else 0
+    mi = mi_compute(h_visit_ast(tree).total.volume, visitor.total_complexity, raw.lloc, comments)
+
+    return {
+        "raw": raw._asdict(),
+        "cc": [cc_to_dict(block) for block in blocks],
+        "mi": {"mi": mi, "rank": mi_rank(mi)},
+    }
+
+
+def analyze_file(path, cache=None):
+    """Analyze one Python file, going through the metrics cache when one is given."""
+    return compute_cached(cache, "radon", RADON_ENGINE_VERSION, path,
+                          lambda code: analyze_source(code, path))
+
+
+def average_complexity(cc_blocks):
+    """Average cyclomatic complexity of a file's blocks, or None if it has none."""
+    if not cc_blocks:
+        return None
+    return sum(block["complexity"] for block in cc_blocks) / len(cc_blocks)
@@ -0,0 +1,592 @@
+import re
+import sys
+from array import array
+from collections import Counter
+from functools import lru_cache
+from typing import NamedTuple
+
+from loc_counter import C_LIKE, PYTHON as PYTHON_SYNTAX, count_lines, count_lines_outside, syntax_for
+
+# Token kinds; every language's pattern numbers its groups this way, so match.lastindex is the kind
+COMMENT, STRING, WORD, NUMBER, OPERATOR = 1, 2, 3, 4, 5
+
+# Identifier, number and single-character operator tokens; "." is an operator, so "app.get" is app . get
+WORD_PATTERN = rb"[A-Za-z_]\w*"
+NUMBER_PATTERN = rb"\d+"
+OPERATOR_CHARS = b"+-*/%=<>!&|^~?:,.(){}[];"
+OPERATOR_PATTERN = b"[" + re.escape(OPERATOR_CHARS) + b"]"
+OPERATORS = frozenset(OPERATOR_CHARS[i:i + 1] for i in range(len(OPERATOR_CHARS)))
+
+LINE_COMMENT = rb"//[^\n]*"
+BLOCK_COMMENT = rb"/\*(?:[^*]+|\*(?!/))*(?:\*/)?"
+HASH_COMMENT = rb"#[^\n]*"
+# Escapes are honoured; an unterminated quote ends at the newline (or, for `...`, the end of the file)
+DOUBLE_QUOTED = rb'"(?:[^"\\\n]+|\\[\s\S])*"?'
+SINGLE_QUOTED = rb"'(?:[^'\\\n]+|\\[\s\S])*'?"
+BACKTICK_QUOTED = rb"`(?:[^`\\]+|\\[\s\S])*`?"
+TRIPLE_DOUBLE_QUOTED = rb'"""(?:[^"\\]+|\\[\s\S]|"(?!""))*(?:""")?'
+TRIPLE_SINGLE_QUOTED = rb"'''(?:[^'\\]+|\\[\s\S]|'(?!''))*(?:''')?"
+PYTHON_STRING = (rb"(?:[rRbBuUfF]{1,2})?(?:" + TRIPLE_DOUBLE_QUOTED + rb"|" + TRIPLE_SINGLE_QUOTED
+                 + rb"|" + DOUBLE_QUOTED + rb"|" + SINGLE_QUOTED + rb")")
+
+
+class Language(NamedTuple):
+    name: str
+    pattern: re.Pattern     # bytes regex with one group per token kind
+    blocks: str             # how function bodies are delimited: "braces" or "indent"
+
+
+def _language(name, comments, strings, blocks):
+    """Compile the one regex that lexes a language: comments and strings win over the tokens inside them."""
+    groups = [b"|".join(comments), b"|".join(strings), WORD_PATTERN, NUMBER_PATTERN, OPERATOR_PATTERN]
+    return Language(name, re.compile(b"|".join(b"(" + group + b")" for group in groups)), blocks)
+
+
+JAVASCRIPT = _language("javascript", [LINE_COMMENT, BLOCK_COMMENT],
+                       [DOUBLE_QUOTED, SINGLE_QUOTED, BACKTICK_QUOTED], "braces")
+C_FAMILY = _language("c", [LINE_COMMENT, BLOCK_COMMENT], [DOUBLE_QUOTED, SINGLE_QUOTED], "braces")
+PYTHON = _language("python", [HASH_COMMENT], [PYTHON_STRING], "indent")
+
+LANGUAGES = {
+    ".js": JAVASCRIPT, ".mjs": JAVASCRIPT, ".cjs": JAVASCRIPT,
+    ".java": C_FAMILY, ".c": C_FAMILY, ".h": C_FAMILY, ".cpp": C_FAMILY, ".hpp": C_FAMILY,
+    ".py": PYTHON,
+}
+
+
+def language_for(extension):
+    """Lexer of a file extension; C-family syntax for anything unknown."""
+    return LANGUAGES.get(extension.lower(), C_FAMILY)
+
+
+# Words that open a block with a parenthesized head, so "if (...) {" is not taken for a function
+CONTROL_KEYWORDS = {b"if", b"for", b"while", b"switch", b"catch", b"with", b"return", b"do", b"else",
+                    b"try", b"finally", b"synchronized", b"typeof", b"await", b"new", b"in", b"of"}
+# Tokens looked at before a "{" or "(", enough to recognize and name a function
+LOOKBACK_TOKENS = 8
+# Operators that open or close a bracket
+BRACKETS = frozenset((b"(", b")", b"[", b"]", b"{", b"}"))
+
+# Tokens a TokenCounts holds before folding those no open function needs into its counts
+WINDOW_TOKENS = 64 * 1024
+
+# An open bracket is a list [char, index, first string argument, function, ids of the tokens before it];
+# the ids are kept for "(" only, so a function's head can be named after the tokens before it are gone
+CHAR, INDEX, FIRST_STRING, FUNCTION, BEFORE = range(5)
+
+
+def newline_counter(data):
+    """count(start, end) of the newlines in a range of data; an mmap has find but no count."""
+    if hasattr(data, "count"):
+        return lambda start, end: data.count(b"\n", start, end)
+    return lambda start, end: data[start:end].count(b"\n")
+
+
+def is_name(token):
+    return token[:1].isalpha() or token[:1] == b"_"
+
+
+class FunctionSpan(NamedTuple):
+    name: str
+    line: int               # lines of the function's body, from 1
+    end_line: int
+    start: int              # token indices: the first token (the parameter list, or "def") ...
+    end: int                # ... and one past the last (the closing "}", or the end of the body)
+
+
+class BlockTracker:
+    """
+    Finds the function bodies of a brace-delimited language (JavaScript,
+    C, Java) while a token stream is built. The builder calls bracket(),
+    open_block() or close_block() for each ( ) [ ] { } and string() for
+    each string literal, right after appending it to ids.
+
+    Recognized: "function f(...) {", "f(...) {" (methods and C/Java
+    functions, also with "throws X" or "const" after the parameters),
+    "(...) => {" and "x => {". Anonymous functions are named after what
+    they are assigned to, or the call they are passed to together with its
+    first string argument, so an Express handler is "app.get('/login')".
+    """
+
+    __slots__ = ("stream", "ids", "vocabulary", "brackets", "last_group")
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.ids = stream.ids                    # the token ids kept, ending with the token being tracked
+        self.vocabulary = stream.vocabulary
+        self.brackets = []
+        self.last_group = None                   # the "(" bracket of the last closed group, and its ")" index
+
+    def _index(self):
+        """Index in the whole stream of the token being tracked."""
+        return self.stream.base + len(self.ids) - 1
+
+    def _recent_ids(self):
+        """Ids of the LOOKBACK_TOKENS tokens before the one being tracked (fewer at the start of the file)."""
+        end = len(self.ids) - 1
+        return self.ids[max(end - LOOKBACK_TOKENS, 0):end]
+
+    def _tokens(self, ids):
+        """Tokens of ids, padded with blanks in front to LOOKBACK_TOKENS."""
+        vocabulary = self.vocabulary
+        return [b""] * (LOOKBACK_TOKENS - len(ids)) + [vocabulary[token_id] for token_id in ids]
+
+    def bracket(self, token):
+        """Track a ( [ ) or ]; a closing bracket also closes anything left open inside it."""
+        index = self._index()
+        brackets = self.brackets
+        if token == b"(":
+            brackets.append([token, index, None, None, self._recent_ids()])
+            return
+        if token == b"[":
+            brackets.append([token, index, None, None, None])
+            return
+        opener = b"(" if token == b")" else b"["
+        if brackets and brackets[-1][CHAR] == opener:
+            group = brackets.pop()
+        elif any(bracket[CHAR] == opener for bracket in brackets):
+            while brackets[-1][CHAR] != opener:
+                brackets.pop()
+            group = brackets.pop()
+        else:
+            return
+        if opener == b"(":
+            self.last_group = (group, index)
+
+    def string(self, token):
+        """Remember a string literal that is the first argument of a call."""
+        brackets = self.brackets
+        if brackets and brackets[-1][INDEX] == self._index() - 1 and brackets[-1][CHAR] == b"(":
+            brackets[-1][FIRST_STRING] = token
+
+    def open_block(self):
+        """
+        Track a "{". Returns (name, index of the function's first token) if
+        it opens a function body, else None; the builder then attaches its
+        state for the function with set_function().
+        """
+        index = self._index()
+        found = self._function_start(index)
+        self.brackets.append([b"{", index, None, None, None])
+        return found
+
+    def set_function(self, function):
+        self.brackets[-1][FUNCTION] = function
+
+    def close_block(self):
+        """Track a "}". Returns what set_function() attached if it closes a function body, else None."""
+        brackets = self.brackets
+        while brackets:
+            bracket = brackets.pop()
+            if bracket[CHAR] == b"{":
+                return bracket[FUNCTION]
+        return None
+
+    def open_functions(self):
+        """What set_function() attached to the functions still open, innermost first."""
+        return [bracket[FUNCTION] for bracket in reversed(self.brackets) if bracket[FUNCTION] is not None]
+
+    def keep_from(self):
+        """The first token still needed: the start of the last head that may open a function."""
+        if self.last_group is not None:
+            return self.last_group[0][INDEX]
+        return self._index() + 1
+
+    def _context_name(self, context, call):
+        context = [token for token in context if token]
+        if context and context[-1] == b"async":
+            context.pop()
+        if len(context) >= 2 and context[-1] in (b"=", b":") and is_name(context[-2]):
+            return context[-2].decode()
+        if context and context[-1] in (b"(", b",") and call is not None:
+            before = [token for token in self._tokens(call[BEFORE]) if token]
+            if before and is_name(before[-1]):
+                callee = before[-1].decode()
+                if len(before) >= 3 and before[-2] == b"." and is_name(before[-3]):
+                    callee = before[-3].decode() + "." + callee
+                if call[FIRST_STRING] is not None:
+                    return f"{callee}({call[FIRST_STRING].decode('utf-8', 'replace')})"
+                return f"{callee}(callback)"
+        return "<anonymous>"
+
+    def _function_start(self, index):
+        recent = self._tokens(self._recent_ids())
+        last_group = self.last_group
+        call = self.brackets[-1] if self.brackets and self.brackets[-1][CHAR] == b"(" else None
+        if recent[-1] == b">" and recent[-2] == b"=":
+            params = recent[-3]
+            if params == b")" and last_group is not None and last_group[1] == index - 3:
+                group = last_group[0]
+                return self._context_name(self._tokens(group[BEFORE]), call), group[INDEX]
+            if is_name(params):
+                return self._context_name(recent[:-3], call), index - 3
+            return None
+
+        # Step back over qualifiers between ")" and "{" (throws IOException, const, override)
+        back = 1
+        while back < len(recent) and recent[-back] != b")" and (is_name(recent[-back]) or recent[-back] == b","):
+            back += 1
+        if recent[-back] != b")" or last_group is None or last_group[1] != index - back:
+            return None
+        start = last_group[0][INDEX]
+        before = self._tokens(last_group[0][BEFORE])
+        b1, b2 = before[-1], before[-2]
+        if b1 == b"function":
+            return self._context_name(before[:-1], call), start
+        if b2 == b"function" and is_name(b1):
+            # A named handler passed to app.get('/path', function handler(...) {...}) keeps its route
+            context = [token for token in before[:-2] if token]
+            if context and context[-1] == b"async":
+                context.pop()
+            if context and context[-1] in (b"(", b",") and call is not None and call[FIRST_STRING] is not None:
+                return self._context_name(context, call), start
+            return b1.decode(), start
+        if is_name(b1) and b1 not in CONTROL_KEYWORDS and b2 not in (b".", b"new"):
+            return b1.decode(), start
+        return None
+
+
+class _OpenFunction:
+    __slots__ = ("name", "line", "start", "indent")
+
+    def __init__(self, name, line, start, indent=0):
+        self.name = name
+        self.line = line
+        self.start = start
+        self.indent = indent
+
+
+class TokenStream:
+    """
+    A file lexed once, shared by every analyzer that reads its tokens
+    (Halstead, JavaScript complexity, import extraction, line counts).
+
+    Tokens are kept in an array, not a list of strings: ids indexes the
+    vocabulary (each distinct token once, with its kind in kinds).
+    Comments are left out of the tokens; their (start, end) spans are in
+    comments, and the function bodies found while lexing are in
+    functions, ordered by start.
+    """
+
+    __slots__ = ("data", "language", "ids", "base", "vocabulary", "kinds", "comments", "functions")
+
+    def __init__(self, data, language):
+        self.data = data
+        self.language = language
+        self.ids = array("I")
+        self.base = 0                   # index in the file of ids[0]; 0 unless tokens were folded away
+        self.vocabulary = []            # token id -> token (bytes)
+        self.kinds = array("B")         # token id -> kind
+        self.comments = array("I" if len(data) < 1 << 32 else "Q")   # start, end of each comment, flattened
+        self.functions = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def open_function(self, start):
+        """Called when a function whose first token is at start opens; add_function() is called when it closes."""
+
+    def add_function(self, function):
+        self.functions.append(function)
+
+    def trim(self, keep_from):
+        """Called every window() tokens with the first token a function may yet start at; returns the next limit."""
+        return sys.maxsize
+
+    def window(self):
+        return sys.maxsize
+
+    def finish(self):
+        self.functions.sort(key=lambda function: function.start)
+
+    def token_counts(self):
+        """Counter of the token ids of the whole file."""
+        return Counter(self.ids)
+
+    def function_token_counts(self):
+        """Counter of the token ids of each function (nested functions included), in the order of functions."""
+        return [Counter(self.ids[function.start:function.end]) for function in self.functions]
+
+    def token(self, index):
+        return self.vocabulary[self.ids[index]]
+
+    def ids_of(self, tokens):
+        """The ids of those of tokens that occur in the stream."""
+        index = {token: token_id for token_id, token in enumerate(self.vocabulary)}
+        return {index[token] for token in tokens if token in index}
+
+    def ids_of_kind(self, kind):
+        return {token_id for token_id, token_kind in enumerate(self.kinds) if token_kind == kind}
+
+    def comment_spans(self):
+        comments = self.comments
+        return list(zip(comments[::2], comments[1::2]))
+
+    def line_counts(self):
+        """Code, comment and blank lines, as loc_counter counts them for the language."""
+        return count_lines_outside(self.data, self.comment_spans())
+
+
+class TokenCounts(TokenStream):
+    """
+    The token counts of a file too large to keep token by token. Ids are
+    folded into counts as they are lexed, and only the last few tokens are
+    held, even inside a function that wraps the whole file. With summarize,
+    each open function also has a Counter of its folded ids, merged into
+    the enclosing function's when it closes; summarize(stream, its
+    FunctionSpan, its Counter) is then called and only what it returns (if
+    not None) is kept, in function_summaries, ordered by function start.
+    Comments are skipped, not recorded.
+    """
+
+    __slots__ = ("counts", "summarize", "function_summaries", "window_tokens", "open_counts")
+
+    def __init__(self, data, language, summarize=None, window_tokens=WINDOW_TOKENS):
+        super().__init__(data, language)
+        self.comments = None
+        self.counts = Counter()
+        self.summarize = summarize
+        self.function_summaries = []
+        self.window_tokens = window_tokens
+        self.open_counts = []           # (start, Counter of its folded ids) of each open function, outermost first
+
+    def open_function(self, start):
+        if self.summarize is not None:
+            self.open_counts.append((start, Counter()))
+
+    def add_function(self, function):
+        self.functions.append(function)
+        if self.summarize is None:
+            return
+        open_counts = self.open_counts
+        counts = Counter()
+        # Also folds in functions a stray ")" or "]" dropped without closing them
+        while open_counts and open_counts[-1][0] >= function.start:
+            counts.update(open_counts.pop()[1])
+        if open_counts:
+            open_counts[-1][1].update(counts)
+        counts.update(self.ids[max(function.start - self.base, 0):function.end - self.base])
+        summary = self.summarize(self, function, counts)
+        if summary is not None:
+            self.function_summaries.append((function.start, summary))
+
+    def trim(self, keep_from):
+        # Keep the lookback the block tracker reads and the head a function may still open at
+        drop = min(keep_from - self.base, len(self.ids) - LOOKBACK_TOKENS)
+        if drop > 0:
+            ids = self.ids
+            self.counts.update(ids[:drop])
+            # Each dropped id is counted for the innermost open function it is in
+            end = drop
+            for start, counts in reversed(self.open_counts):
+                start = max(start - self.base, 0)
+                if start < end:
+                    counts.update(ids[start:end])
+                    end = start
+                if end == 0:
+                    break
+            del ids[:drop]
+            self.base += drop
+        return len(self.ids) + self.window_tokens
+
+    def window(self):
+        return self.window_tokens
+
+    def finish(self):
+        self.counts.update(self.ids)
+        del self.ids[:]
+        self.functions.sort(key=lambda function: function.start)
+        self.function_summaries.sort(key=lambda summary: summary[0])
+        self.function_summaries = [summary for _, summary in self.function_summaries]
+        self.open_counts = []
+
+    def token_counts(self):
+        return self.counts
+
+    def function_token_counts(self):
+        raise TypeError("TokenCounts keeps no per-function counts; pass summarize to lex_counts")
+
+
+def lex(data, language):
+    """
+    Build the TokenStream of data (bytes, or an mmap) in one pass of the
+    language's regex, finding function bodies as it goes.
+    """
+    return _lex(TokenStream(data, language))
+
+
+def lex_counts(data, language, summarize=None):
+    """
+    The TokenCounts of data (bytes, or an mmap): the counts of what lex()
+    finds, in memory bounded by the vocabulary (once per open function,
+    with summarize) rather than the length of the file, for the largest
+    files.
+    """
+    return _lex(TokenCounts(data, language, summarize))
+
+
+def _lex(stream):
+    if stream.language.blocks == "indent":
+        _lex_indent(stream)
+    else:
+        _lex_braces(stream)
+    stream.finish()
+    return stream
+
+
+def _lex_braces(stream):
+    data = stream.data
+    ids, vocabulary, kinds = stream.ids, stream.vocabulary, stream.kinds
+    add_id = ids.append
+    add_comment = stream.comments.extend if stream.comments is not None else None
+    index = {}
+    count_newlines = newline_counter(data)
+    tracker = BlockTracker(stream)
+    line, line_pos = 1, 0
+    limit = stream.window()
+
+    for match in stream.language.pattern.finditer(data):
+        kind = match.lastindex
+        if kind == COMMENT:
+            if add_comment is not None:
+                add_comment(match.span())
+            continue
+        token = match.group(kind)
+        token_id = index.get(token)
+        if token_id is None:
+            token_id = index[token] = len(vocabulary)
+            vocabulary.append(token)
+            kinds.append(kind)
+        add_id(token_id)
+        if len(ids) > limit:
+            limit = stream.trim(tracker.keep_from())
+        if kind == OPERATOR:
+            if token not in BRACKETS:
+                continue
+            if token == b"{":
+                found = tracker.open_block()
+                if found is not None:
+                    line += count_newlines(line_pos, match.start())
+                    line_pos = match.start()
+                    tracker.set_function(_OpenFunction(found[0], line, found[1]))
+                    stream.open_function(found[1])
+            elif token == b"}":
+                function = tracker.close_block()
+                if function is not None:
+                    line += count_newlines(line_pos, match.start())
+                    line_pos = match.start()
+                    stream.add_function(FunctionSpan(function.name, function.line, line, function.start,
+                                                     stream.base + len(ids)))
+            else:
+                tracker.bracket(token)
+        elif kind == STRING:
+            tracker.string(token)
+
+    # Functions left open by unbalanced braces end with the file
+    line += count_newlines(line_pos, len(data))
+    for function in tracker.open_functions():
+        stream.add_function(FunctionSpan(function.name, function.line, line, function.start, stream.base + len(ids)))
+
+
+def _lex_indent(stream):
+    """Python: a def's body ends at the next line, outside brackets, indented no deeper than the def."""
+    data = stream.data
+    ids, vocabulary, kinds = stream.ids, stream.vocabulary, stream.kinds
+    add_id = ids.append
+    add_comment = stream.comments.extend if stream.comments is not None else None
+    index = {}
+    open_functions = []
+    limit = stream.window()
+    depth = 0                        # open brackets; lines inside them are continuations
+    last_end = 0
+    line = last_line = 1
+    indent = 0
+    pending_def = False
+
+    for match in stream.language.pattern.finditer(data):
+        kind = match.lastindex
+        if kind == COMMENT:
+            if add_comment is not None:
+                add_comment(match.span())
+            continue
+        start = match.start()
+        newline = data.rfind(b"\n", last_end, start)
+        if newline >= 0:
+            line += data[last_end:start].count(b"\n")
+            if depth == 0:
+                indent = start - newline - 1
+                while open_functions and indent <= open_functions[-1].indent:
+                    function = open_functions.pop()
+                    stream.add_function(FunctionSpan(function.name, function.line, last_line, function.start,
+                                                     stream.base + len(ids)))
+        token = match.group(kind)
+        last_end = match.end()
+        token_id = index.get(token)
+        if token_id is None:
+            token_id = index[token] = len(vocabulary)
+            vocabulary.append(token)
+            kinds.append(kind)
+        add_id(token_id)
+        if len(ids) > limit:
+            limit = stream.trim(stream.base + len(ids))
+
+        if kind == OPERATOR:
+            if token in b"([{":
+                depth += 1
+            elif token in b")]}":
+                depth = max(depth - 1, 0)
+        elif pending_def and kind == WORD:
+            open_functions.append(_OpenFunction(token.decode(), line, stream.base + len(ids) - 2, indent))
+            stream.open_function(stream.base + len(ids) - 2)
+            pending_def = False
+        elif token == b"def":
+            pending_def = True
+        elif kind == STRING:
+            line += token.count(b"\n")
+        last_line = line
+
+    while open_functions:
+        function = open_functions.pop()
+        stream.add_function(FunctionSpan(function.name, function.line, last_line, function.start,
+                                         stream.base + len(ids)))
+
+
+@lru_cache(maxsize=8)
+def _tokenize(content, language):
+    return lex(content.encode("utf-8") if isinstance(content, str) else content, language)
+
+
+def tokenize(content, extension):
+    """
+    The TokenStream of a file's content (str or bytes). The last few are
+    kept, keyed by the content's value, not its identity: lru_cache hashes
+    the whole content the first time a given object is passed, and a hit
+    also compares it in full with the cached key, so equal content from
+    different objects shares one lexing pass (as the analyzers handed the
+    same decoded text by the metrics cache do), at the cost of a linear
+    hash and comparison, far below that of lexing.
+    """
+    return _tokenize(content, language_for(extension))
+
+
+# Lexers whose comments and strings are those loc_counter knows for the same extensions
+LINE_SYNTAXES = {"javascript": C_LIKE, "python": PYTHON_SYNTAX}
+
+
+def line_counts(content, extension):
+    """
+    Code, comment and blank lines of content as loc_counter counts them:
+    from its token stream where the lexer agrees with loc_counter, so the
+    lines come from the same lexing pass as the tokens; otherwise from
+    one count_lines pass shared by every caller.
+    """
+    syntax = syntax_for(extension)
+    language = LANGUAGES.get(extension.lower())
+    if language is not None and LINE_SYNTAXES.get(language.name) == syntax:
+        return tokenize(content, extension).line_counts()
+    return _count_lines(content, syntax)
+
+
+@lru_cache(maxsize=8)
+def _count_lines(content, syntax):
+    return count_lines(content, syntax)
@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import atexit
+import threading
+
+# Set to an output prefix (e.g. metrics/trace) to trace a run without code changes
+TRACE_ENV = "METRICS_TRACE"
+
+
+class _NullSpan:
+    """Stand-in returned by span() while tracing is off: every call is a no-op."""
+
+    active = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def count(self, name, amount=1):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """One timed, possibly nested stage with its own counters (files, bytes, tokens, ...)."""
+
+    active = True
+
+    def __init__(self, tracer, name, counters):
+        self.tracer = tracer
+        self.name = name
+        self.counters = counters
+        self.path = name
+        self.start = None
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        if stack:
+            self.path = f"{stack[-1].path}/{self.name}"
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        self.tracer._stack().pop()
+        self.tracer._record(self, end)
+        return False
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+
+class Tracer:
+    """
+    Collects finished spans as Chrome trace events and as a summary keyed
+    by span path ("halstead/analyze"): calls, total seconds and summed
+    counters. Only spans of the tracing process are recorded; work done
+    inside pool workers shows up as the parent span that waits for it.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+        self.summary = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, span, end):
+        seconds = end - span.start
+        event = {
+            "name": span.name,
+            "cat": span.path.split("/", 1)[0],
+            "ph": "X",
+            "ts": (span.start - self.origin) * 1e6,
+            "dur": seconds * 1e6,
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+            "args": dict(span.counters),
+        }
+        with self._lock:
+            self.events.append(event)
+            stats = self.summary.setdefault(span.path, {"calls": 0, "seconds": 0.0, "counters": {}})
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            for name, value in span.counters.items():
+                stats["counters"][name] = stats["counters"].get(name, 0) + value
+
+    def write(self, prefix):
+        """Write <prefix>.summary.json and <prefix>.trace.json (chrome://tracing / Perfetto)."""
+        directory = os.path.dirname(os.path.abspath(prefix))
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            summary = {
+                "total_seconds": time.perf_counter() - self.origin,
+                "spans": {path: dict(stats, seconds=round(stats["seconds"], 6))
+                          for path, stats in sorted(self.summary.items())},
+            }
+            events = list(self.events)
+        summary_file = prefix + ".summary.json"
+        trace_file = prefix + ".trace.json"
+        with open(summary_file, "w") as f:
+            json.dump(summary, f, indent=2)
+        with open(trace_file, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return summary_file, trace_file
+
+
+_tracer = None
+
+
+def span(name, **counters):
+    """
+    Return a context manager timing one stage. While tracing is off this is
+    a shared no-op object, so instrumented code pays one function call.
+    Guard counters that are expensive to compute with `if sp.active:`.
+    """
+    if _tracer is None:
+        return NULL_SPAN
+    return Span(_tracer, name, counters)
+
+
+def enabled():
+    return _tracer is not None
+
+
+def start_tracing(prefix):
+    """Start recording spans; the trace files are written under prefix when the process exits."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+        atexit.register(_write_at_exit, prefix)
+    return _tracer
+
+
+def _write_at_exit(prefix):
+    if _tracer is not None and os.getpid() == _tracer.pid:
+        summary_file, trace_file = _tracer.write(prefix)
+        print(f"Trace summary saved to {summary_file}, trace events to {trace_file}")
+
+
+if os.environ.get(TRACE_ENV):
+    start_tracing(os.environ[TRACE_ENV])
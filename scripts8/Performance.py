@@ -1,27 +1,115 @@
-from locust import HttpUser, TaskSet, task, between
-
-class UserBehavior(TaskSet):
-    @task
-    def index_page(self):
-        # Simulate a GET request to the root endpoint
-        self.client.get("/")
-
-    @task
-    def about_page(self):
-        # Simulate a GET request to the /about endpoint
-        self.client.get("/about")
-
-    @task
-    def contact_page(self):
-        # Simulate a GET request to the /contact endpoint
-        self.client.get("/contact")
-
-class WebsiteUser(HttpUser):
-    # Define the behavior of the user
-    tasks = [UserBehavior]
-    
-    # Wait time between tasks (in seconds)
+import os
+import re
+import random
+from datetime import date
+
+from locust import HttpUser, task, between
+from locust.exception import StopUser
+
+from portal_routes import (GRADES, SUBJECTS, LOGIN, DASHBOARDS, DOWNLOAD_HOMEWORK, GENERATE_PASSWORD,
+                           subjects_select_route, upload_page_route, upload_post_route,
+                           download_page_route, resources_route)
+
+# Hidden inputs of the homework tables on the download pages
+FILE_PATH_PATTERN = re.compile(r'name="filePath" value="([^"]*)"')
+
+# Smallest well-formed PDF; the portal only accepts application/pdf uploads
+HOMEWORK_PDF = (b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+                b"2 0 obj<</Type/Pages/Kids[]/Count 0>>endobj\ntrailer<</Root 1 0 R>>\n%%EOF\n")
+
+
+def credentials(role):
+    """Login of the load-test account for a role, from LOADTEST_<ROLE>_USERNAME / _PASSWORD."""
+    prefix = f"LOADTEST_{role.upper()}"
+    return (os.environ.get(f"{prefix}_USERNAME", f"loadtest-{role}"),
+            os.environ.get(f"{prefix}_PASSWORD", f"loadtest-{role}-password"))
+
+
+class PortalUser(HttpUser):
+    """A signed-in user; the session cookie from POST /login is kept by self.client."""
+
+    abstract = True
+    role = None
     wait_time = between(1, 5)
-    
-    # Specify the base URL of the web application
-    host = "http://localhost:8000"  # Replace with your web app's URL
\ No newline at end of file
+    # Default target is the portal as started by `node index.js`
+    host = "http://localhost:3000"
+
+    def on_start(self):
+        username, password = credentials(self.role)
+        with self.client.post(LOGIN, data={"username": username, "password": password},
+                              catch_response=True) as response:
+            # A successful login redirects to the role's dashboard
+            if response.status_code != 200 or not response.url.endswith(DASHBOARDS[self.role]):
+                response.failure(f"{self.role} login failed ({response.status_code})")
+                raise StopUser()
+
+    def pick_class(self):
+        return random.choice(GRADES), random.choice(SUBJECTS)
+
+
+class TeacherUser(PortalUser):
+    role = "teacher"
+    weight = 3
+
+    @task(3)
+    def upload_homework(self):
+        grade, subject = self.pick_class()
+        self.client.get(subjects_select_route(grade, self.role))
+        self.client.get(upload_page_route(grade, subject))
+        self.client.post(
+            upload_post_route(grade, subject),
+            data={"uploadDate": date.today().isoformat()},
+            files={"homeworkFile": (f"loadtest-{grade}-{subject}.pdf", HOMEWORK_PDF, "application/pdf")},
+        )
+
+    @task(2)
+    def browse_resources(self):
+        grade, subject = self.pick_class()
+        self.client.get(subjects_select_route(grade, self.role))
+        self.client.get(resources_route(grade, subject, self.role))
+
+    @task(1)
+    def dashboard(self):
+        self.client.get(DASHBOARDS[self.role])
+
+
+class ParentUser(PortalUser):
+    role = "parent"
+    weight = 6
+
+    @task(4)
+    def download_homework(self):
+        grade, subject = self.pick_class()
+        self.client.get(subjects_select_route(grade, self.role))
+        page = self.client.get(download_page_route(grade, subject))
+        file_paths = FILE_PATH_PATTERN.findall(page.text or "")
+        if file_paths:
+            self.client.post(DOWNLOAD_HOMEWORK, data={"filePath": random.choice(file_paths)})
+
+    @task(2)
+    def browse_resources(self):
+        grade, subject = self.pick_class()
+        self.client.get(resources_route(grade, subject, self.role))
+
+    @task(1)
+    def dashboard(self):
+        self.client.get(DASHBOARDS[self.role])
+
+
+class AdminUser(PortalUser):
+    role = "admin"
+    weight = 1
+
+    @task(3)
+    def dashboard(self):
+        self.client.get(DASHBOARDS[self.role])
+
+    @task(1)
+    def generate_password(self):
+        self.client.get(GENERATE_PASSWORD)
+
+    @task(1)
+    def review_classes(self):
+        grade, subject = self.pick_class()
+        self.client.get(upload_page_route(grade, subject))
+        self.client.get(download_page_route(grade, subject))
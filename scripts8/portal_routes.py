@@ -0,0 +1,74 @@
+# Route table of the homework portal (index.js), shared by the Locust
+# scenarios in Performance.py and the stand-in server in standin_server.py.
+
+GRADES = ("one", "two", "three", "four")
+SUBJECTS = ("math", "eng", "sci", "sst")
+
+# Primary one kept its original upload routes; later grades carry the grade in the path
+PRIMARY_ONE_UPLOAD_ROUTES = {
+    "math": "/upload-mathematics-homework",
+    "eng": "/upload-english-homework",
+    "sci": "/upload-science-homework",
+    "sst": "/upload-sst-homework",
+}
+
+# Role-agnostic pages
+LOGIN = "/login"
+SIGN_UP = "/sign-up"
+DOWNLOAD_HOMEWORK = "/download-homework"
+GENERATE_PASSWORD = "/generate-password"
+
+# Where POST /login redirects each role
+DASHBOARDS = {"teacher": "/teachers", "parent": "/parents", "admin": "/admin"}
+
+
+def subjects_select_route(grade, role):
+    """Subject picker of a grade: teachers upload, parents download."""
+    suffix = "-parents" if role == "parent" else ""
+    return f"/primary-{grade}-subjects-select{suffix}"
+
+
+def upload_page_route(grade, subject):
+    return f"/upload-{subject}-primary-{grade}"
+
+
+def download_page_route(grade, subject):
+    return f"/download-{subject}-primary-{grade}"
+
+
+def upload_post_route(grade, subject):
+    if grade == "one":
+        return PRIMARY_ONE_UPLOAD_ROUTES[subject]
+    return f"/upload-{subject}-homework-primary-{grade}"
+
+
+def resources_route(grade, subject, role):
+    suffix = "-parent" if role == "parent" else ""
+    return f"/subjectresources-primary-{grade}-{subject}{suffix}"
+
+
+def all_routes():
+    """(method, path, roles allowed or None for anyone) of every route index.js defines."""
+    routes = [
+        ("GET", SIGN_UP, None), ("POST", "/signup", None),
+        ("GET", LOGIN, None), ("POST", LOGIN, None),
+        ("GET", "/teachers", ("teacher", "admin")),
+        ("GET", "/parents", ("parent", "admin")),
+        ("GET", "/download_homework", None), ("POST", DOWNLOAD_HOMEWORK, None),
+        ("GET", GENERATE_PASSWORD, None),
+        ("GET", "/admin", ("admin",)),
+        ("POST", "/admin/add-user", ("admin",)),
+        ("POST", "/admin/delete-user/:id", ("admin",)),
+    ]
+    for grade in GRADES:
+        routes.append(("GET", subjects_select_route(grade, "teacher"), ("teacher", "admin")))
+        routes.append(("GET", subjects_select_route(grade, "parent"), ("parent", "admin")))
+        for subject in SUBJECTS:
+            # Only primary one math checks the role on its upload page
+            upload_roles = ("teacher", "admin") if (grade, subject) == ("one", "math") else None
+            routes.append(("GET", upload_page_route(grade, subject), upload_roles))
+            routes.append(("GET", download_page_route(grade, subject), ("parent", "admin")))
+            routes.append(("POST", upload_post_route(grade, subject), None))
+            routes.append(("GET", resources_route(grade, subject, "teacher"), ("teacher", "admin")))
+            routes.append(("GET", resources_route(grade, subject, "parent"), ("parent", "admin")))
+    return routes
@@ -1,24 +1,25 @@
 import subprocess
 
+from tool_cache import ensure_tool
+
 # Function to run code quality analysis
 def run_code_quality_analysis():
     print("Running code quality analysis...")
 
-    # Install radon using pip
-    print("Installing radon...")
-    subprocess.run(["pip", "install", "radon"], check=True)
+    # Install radon with pip only the first time it is missing
+    radon = ensure_tool("radon", ["radon"])
 
     # Cyclomatic Complexity Analysis
     print("Cyclomatic Complexity Analysis:")
     complexity_result = subprocess.run(
-        ["radon", "cc", "src/", "-a"], capture_output=True, text=True
+        [radon, "cc", "src/", "-a"], capture_output=True, text=True
     )
     print(complexity_result.stdout)
 
     # Raw Metrics (Maintainability Index, Comments, LOC)
     print("Raw Metrics (Maintainability Index, Comments, LOC):")
     raw_metrics_result = subprocess.run(
-        ["radon", "raw", "src/"], capture_output=True, text=True
+        [radon, "raw", "src/"], capture_output=True, text=True
     )
     print(raw_metrics_result.stdout)
 
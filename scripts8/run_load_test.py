@@ -0,0 +1,142 @@
+import os
+import csv
+import sys
+import json
+import argparse
+import threading
+import subprocess
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+LOCUSTFILE = os.path.join(SCRIPT_DIR, "Performance.py")
+DEFAULT_SLO_FILE = os.path.join(SCRIPT_DIR, "slo_thresholds.json")
+DEFAULT_CSV_PREFIX = os.path.join(PROJECT_ROOT, "metrics", "load_test")
+PERCENTILES = {"p50": "50%", "p95": "95%", "p99": "99%"}
+
+
+def run_locust(host, users, spawn_rate, run_time, csv_prefix):
+    """Run the scenario suite headless; Locust writes <csv_prefix>_stats.csv."""
+    cmd = [sys.executable, "-m", "locust", "-f", LOCUSTFILE, "--headless", "--only-summary",
+           "--users", str(users), "--spawn-rate", str(spawn_rate), "--run-time", run_time,
+           "--host", host, "--csv", csv_prefix]
+    print(f"Running: {' '.join(cmd)}")
+    return subprocess.run(cmd).returncode
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_latencies(stats_csv):
+    """{"METHOD /route": {requests, failures, failure_rate, p50, p95, p99}} from Locust's stats CSV (ms)."""
+    latencies = {}
+    with open(stats_csv, newline="") as f:
+        for row in csv.DictReader(f):
+            key = f"{row['Type']} {row['Name']}".strip() if row["Type"] else row["Name"]
+            requests = int(row["Request Count"])
+            failures = int(row["Failure Count"])
+            entry = {
+                "requests": requests,
+                "failures": failures,
+                "failure_rate": failures / requests if requests else 0.0,
+            }
+            for name, column in PERCENTILES.items():
+                entry[name] = _number(row.get(column))
+            latencies[key] = entry
+    return latencies
+
+
+def check_slo(latencies, slo):
+    """
+    Return a list of SLO violations. The threshold file holds "default"
+    limits and per-route overrides under "routes", keyed like the
+    latencies ("GET /admin", or "Aggregated" for the whole run):
+    {"p50_ms": ..., "p95_ms": ..., "p99_ms": ..., "max_failure_rate": ...}.
+    """
+    violations = []
+    defaults = slo.get("default", {})
+    overrides = slo.get("routes", {})
+    for route, stats in latencies.items():
+        limits = dict(defaults, **overrides.get(route, {}))
+        if stats["requests"] < slo.get("min_requests", 1):
+            continue
+        for name in PERCENTILES:
+            limit = limits.get(f"{name}_ms")
+            value = stats[name]
+            if limit is not None and value is not None and value > limit:
+                violations.append(f"{route}: {name} {value:.0f} ms > {limit} ms")
+        max_failure_rate = limits.get("max_failure_rate")
+        if max_failure_rate is not None and stats["failure_rate"] > max_failure_rate:
+            violations.append(f"{route}: failure rate {stats['failure_rate']:.2%} > {max_failure_rate:.2%}")
+    for route in overrides:
+        if route not in latencies:
+            print(f"Warning: SLO route {route!r} was not exercised")
+    return violations
+
+
+def print_latencies(latencies):
+    print("\n{:<50} {:>8} {:>8} {:>8} {:>8} {:>8}".format("Route", "Reqs", "Fails", "p50", "p95", "p99"))
+    print("=" * 94)
+    for route, stats in sorted(latencies.items()):
+        print("{:<50} {:>8} {:>8} {:>8} {:>8} {:>8}".format(
+            route[:50], stats["requests"], stats["failures"],
+            *(f"{stats[name]:.0f}" if stats[name] is not None else "-" for name in PERCENTILES)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the portal load-test scenarios headless and gate on SLOs.")
+    parser.add_argument("--host", default="http://localhost:3000", help="portal URL (default: %(default)s)")
+    parser.add_argument("--standin", action="store_true",
+                        help="start the local stand-in server and test it instead of --host")
+    parser.add_argument("--standin-latency-ms", type=float, default=0.0)
+    parser.add_argument("-u", "--users", type=int, default=50)
+    parser.add_argument("-r", "--spawn-rate", type=float, default=10)
+    parser.add_argument("-t", "--run-time", default="1m")
+    parser.add_argument("--slo", default=DEFAULT_SLO_FILE, help="SLO threshold file (default: %(default)s)")
+    parser.add_argument("--csv-prefix", default=DEFAULT_CSV_PREFIX)
+    args = parser.parse_args()
+
+    server = None
+    host = args.host
+    if args.standin:
+        from standin_server import make_server
+        server = make_server(port=0, latency_ms=args.standin_latency_ms)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host = f"http://127.0.0.1:{server.server_address[1]}"
+        print(f"Stand-in portal listening on {host}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.csv_prefix)), exist_ok=True)
+    try:
+        returncode = run_locust(host, args.users, args.spawn_rate, args.run_time, args.csv_prefix)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    stats_csv = args.csv_prefix + "_stats.csv"
+    if not os.path.exists(stats_csv):
+        print(f"Locust produced no statistics (exit code {returncode})")
+        sys.exit(returncode or 1)
+
+    latencies = read_latencies(stats_csv)
+    print_latencies(latencies)
+    latency_file = args.csv_prefix + "_latency.json"
+    with open(latency_file, "w") as f:
+        json.dump({"host": host, "users": args.users, "run_time": args.run_time, "routes": latencies}, f, indent=2)
+    print(f"\nPer-route latency percentiles saved to {latency_file}")
+
+    with open(args.slo) as f:
+        violations = check_slo(latencies, json.load(f))
+    if violations:
+        print(f"\nSLO violations ({len(violations)}):")
+        for violation in violations:
+            print(f"  {violation}")
+        sys.exit(1)
+    print("\nAll SLOs met.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,245 @@
-import subprocess
+import os
+import gc
+import sys
+import json
+import math
 import time
+import shlex
+import argparse
+import importlib
+import statistics
+import subprocess
+from statistics import NormalDist
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+DEFAULT_BASELINE_FILE = os.path.join(PROJECT_ROOT, "metrics", "performance_baselines.json")
+
+# The script this harness has always timed, when no target is given
+DEFAULT_TARGET_SCRIPT = "run_performance_test_target.py"
+
+# Callable targets are looped until one sample takes at least this long
+MIN_SAMPLE_SECONDS = 0.01
+
+
+def t_quantile(p, df):
+    """
+    Quantile of Student's t distribution, from the normal quantile with the
+    Cornish-Fisher expansion (within 1% of the exact value for df >= 2).
+    """
+    z = NormalDist().inv_cdf(p)
+    if math.isinf(df):
+        return z
+    g1 = (z ** 3 + z) / 4
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384
+    g4 = (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160
+    return z + g1 / df + g2 / df ** 2 + g3 / df ** 3 + g4 / df ** 4
+
+
+def summarize(samples, confidence=0.95):
+    """Mean, median, stddev, min/max and a t-based confidence interval of the mean."""
+    n = len(samples)
+    mean = statistics.fmean(samples)
+    stdev = statistics.stdev(samples) if n > 1 else 0.0
+    if n > 1:
+        half_width = t_quantile(0.5 + confidence / 2, n - 1) * stdev / math.sqrt(n)
+    else:
+        half_width = float("nan")
+    return {
+        "n": n,
+        "mean": mean,
+        "median": statistics.median(samples),
+        "stdev": stdev,
+        "min": min(samples),
+        "max": max(samples),
+        "confidence": confidence,
+        "ci_low": mean - half_width,
+        "ci_high": mean + half_width,
+    }
+
+
+def welch_slowdown(baseline, current, alpha=0.05):
+    """
+    One-sided Welch t-test of "current is slower than baseline".
+    Returns (t statistic, degrees of freedom, critical t, significant).
+    """
+    n1, n2 = len(baseline), len(current)
+    if n1 < 2 or n2 < 2:
+        return None, None, None, False
+    m1, m2 = statistics.fmean(baseline), statistics.fmean(current)
+    v1, v2 = statistics.variance(baseline) / n1, statistics.variance(current) / n2
+    if v1 + v2 == 0:
+        return math.inf if m2 > m1 else 0.0, math.inf, 0.0, m2 > m1
+    t = (m2 - m1) / math.sqrt(v1 + v2)
+    df = (v1 + v2) ** 2 / ((v1 ** 2 / (n1 - 1) if v1 else 0) + (v2 ** 2 / (n2 - 1) if v2 else 0))
+    critical = t_quantile(1 - alpha, df)
+    return t, df, critical, t > critical
+
+
+def callable_target(spec):
+    """Resolve "module:function" (modules are searched in scripts/ and scripts8/ too)."""
+    module_name, _, function_name = spec.partition(":")
+    if not function_name:
+        raise ValueError(f"Callable targets are written module:function, got {spec!r}")
+    for directory in (os.path.join(PROJECT_ROOT, "scripts"), SCRIPT_DIR):
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def time_callable(func, args, number):
+    """Seconds per call over `number` calls, with the garbage collector off like timeit."""
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(number):
+            func(*args)
+        return (time.perf_counter() - start) / number
+    finally:
+        if gc_enabled:
+            gc.enable()
+
 
-# Function to run the performance test
-def run_performance_test():
-    print("Running performance test...")
+def time_command(cmd):
+    start = time.perf_counter()
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} exited with {result.returncode}: {result.stderr.strip()}")
+    return elapsed
 
-    # Get the current time (start time)
-    start_time = time.time()
 
-    # Specify the path to the Python script you want to run
-    script_path = 'run_performance_test_target.py'
+def benchmark(target, args=(), warmup=2, repeat=20, number=None):
+    """
+    Time a target: a Python callable (called with args) or a command line
+    (list of arguments, run as a subprocess). Warmup runs are discarded.
+    Returns (samples in seconds, calls per sample).
+    """
+    if callable(target):
+        if number is None:
+            # Calibrate like timeit, so short calls are not lost in timer noise
+            number = 1
+            while time_callable(target, args, number) * number < MIN_SAMPLE_SECONDS and number < 10 ** 6:
+                number *= 10
+        run = lambda: time_callable(target, args, number)
+    else:
+        number = 1
+        run = lambda: time_command(target)
+
+    for _ in range(warmup):
+        run()
+    return [run() for _ in range(repeat)], number
+
+
+def load_baselines(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_baseline(path, name, samples, stats):
+    baselines = load_baselines(path)
+    git = subprocess.run(["git", "-C", PROJECT_ROOT, "rev-parse", "HEAD"], capture_output=True, text=True)
+    baselines.setdefault(name, []).append({
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git.stdout.strip() if git.returncode == 0 else None,
+        "samples": samples,
+        "stats": stats,
+    })
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(baselines, f, indent=2)
+
+
+def format_seconds(seconds):
+    if math.isnan(seconds):
+        return "n/a"
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if abs(seconds) >= scale:
+            return f"{seconds / scale:.3f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
 
+def print_stats(name, stats, number):
+    print(f"\nBenchmark: {name} ({stats['n']} runs" + (f", {number} calls each)" if number > 1 else ")"))
+    print(f"  Mean:   {format_seconds(stats['mean'])}  "
+          f"({stats['confidence']:.0%} CI {format_seconds(stats['ci_low'])} .. {format_seconds(stats['ci_high'])})")
+    print(f"  Median: {format_seconds(stats['median'])}")
+    print(f"  Stddev: {format_seconds(stats['stdev'])}")
+    print(f"  Min:    {format_seconds(stats['min'])}")
+    print(f"  Max:    {format_seconds(stats['max'])}")
 
-    # Execute the script using subprocess (equivalent to running the command in bash)
-    result = subprocess.run(
-        ['python', script_path],  # Run the Python script
-        capture_output=True,  # Capture output (stdout and stderr)
-        text=True  # Get the output as a string (not bytes)
-    )
 
-    # Check if the process was successful
-    if result.returncode == 0:
-        print("Script executed successfully.")
+def compare_to_baseline(baseline, samples, stats, alpha, min_change):
+    """Print the comparison with the previous baseline; return True for a significant slowdown."""
+    previous = baseline["stats"]
+    change = stats["mean"] / previous["mean"] - 1 if previous["mean"] else 0.0
+    t, df, critical, significant = welch_slowdown(baseline["samples"], samples, alpha)
+    print(f"\nBaseline from {baseline['timestamp']} ({(baseline.get('git_commit') or '')[:10]}): "
+          f"mean {format_seconds(previous['mean'])}, change {change:+.1%}")
+    if t is not None:
+        print(f"  Welch t = {t:.2f} (df {df:.1f}, one-sided critical t {critical:.2f} at alpha {alpha})")
+    if significant and change >= min_change:
+        print("  SLOWER: statistically significant slowdown")
+        return True
+    if significant:
+        print(f"  Significant but below the {min_change:.0%} change threshold")
     else:
-        print(f"Error during execution: {result.stderr}")
+        print("  No significant slowdown")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a Python callable or a command with warmup, "
+                                                 "repetitions and a baseline comparison.")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--callable", metavar="MODULE:FUNCTION", help="Python function to time")
+    target.add_argument("--cmd", help="command line to time as a subprocess")
+    parser.add_argument("--arg", action="append", default=[], help="argument for the callable (repeatable)")
+    parser.add_argument("--name", help="benchmark name in the baseline file (default: the target)")
+    parser.add_argument("--warmup", type=int, default=2, help="discarded warmup runs (default: 2)")
+    parser.add_argument("-n", "--repeat", type=int, default=20, help="measured runs (default: 20)")
+    parser.add_argument("--number", type=int, help="calls per sample for callables (default: calibrated)")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--alpha", type=float, default=0.05, help="significance level for slowdowns")
+    parser.add_argument("--min-change", type=float, default=0.05,
+                        help="smallest relative slowdown to flag (default: 0.05 = 5%%)")
+    parser.add_argument("--baseline-file", default=DEFAULT_BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args()
+
+    if args.callable:
+        target = callable_target(args.callable)
+        name = args.name or args.callable
+    else:
+        command = args.cmd or f"{shlex.quote(sys.executable)} {DEFAULT_TARGET_SCRIPT}"
+        target = shlex.split(command)
+        name = args.name or command
+
+    print(f"Running performance test: {name}...")
+    samples, number = benchmark(target, args.arg, args.warmup, args.repeat, args.number)
+    stats = summarize(samples, args.confidence)
+    print_stats(name, stats, number)
+
+    history = load_baselines(args.baseline_file).get(name)
+    slower = False
+    if history:
+        slower = compare_to_baseline(history[-1], samples, stats, args.alpha, args.min_change)
+    else:
+        print("\nNo baseline yet; run with --save-baseline to store one.")
+
+    if args.save_baseline:
+        save_baseline(args.baseline_file, name, samples, stats)
+        print(f"Baseline saved to {args.baseline_file}")
 
-    # Get the end time
-    end_time = time.time()
+    if slower:
+        sys.exit(1)
 
-    # Calculate execution time
-    execution_time = end_time - start_time
-    print(f"Execution Time: {execution_time:.2f} seconds")
 
 # Run the performance test
 if __name__ == "__main__":
-    run_performance_test()
+    main()
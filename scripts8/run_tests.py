@@ -1,17 +1,18 @@
 import subprocess
 
+from tool_cache import ensure_tool
+
 # Function to run unit tests and generate coverage report
 def run_tests_with_coverage():
     print("Running tests with coverage...")
 
-    # Install pytest and pytest-cov
-    print("Installing pytest and pytest-cov...")
-    subprocess.run(["pip", "install", "pytest", "pytest-cov"], check=True)
+    # Install pytest and pytest-cov with pip only the first time they are missing
+    pytest = ensure_tool("pytest", ["pytest", "pytest-cov"], modules=["pytest_cov"])
 
     # Run tests with coverage
     print("Running pytest with coverage...")
     result = subprocess.run(
-        ["pytest", "--cov=src", "tests/"],
+        [pytest, "--cov=src", "tests/"],
         capture_output=True,
         text=True
     )
@@ -0,0 +1,194 @@
+import os
+import re
+import json
+import time
+import random
+import secrets
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from portal_routes import (GRADES, SUBJECTS, LOGIN, DASHBOARDS, DOWNLOAD_HOMEWORK, GENERATE_PASSWORD,
+                           all_routes, upload_page_route, upload_post_route, download_page_route)
+
+SESSION_COOKIE = "connect.sid"
+UPLOAD_FILENAME_PATTERN = re.compile(rb'name="homeworkFile"; filename="([^"]*)"')
+
+
+def default_users():
+    """The accounts Performance.py logs in with, honouring the same LOADTEST_* variables."""
+    users = {}
+    for role in DASHBOARDS:
+        prefix = f"LOADTEST_{role.upper()}"
+        username = os.environ.get(f"{prefix}_USERNAME", f"loadtest-{role}")
+        users[username] = (os.environ.get(f"{prefix}_PASSWORD", f"loadtest-{role}-password"), role)
+    return users
+
+
+class PortalState:
+    """Sessions and uploaded homework of the stand-in portal, shared by all handler threads."""
+
+    def __init__(self, users, latency_ms=0.0, jitter_ms=0.0):
+        self.users = users
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.sessions = {}                                   # session id -> role
+        self.homework = {(g, s): [] for g in GRADES for s in SUBJECTS}
+        self.files = {}                                      # file path -> content
+        self.lock = threading.Lock()
+
+        # (method, path) -> roles allowed (None = anyone), straight from the route table
+        self.routes = {(method, path): roles for method, path, roles in all_routes()}
+        self.upload_posts = {upload_post_route(g, s): (g, s) for g in GRADES for s in SUBJECTS}
+        self.upload_pages = {upload_page_route(g, s): (g, s) for g in GRADES for s in SUBJECTS}
+        self.download_pages = {download_page_route(g, s): (g, s) for g in GRADES for s in SUBJECTS}
+
+    def delay(self):
+        """Sleep for the configured response time, so SLO gates can be exercised locally."""
+        if self.latency_ms or self.jitter_ms:
+            time.sleep(max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000)
+
+
+class PortalHandler(BaseHTTPRequestHandler):
+    """Answers every route of index.js with the same status codes, redirects and role checks."""
+
+    server_version = "PortalStandIn/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def session_role(self):
+        for part in self.headers.get("Cookie", "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == SESSION_COOKIE:
+                return self.state.sessions.get(value)
+        return None
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=()):
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def redirect(self, location, headers=()):
+        self.send(302, f"Found. Redirecting to {location}", "text/plain; charset=utf-8",
+                  [("Location", location)] + list(headers))
+
+    def route(self, method):
+        path = urlsplit(self.path).path
+        if method == "POST" and path.startswith("/admin/delete-user/"):
+            key = ("POST", "/admin/delete-user/:id")
+        else:
+            key = (method, path)
+        if key not in self.state.routes:
+            # Static assets and unknown paths, as express.static and the 404 handler would
+            return self.send(404, f"Cannot {method} {path}")
+        roles = self.state.routes[key]
+        if roles is not None and self.session_role() not in roles:
+            return self.send(403, "Access denied.")
+        self.state.delay()
+        body = self.read_body() if method == "POST" else b""
+        return self.respond(method, path, body)
+
+    def respond(self, method, path, body):
+        state = self.state
+        if method == "POST" and path == LOGIN:
+            form = parse_qs(body.decode("utf-8", "replace"))
+            username = form.get("username", [""])[0]
+            password, role = state.users.get(username, (None, None))
+            if password is None or form.get("password", [""])[0] != password:
+                return self.send(400, "Invalid username or password.")
+            session_id = secrets.token_urlsafe(16)
+            with state.lock:
+                state.sessions[session_id] = role
+            return self.redirect(DASHBOARDS[role], [("Set-Cookie", f"{SESSION_COOKIE}={session_id}; Path=/; HttpOnly")])
+
+        if method == "POST" and path in state.upload_posts:
+            match = UPLOAD_FILENAME_PATTERN.search(body)
+            if match is None:
+                return self.send(500, "Server error")
+            file_path = "uploads/" + os.path.basename(match.group(1).decode("utf-8", "replace"))
+            with state.lock:
+                state.files[file_path] = body
+                state.homework[state.upload_posts[path]].append(file_path)
+            return self.redirect(upload_page_route(*state.upload_posts[path]) + "?success=true")
+
+        if method == "POST" and path == DOWNLOAD_HOMEWORK:
+            file_path = parse_qs(body.decode("utf-8", "replace")).get("filePath", [""])[0]
+            content = state.files.get(file_path)
+            if content is None:
+                return self.send(404, "File not found")
+            return self.send(200, content, "application/pdf")
+
+        if method == "POST":
+            # Sign-up and the admin user management redirect after writing to the database
+            return self.redirect(LOGIN if path == "/signup" else "/admin")
+
+        if path == GENERATE_PASSWORD:
+            return self.send(200, json.dumps({"password": secrets.token_urlsafe(12)}), "application/json")
+
+        homework = state.upload_pages.get(path) or state.download_pages.get(path)
+        rows = ""
+        if homework is not None:
+            with state.lock:
+                file_paths = list(state.homework[homework])
+            rows = "".join(
+                f'<form action="{DOWNLOAD_HOMEWORK}" method="POST">'
+                f'<input type="hidden" name="filePath" value="{file_path}"></form>\n'
+                for file_path in file_paths[-20:]
+            )
+        return self.send(200, f"<!DOCTYPE html><html><body><h1>{path}</h1>\n{rows}</body></html>")
+
+    def do_GET(self):
+        self.route("GET")
+
+    def do_POST(self):
+        self.route("POST")
+
+
+class PortalServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # socketserver's default backlog of 5 drops connections when many users log in at once
+    request_queue_size = 128
+
+
+def make_server(host="127.0.0.1", port=3000, latency_ms=0.0, jitter_ms=0.0, users=None):
+    server = PortalServer((host, port), PortalHandler)
+    server.state = PortalState(users or default_users(), latency_ms, jitter_ms)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in for the homework portal, for load tests without Node/Postgres.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mean added response time")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="standard deviation of the added time")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency_ms, args.jitter_ms)
+    print(f"Stand-in portal listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import json
+import shutil
+import subprocess
+import importlib.util
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+# Next to the metrics cache, which is not committed
+CACHE_FILE = os.path.join(PROJECT_ROOT, "metrics", ".cache", "tools.json")
+
+
+def _load():
+    try:
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save(cache):
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    with open(CACHE_FILE, "w") as f:
+        json.dump(cache, f, indent=2)
+
+
+def _find(command, modules):
+    """Path of command (this interpreter's bin directory first), if it and all modules are present."""
+    if any(importlib.util.find_spec(module) is None for module in modules):
+        return None
+    bin_dir = os.path.dirname(sys.executable)
+    return shutil.which(command, path=bin_dir) or shutil.which(command)
+
+
+def ensure_tool(command, packages, modules=()):
+    """
+    Return the path of a command-line tool, installing packages with pip
+    only when it (or one of the Python modules it needs) is missing.
+    The path found is cached per interpreter, so later runs neither search
+    for it nor run pip; a cached path that no longer exists is looked up again.
+    """
+    cache = _load()
+    key = f"{sys.executable} {command}"
+    path = cache.get(key)
+    if path and os.access(path, os.X_OK):
+        return path
+
+    path = _find(command, modules)
+    if path is None:
+        print(f"Installing {', '.join(packages)}...")
+        subprocess.run([sys.executable, "-m", "pip", "install", *packages], check=True)
+        importlib.invalidate_caches()
+        path = _find(command, modules)
+        if path is None:
+            raise RuntimeError(f"{command} is still not available after installing {', '.join(packages)}")
+    cache[key] = path
+    _save(cache)
+    return path